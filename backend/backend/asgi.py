@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Les flux temps réel (SSE de triage IA : /triage/<id>/stream/, chat des consultations :
+ws://<hôte>/ws/consultations/<id>/) ne sont servis qu'en ASGI, par exemple :
+uvicorn backend.asgi:application
 """
 
 import os
@@ -13,4 +17,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importé après get_asgi_application(), qui initialise Django
+from medicare.chat import chat_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await chat_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,7 +46,11 @@ CORS_ALLOW_HEADERS = [
 # GraphQL Configuration
 GRAPHENE = {
     'SCHEMA': 'medicare.schema.schema',
+    # Le dernier middleware de la liste est le plus externe
     'MIDDLEWARE': [
+        'medicare.middleware.InstrumentationMiddleware',
+        'medicare.middleware.GraphQLErrorMiddleware',
+        'medicare.middleware.ActorMiddleware',
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
     ],
 }
@@ -68,6 +73,136 @@ GRAPHQL_JWT = {
 }
 
 
+# Cache
+# LocMemCache est local au processus : configurer Redis ou Memcached en production
+# pour partager les entrées entre workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # État commun à tous les workers : présence des médecins, versions de l'annuaire et de
+    # l'index de recherche, disjoncteur Ollama. Redis si REDIS_URL est défini (production) ; sinon table en base
+    # (créée par la migration 0014), où chaque battement de présence est une écriture SQL.
+    # Un cache local au processus ferait apparaître les médecins hors ligne (medicare.W001).
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'medicare_shared_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,  # Deux clés par médecin (présence, compte) : pas d'éviction en pratique
+        },
+    },
+    # Analyses Ollama par symptômes normalisés, communes aux workers web et à run_triage_worker
+    # (table créée par la migration 0015, ou Redis) ; génération et compteurs dans 'shared'
+    'ai_triage': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'medicare_ai_triage_cache',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+    CACHES['ai_triage'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'KEY_PREFIX': 'ai_triage',
+        'TIMEOUT': 60 * 60 * 24,  # Éviction au-delà de maxmemory selon la politique de Redis
+    }
+
+# Ollama (voir medicare/services/ollama_service.py)
+OLLAMA = {
+    'API_URL': os.environ.get('OLLAMA_API_URL', 'https://ollama.com/api/generate'),
+    'API_KEY': os.environ.get('OLLAMA_API_KEY', ''),  # Vide : triage par mots-clés seulement (medicare.W002)
+    'MODEL': os.environ.get('OLLAMA_MODEL', 'llama3.2'),
+    'POOL_SIZE': 10,
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 30,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.5,
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RECOVERY_TIMEOUT': 30,
+    'CIRCUIT_LATENCY_THRESHOLD': 20,
+    'ADAPTIVE_TIMEOUT_MULTIPLIER': 2,
+    'MIN_READ_TIMEOUT': 5,
+}
+
+# Triage IA asynchrone (voir medicare/services/triage_jobs.py)
+AI_TRIAGE_INPROCESS_WORKERS = 2  # Threads dans le processus web, 0 pour utiliser uniquement run_triage_worker
+AI_TRIAGE_JOB_LEASE_SECONDS = 120  # Un triage "processing" plus ancien est repris par un autre worker
+AI_TRIAGE_MAX_ATTEMPTS = 3
+
+# Rappels : nombre de jours d'échéances matérialisées dans ReminderOccurrence
+REMINDER_OCCURRENCE_HORIZON_DAYS = 14
+# Classe d'envoi des rappels (run_reminder_scheduler) ; LocalNotifier se contente de journaliser
+REMINDER_NOTIFIER = 'medicare.services.reminder_scheduler.LocalNotifier'
+
+
+# Métriques GraphQL (/metrics) : part des opérations mesurées en détail, jeton Bearer optionnel
+GRAPHQL_METRICS_SAMPLE_RATE = float(os.getenv('GRAPHQL_METRICS_SAMPLE_RATE', '1.0' if DEBUG else '0.1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
+# Limites des requêtes GraphQL (voir medicare/query_cost.py) ; clés "Type.champ" du schéma GraphQL
+GRAPHQL_QUERY_LIMITS = {
+    'MAX_DEPTH': 10,
+    'MAX_COST': 2000,
+    'DEFAULT_LIST_SIZE': 20,  # Taille supposée des listes non paginées
+    'FIELD_COSTS': {
+        'Mutation.aiTriage': 10,  # Appel Ollama
+    },
+    'LIST_SIZES': {
+        'ConsultationType.messages': 50,
+        'DoctorSearchResultType.doctors': 1,  # Taille déjà comptée sur searchDoctors(first)
+    },
+}
+
+# Requêtes persistées (APQ) et cache des documents GraphQL analysés (voir medicare/persisted_queries.py)
+GRAPHQL_PERSISTED_QUERIES = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 7 * 24 * 3600,
+    'DOCUMENT_CACHE_SIZE': 500,
+    'GET_MAX_AGE': 60,  # Réponses GET sans authentification cachables par un CDN
+}
+
+# Durée de vie des réponses de l'annuaire des médecins en cache (invalidées à chaque modification)
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = 300
+
+# Présence des médecins : hors ligne sans battement depuis ce nombre de secondes
+DOCTOR_PRESENCE_TTL = 60
+# Âge maximal (secondes) de l'instantané des médecins en ligne gardé par chaque processus
+DOCTOR_PRESENCE_REFRESH = 5
+
+# Synchronisation mobile : durée de conservation des suppressions (purge_sync_tombstones) ;
+# un client resté hors ligne plus longtemps reçoit un instantané complet
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Chat des consultations en WebSocket (voir medicare/chat.py) ; la couche en mémoire ne
+# diffuse que dans le processus ASGI courant
+CHAT = {
+    'CHANNEL_LAYER': 'medicare.channel_layer.InMemoryChannelLayer',
+    'QUEUE_SIZE': 100,  # Messages en attente par client avant fermeture (4008)
+    'RESUME_LIMIT': 500,  # Messages renvoyés au plus lors d'une reprise avec ?since=
+}
+
+# Paiements mobile money (voir medicare/services/payments.py) : jeton attendu dans l'en-tête
+# X-Callback-Token des callbacks de chaque opérateur (vide : callbacks refusés hors DEBUG,
+# signalé par medicare.W003)
+PAYMENTS = {
+    'CALLBACK_TOKENS': {
+        'mvola': os.getenv('MVOLA_CALLBACK_TOKEN', ''),
+        'orange': os.getenv('ORANGE_CALLBACK_TOKEN', ''),
+        'airtel': os.getenv('AIRTEL_CALLBACK_TOKEN', ''),
+    },
+    'CALLBACK_CHUNK_SIZE': 500,  # Références par UPDATE conditionnel
+}
+
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -8,13 +8,22 @@ from django.contrib import admin
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 from medicare.schema import schema
+from medicare.views import (
+    InstrumentedGraphQLView, ai_triage_stream, ollama_health, payment_callback, presence_heartbeat,
+    presence_offline, prometheus_metrics,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema))),
+    path('graphql/', csrf_exempt(InstrumentedGraphQLView.as_view(graphiql=True, schema=schema))),
+    path('triage/<uuid:triage_id>/stream/', ai_triage_stream),  # SSE, servi par ASGI
+    path('health/ollama/', ollama_health),
+    path('presence/heartbeat/', presence_heartbeat),
+    path('presence/offline/', presence_offline),
+    path('payments/callback/<str:operator>/', payment_callback),  # Opérateurs mobile money
+    path('metrics', prometheus_metrics),  # Format Prometheus
 ]
 
 # Servir les fichiers médias en développement
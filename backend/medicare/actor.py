@@ -0,0 +1,82 @@
+"""
+Acteur de la requête : profil patient, médecin ou administrateur de l'utilisateur authentifié.
+
+Les trois profils sont chargés en une seule requête (jointures sur les relations
+OneToOne inverses) puis mis en cache sur le contexte pour tout le document GraphQL.
+"""
+from typing import Optional
+
+from django.contrib.auth.models import User
+
+from .loaders import get_loaders
+from .models import Admin, Doctor, Patient
+
+
+class Actor:
+    """Profils de l'utilisateur courant, résolus une seule fois par requête"""
+
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.pk if user is not None and user.is_authenticated else None
+        self._loaded = False
+        self._patient: Optional[Patient] = None
+        self._doctor: Optional[Doctor] = None
+        self._admin: Optional[Admin] = None
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user_id is not None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.user_id is None:
+            return
+        user = (
+            User.objects.select_related('patient', 'doctor', 'admin')
+            .filter(pk=self.user_id)
+            .first()
+        )
+        if user is None:
+            return
+        # RelatedObjectDoesNotExist hérite d'AttributeError : getattr suffit
+        self._patient = getattr(user, 'patient', None)
+        self._doctor = getattr(user, 'doctor', None)
+        self._admin = getattr(user, 'admin', None)
+
+    @property
+    def patient(self) -> Optional[Patient]:
+        self._load()
+        return self._patient
+
+    @property
+    def doctor(self) -> Optional[Doctor]:
+        self._load()
+        return self._doctor
+
+    @property
+    def admin(self) -> Optional[Admin]:
+        self._load()
+        return self._admin
+
+    def refresh(self) -> None:
+        """Oublie les profils chargés (après la création d'un profil dans la requête)"""
+        self._loaded = False
+        self._patient = self._doctor = self._admin = None
+
+
+def get_actor(info) -> Actor:
+    """Retourne l'acteur attaché au contexte, recréé si l'utilisateur authentifié a changé"""
+    user = getattr(info.context, 'user', None)
+    actor: Optional[Actor] = getattr(info.context, 'actor', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    if actor is None or actor.user_id != user_id:
+        actor = Actor(user)
+        info.context.actor = actor
+        loaders = get_loaders(info)
+        if actor.patient is not None:
+            loaders.patients.prime(actor.patient.id, actor.patient)
+        if actor.doctor is not None:
+            loaders.doctors.prime(actor.doctor.id, actor.doctor)
+    return actor
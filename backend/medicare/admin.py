@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Patient, Doctor, Reminder, JournalEntry, Consultation,
-    Message, Payment, AITriage, OTPCode
+    Message, Payment, PaymentCallback, AITriage, OTPCode
 )
 
 
@@ -52,6 +52,13 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('operator', 'status', 'created_at')
 
 
+@admin.register(PaymentCallback)
+class PaymentCallbackAdmin(admin.ModelAdmin):
+    list_display = ('transaction_id', 'operator', 'status', 'received_at')
+    list_filter = ('operator', 'status', 'received_at')
+    search_fields = ('transaction_id',)
+
+
 @admin.register(AITriage)
 class AITriageAdmin(admin.ModelAdmin):
     list_display = ('patient', 'severity', 'created_at')
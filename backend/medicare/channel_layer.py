@@ -0,0 +1,118 @@
+"""
+Couche de diffusion (channel layer) du chat : groupes d'abonnés et files bornées.
+
+`InMemoryChannelLayer` diffuse dans le processus ASGI courant. Un autre backend (Redis
+pub/sub, par exemple, pour plusieurs processus) peut être branché via
+`CHAT['CHANNEL_LAYER']` en respectant la même interface : `subscribe`, `unsubscribe`
+et `publish`.
+
+Contre-pression : chaque abonné a une file bornée (`CHAT['QUEUE_SIZE']`). Un abonné
+trop lent dont la file est pleine est désabonné et reçoit OVERFLOW ; le client se
+reconnecte et reprend depuis son dernier `created_at`, sans ralentir les autres.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_CHAT_CONFIG = {
+    'CHANNEL_LAYER': 'medicare.channel_layer.InMemoryChannelLayer',
+    'QUEUE_SIZE': 100,
+    'RESUME_LIMIT': 500,
+}
+
+# Message de fin envoyé à un abonné dont la file a débordé
+OVERFLOW = object()
+
+
+def get_chat_config() -> Dict:
+    return {**DEFAULT_CHAT_CONFIG, **getattr(settings, 'CHAT', {})}
+
+
+class Subscription:
+    def __init__(self, group: str, queue_size: int):
+        self.group = group
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InMemoryChannelLayer:
+    """Groupes d'abonnés du processus ; `publish` peut être appelé depuis n'importe quel thread"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._groups: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {'published': 0, 'delivered': 0, 'overflows': 0}
+
+    def subscribe(self, group: str) -> Subscription:
+        """À appeler depuis la boucle d'événements ASGI"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(group, self.queue_size)
+        self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._groups.get(subscription.group)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._groups[subscription.group]
+
+    def group_size(self, group: str) -> int:
+        return len(self._groups.get(group, ()))
+
+    def publish(self, group: str, message: Dict) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # Aucun abonné n'a encore été servi par ce processus
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(group, message)
+        else:
+            # Appel depuis un thread (mutation, signal) : remis à la boucle ASGI
+            loop.call_soon_threadsafe(self._deliver, group, message)
+
+    def _deliver(self, group: str, message: Dict) -> None:
+        self.stats['published'] += 1
+        for subscription in list(self._groups.get(group, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                self.stats['delivered'] += 1
+            except asyncio.QueueFull:
+                self._overflow(subscription)
+
+    def _overflow(self, subscription: Subscription) -> None:
+        self.stats['overflows'] += 1
+        subscription.overflowed = True
+        self.unsubscribe(subscription)
+        # Les messages en attente seront relus en base à la reconnexion
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(OVERFLOW)
+
+
+_layer = None
+
+
+def get_channel_layer():
+    """Couche configurée (CHAT['CHANNEL_LAYER']), une instance par processus"""
+    global _layer
+    if _layer is None:
+        config = get_chat_config()
+        _layer = import_string(config['CHANNEL_LAYER'])(queue_size=config['QUEUE_SIZE'])
+    return _layer
+
+
+def consultation_group(consultation_id) -> str:
+    return f'consultation:{consultation_id}'
@@ -0,0 +1,216 @@
+"""
+Chat des consultations en WebSocket (ASGI), monté par backend/asgi.py.
+
+Connexion : `ws://<hôte>/ws/consultations/<id>/?token=<JWT>[&since=<created_at ISO>]`.
+Seuls le patient et le médecin de la consultation sont acceptés. Avec `since`, les
+messages manqués sont relus en base (index messages_consult_created_idx) avant le
+direct : un client qui se reconnecte reprend depuis le dernier `createdAt` reçu.
+
+Trames serveur : `{"type": "message", "message": {...}}`, puis `{"type": "ready",
+"truncated": bool}` à la fin de la reprise. Trame client : `{"type": "message",
+"content": ..., "photoUrl": ..., "audioUrl": ..., "clientSequence": ...}`, écrite comme
+par la mutation sendMessage (medicare/services/consultations.py). Tout Message enregistré
+est diffusé après commit, par ce chemin d'écriture ou par le signal post_save.
+
+Codes de fermeture : 4401 (authentification), 4403 (hors consultation), 4404
+(chemin inconnu), 4008 (client trop lent : se reconnecter avec `since`).
+"""
+import asyncio
+import json
+import logging
+import re
+import uuid
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.shortcuts import get_user_by_token
+
+from .channel_layer import OVERFLOW, consultation_group, get_channel_layer, get_chat_config
+from .models import Message
+from .services.consultations import consultation_participant, message_payload, write_messages
+
+logger = logging.getLogger(__name__)
+
+CHAT_PATH = re.compile(r'^/ws/consultations/(?P<consultation_id>[0-9a-fA-F-]{36})/?$')
+
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_TOO_SLOW = 4008
+
+
+def _query_params(scope) -> Dict[str, str]:
+    params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return {key: values[0] for key, values in params.items()}
+
+
+def _header_token(scope) -> Optional[str]:
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0] in ('JWT', 'Bearer'):
+                return parts[1]
+    return None
+
+
+def _parse_since(value: Optional[str]):
+    if not value:
+        return None
+    # Un '+' non encodé dans l'URL arrive comme une espace
+    try:
+        since = parse_datetime(value.replace(' ', '+'))
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _authorize(token: Optional[str], consultation_id: str):
+    """(code de refus, participant) ; participant = (sender_type, sender_id)"""
+    close_old_connections()
+    try:
+        if not token:
+            return CLOSE_UNAUTHORIZED, None
+        try:
+            user = get_user_by_token(token)
+        except JSONWebTokenError:
+            return CLOSE_UNAUTHORIZED, None
+        consultation, participant = consultation_participant(consultation_id, user.pk)
+        if consultation is None:
+            return CLOSE_NOT_FOUND, None
+        if participant is None:
+            return CLOSE_FORBIDDEN, None
+        return None, participant
+    finally:
+        close_old_connections()
+
+
+def _messages_since(consultation_id: str, since, limit: int):
+    close_old_connections()
+    try:
+        messages = list(
+            Message.objects.filter(consultation_id=consultation_id, created_at__gt=since)
+            .order_by('created_at')[:limit + 1]
+        )
+        return [message_payload(message) for message in messages[:limit]], len(messages) > limit
+    finally:
+        close_old_connections()
+
+
+def _create_message(consultation_id: str, participant, data: Dict) -> None:
+    close_old_connections()
+    try:
+        item = {
+            'content': data.get('content'),
+            'photo_url': data.get('photoUrl'),
+            'audio_url': data.get('audioUrl'),
+            'client_sequence': data.get('clientSequence'),
+        }
+        if not (item['content'] or item['photo_url'] or item['audio_url']):
+            return
+        if not isinstance(item['client_sequence'], int) or item['client_sequence'] < 0:
+            item['client_sequence'] = None
+        write_messages(consultation_id, participant, [item])
+    finally:
+        close_old_connections()
+
+
+async def _send_json(send, data: Dict) -> None:
+    await send({'type': 'websocket.send', 'text': json.dumps(data, ensure_ascii=False)})
+
+
+async def pump(subscription, send, skip_ids: Iterable[str] = ()) -> None:
+    """
+    Transmet les messages du groupe au client jusqu'au débordement de sa file.
+
+    `send` attend que le serveur ait accepté la trame : un client lent remplit sa file
+    (contre-pression) sans bloquer la diffusion aux autres abonnés.
+    """
+    skip_ids = set(skip_ids)
+    while True:
+        event = await subscription.get()
+        if event is OVERFLOW:
+            logger.info("Client du groupe %s trop lent : connexion fermée", subscription.group)
+            await send({'type': 'websocket.close', 'code': CLOSE_TOO_SLOW})
+            return
+        if skip_ids and event['message']['id'] in skip_ids:
+            # Déjà transmis pendant la reprise
+            skip_ids.discard(event['message']['id'])
+            continue
+        await _send_json(send, event)
+
+
+async def _read(receive, consultation_id: str, participant) -> None:
+    while True:
+        event = await receive()
+        if event['type'] == 'websocket.disconnect':
+            return
+        if event['type'] != 'websocket.receive':
+            continue
+        try:
+            data = json.loads(event.get('text') or event.get('bytes') or '')
+        except ValueError:
+            continue
+        if isinstance(data, dict) and data.get('type') == 'message':
+            await sync_to_async(_create_message)(consultation_id, participant, data)
+
+
+async def chat_application(scope, receive, send):
+    """Application ASGI des connexions WebSocket"""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    match = CHAT_PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    try:
+        consultation_id = str(uuid.UUID(match.group('consultation_id')))
+    except ValueError:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    params = _query_params(scope)
+    refusal, participant = await sync_to_async(_authorize)(
+        params.get('token') or _header_token(scope), consultation_id
+    )
+    if refusal is not None:
+        await send({'type': 'websocket.close', 'code': refusal})
+        return
+
+    await send({'type': 'websocket.accept'})
+    layer = get_channel_layer()
+    # Abonnement avant la lecture de la reprise : aucun message ne peut passer entre les deux
+    subscription = layer.subscribe(consultation_group(consultation_id))
+    tasks = []
+    try:
+        skip_ids = []
+        since = _parse_since(params.get('since'))
+        truncated = False
+        if since is not None:
+            backlog, truncated = await sync_to_async(_messages_since)(
+                consultation_id, since, get_chat_config()['RESUME_LIMIT']
+            )
+            for payload in backlog:
+                await _send_json(send, {'type': 'message', 'message': payload})
+                skip_ids.append(payload['id'])
+        # truncated : le client complète l'historique par la requête GraphQL
+        await _send_json(send, {'type': 'ready', 'truncated': truncated})
+
+        tasks = [
+            asyncio.ensure_future(pump(subscription, send, skip_ids)),
+            asyncio.ensure_future(_read(receive, consultation_id, participant)),
+        ]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        layer.unsubscribe(subscription)
+        for task in tasks:
+            task.cancel()
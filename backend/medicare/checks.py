@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .models import Payment
+from .services.ollama_service import is_ollama_configured
+from .services.payments import get_payments_config
+
+# Backends dont les entrées ne sont visibles que du processus qui les a écrites
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Backends partagés mais servis par la base : chaque battement de présence est une écriture SQL
+SQL_CACHES = (
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('shared', {}).get('BACKEND')
+    if backend is None or backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            "Le cache 'shared' n'est pas partagé entre processus",
+            hint=(
+                "La présence des médecins, la version de l'annuaire et le disjoncteur Ollama y sont tenus : avec plusieurs "
+                "workers, utiliser DatabaseCache ou Redis (REDIS_URL), ou servir l'API depuis un seul processus."
+            ),
+            id='medicare.W001',
+        )]
+    if backend in SQL_CACHES:
+        return [Warning(
+            "Le cache 'shared' est en base : chaque battement de présence des médecins est une écriture SQL",
+            hint="Utiliser Redis en production (REDIS_URL) ; DatabaseCache convient au développement.",
+            id='medicare.W001',
+        )]
+    return []
+
+
+@register()
+def check_ollama_key(app_configs, **kwargs):
+    if not is_ollama_configured():
+        return [Warning(
+            "Aucune clé d'API Ollama : le triage IA utilise uniquement l'analyse par mots-clés",
+            hint="Définir la variable d'environnement OLLAMA_API_KEY.",
+            id='medicare.W002',
+        )]
+    return []
+
+
+@register()
+def check_callback_tokens(app_configs, **kwargs):
+    tokens = get_payments_config()['CALLBACK_TOKENS']
+    missing = [operator for operator, _ in Payment.OPERATOR_CHOICES if not tokens.get(operator)]
+    if missing:
+        return [Warning(
+            f"Aucun jeton de callback pour {', '.join(missing)} : leurs callbacks sont refusés hors DEBUG",
+            hint="Définir MVOLA_CALLBACK_TOKEN, ORANGE_CALLBACK_TOKEN et AIRTEL_CALLBACK_TOKEN.",
+            id='medicare.W003',
+        )]
+    return []
@@ -0,0 +1,167 @@
+"""
+DataLoaders par requête pour regrouper les chargements des champs imbriqués GraphQL.
+
+L'exécution graphene-django est synchrone : les éléments d'une liste sont résolus
+les uns après les autres. Les resolvers de liste mettent donc en file d'attente les
+clés de toutes les lignes retournées, et le premier `load()` d'un resolver imbriqué
+charge tout le lot en une seule requête SQL.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Consultation, Doctor, Message, Patient
+
+
+def message_page_queryset(consultation_ids, since: Optional[datetime], before: Optional[datetime], first: int):
+    """Les `first` messages de chaque consultation (voir Loaders.message_page), en une requête"""
+    queryset = Message.objects.filter(consultation_id__in=consultation_ids)
+    if since is not None:
+        queryset = queryset.filter(created_at__gt=since)
+    if before is not None:
+        queryset = queryset.filter(created_at__lt=before)
+    if since is None:
+        order = [F('created_at').desc(), F('id').desc()]
+    else:
+        order = [F('created_at').asc(), F('id').asc()]
+    return queryset.annotate(
+        row_number=Window(RowNumber(), partition_by=[F('consultation_id')], order_by=order),
+    ).filter(row_number__lte=first).order_by('created_at', 'id')
+
+
+def message_stats_queryset(consultation_ids):
+    """Dernier message de chaque consultation, annoté du total (`total`) de ses messages"""
+    return Message.objects.filter(consultation_id__in=consultation_ids).annotate(
+        row_number=Window(
+            RowNumber(), partition_by=[F('consultation_id')], order_by=[F('created_at').desc(), F('id').desc()]
+        ),
+        total=Window(Count('id'), partition_by=[F('consultation_id')]),
+    ).filter(row_number=1)
+
+
+class DataLoader:
+    """Chargeur avec cache et file d'attente de clés, dépilée en un seul lot"""
+
+    def __init__(self, batch_load_fn: Callable[[List[Hashable]], Dict[Hashable, Any]], default: Any = None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache: Dict[Hashable, Any] = {}
+        self._queue: Dict[Hashable, None] = {}
+
+    def queue(self, keys: Iterable[Hashable]) -> None:
+        """Ajoute des clés au prochain lot sans déclencher de requête"""
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._queue[key] = None
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Enregistre une valeur déjà connue pour éviter de la recharger"""
+        self._cache[key] = value
+        self._queue.pop(key, None)
+
+    def load(self, key: Hashable) -> Any:
+        if key is None:
+            return self.default
+        if key not in self._cache:
+            self._queue[key] = None
+            self.dispatch()
+        return self._cache.get(key, self.default)
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        keys = list(keys)
+        self.queue(keys)
+        self.dispatch()
+        return [self._cache.get(key, self.default) for key in keys]
+
+    def dispatch(self) -> None:
+        if not self._queue:
+            return
+        keys = list(self._queue)
+        self._queue.clear()
+        results = self.batch_load_fn(keys)
+        for key in keys:
+            self._cache[key] = results.get(key, self.default)
+
+
+class Loaders:
+    """Ensemble des DataLoaders d'une requête GraphQL"""
+
+    def __init__(self):
+        self.users = DataLoader(self._load_users)
+        self.patients = DataLoader(self._load_patients)
+        self.doctors = DataLoader(self._load_doctors)
+        self.consultations = DataLoader(self._load_consultations)
+        # Statistiques des messages : (dernier message, nombre de messages) par consultation
+        self.message_stats = DataLoader(self._load_message_stats, default=(None, 0))
+        self._message_pages: Dict[Tuple, DataLoader] = {}
+        self._consultation_ids: Dict[Hashable, None] = {}
+
+    def _load_users(self, keys):
+        return User.objects.in_bulk(keys)
+
+    def _load_patients(self, keys):
+        return Patient.objects.in_bulk(keys)
+
+    def _load_doctors(self, keys):
+        doctors = Doctor.objects.in_bulk(keys)
+        self.users.queue(doctor.user_id for doctor in doctors.values())
+        return doctors
+
+    def _load_consultations(self, keys):
+        consultations = Consultation.objects.in_bulk(keys)
+        self.queue_consultations(consultations.values())
+        return consultations
+
+    def message_page(self, since: Optional[datetime], before: Optional[datetime], first: int) -> DataLoader:
+        """
+        Chargeur d'une page de messages par consultation, un par jeu d'arguments.
+
+        Avec `since` : les `first` plus anciens messages postérieurs à `since` ; sinon les
+        `first` plus récents (antérieurs à `before`). Toujours renvoyés par date croissante.
+        """
+        key = (since, before, first)
+        loader = self._message_pages.get(key)
+        if loader is None:
+            loader = DataLoader(lambda keys: self._load_message_page(keys, since, before, first), default=[])
+            loader.queue(self._consultation_ids)
+            self._message_pages[key] = loader
+        return loader
+
+    def _load_message_page(self, keys, since, before, first):
+        grouped = defaultdict(list)
+        for message in message_page_queryset(keys, since, before, first):
+            grouped[message.consultation_id].append(message)
+        return grouped
+
+    def _load_message_stats(self, keys):
+        return {message.consultation_id: (message, message.total) for message in message_stats_queryset(keys)}
+
+    # Mise en file des clés liées aux lignes retournées par les resolvers de liste
+
+    def queue_doctors(self, doctors: Iterable[Doctor]) -> None:
+        for doctor in doctors:
+            self.doctors.prime(doctor.id, doctor)
+            self.users.queue([doctor.user_id])
+
+    def queue_consultations(self, consultations: Iterable[Consultation]) -> None:
+        for consultation in consultations:
+            self.consultations.prime(consultation.id, consultation)
+            self.doctors.queue([consultation.doctor_id])
+            self.patients.queue([consultation.patient_id])
+            self._consultation_ids[consultation.id] = None
+            self.message_stats.queue([consultation.id])
+            for loader in self._message_pages.values():
+                loader.queue([consultation.id])
+
+
+def get_loaders(info) -> Loaders:
+    """Retourne les DataLoaders attachés au contexte de la requête, créés à la demande"""
+    loaders: Optional[Loaders] = getattr(info.context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        info.context.loaders = loaders
+    return loaders
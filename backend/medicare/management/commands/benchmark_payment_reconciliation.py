@@ -0,0 +1,117 @@
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from medicare.management.commands.reconcile_payments import settlement_rows
+from medicare.models import Consultation, Payment
+from medicare.services.payment_reconciliation import REPORT_COLUMNS, Reconciler
+
+OPERATORS = ['mvola', 'orange', 'airtel']
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le débit de reconcile_payments sur des données synthétiques '
+        '(paiements et fichier de règlement générés, annulés en fin de mesure)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Lignes du fichier de règlement')
+        parser.add_argument(
+            '--chunk-sizes', type=str, default='1000,5000',
+            help='Tailles de tranches à tester, séparées par des virgules'
+        )
+        parser.add_argument('--discrepancies', type=float, default=0.02, help='Part des lignes en écart')
+        parser.add_argument(
+            '--memory', action='store_true',
+            help='Mesure aussi le pic de mémoire Python (tracemalloc, ralentit la mesure)'
+        )
+
+    def handle(self, *args, **options):
+        consultation = Consultation.objects.select_related('doctor').first()
+        if consultation is None:
+            raise CommandError('Aucune consultation : lancez d\'abord create_test_data')
+        chunk_sizes = [int(value) for value in options['chunk_sizes'].split(',') if value.strip()]
+        directory = tempfile.mkdtemp(prefix='reconcile-bench-')
+        settlement_path = os.path.join(directory, 'settlement.csv')
+        self._write_settlement(settlement_path, options['rows'], options['discrepancies'])
+        self.stdout.write(f"Fichier synthétique : {options['rows']} lignes, {os.path.getsize(settlement_path) / 1e6:.1f} Mo")
+
+        try:
+            for chunk_size in chunk_sizes:
+                # Chaque mesure repart des mêmes paiements en attente, annulés ensuite
+                with transaction.atomic():
+                    self._create_payments(consultation, options['rows'])
+                    self._measure(settlement_path, directory, chunk_size, options['memory'])
+                    transaction.set_rollback(True)
+        finally:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+        self.stdout.write(self.style.SUCCESS('✓ Mesure terminée, données synthétiques supprimées'))
+
+    def _reference(self, index):
+        return f'BENCH-{index:09d}'
+
+    def _write_settlement(self, path, rows, discrepancies):
+        rng = random.Random(42)
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['transaction_id', 'amount', 'status', 'operator'])
+            for index in range(rows):
+                reference, amount = self._reference(index), '10000.00'
+                if rng.random() < discrepancies:
+                    # Écarts : référence inconnue, montant différent ou ligne en double
+                    kind = rng.randrange(3)
+                    if kind == 0:
+                        reference = f'UNKNOWN-{uuid.uuid4().hex}'
+                    elif kind == 1:
+                        amount = '9000.00'
+                    elif index:
+                        reference = self._reference(index - 1)
+                status = 'failed' if rng.random() < 0.1 else 'success'
+                writer.writerow([reference, amount, status, OPERATORS[index % 3]])
+
+    def _create_payments(self, consultation, rows):
+        payments = (
+            Payment(
+                consultation=consultation, amount=10000, operator=OPERATORS[index % 3],
+                transaction_id=self._reference(index),
+            )
+            for index in range(rows)
+        )
+        while True:
+            batch = list(islice(payments, 5000))
+            if not batch:
+                return
+            Payment.objects.bulk_create(batch)
+
+    def _measure(self, settlement_path, directory, chunk_size, memory):
+        report_path = os.path.join(directory, f'report-{chunk_size}.csv')
+        if memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with open(settlement_path, newline='', encoding='utf-8') as settlement, \
+                open(report_path, 'w', newline='', encoding='utf-8') as report:
+            writer = csv.DictWriter(report, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            stats = Reconciler(writer.writerow, chunk_size=chunk_size).run(settlement_rows(settlement))
+        elapsed = time.perf_counter() - started
+        line = (
+            f"tranches de {chunk_size:>6} : {stats['lines'] / elapsed:>9.0f} lignes / s "
+            f"({elapsed:.2f} s, {stats['updated']} finalisés, "
+            f"{stats['lines'] - stats['updated'] - stats['ok']} écarts)"
+        )
+        if memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f', pic mémoire {peak / 1e6:.1f} Mo'
+        self.stdout.write(line)
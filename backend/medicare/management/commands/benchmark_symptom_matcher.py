@@ -0,0 +1,64 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from medicare.services.symptom_matcher import SEVERITY_LEVELS, SymptomMatcher, get_symptom_matcher
+
+SAMPLE_TEXTS = [
+    "J'ai des maux de tête et une grande fatigue depuis hier soir",
+    "Douleur à la poitrine qui irradie dans le bras gauche, difficulté à respirer",
+    "Fièvre élevée, vomissements répétés et diarrhée depuis trois jours",
+    "Marary loha sy reraka be, tazo kely amin'ny alina",
+    "Je me sens bien mais je voudrais un avis sur une petite éruption cutanée au bras",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le temps de classification du moteur de triage par mots-clés selon la taille du lexique '
+        '(lexique livré d\'environ 140 phrases, lexiques synthétiques pour les milliers de phrases)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            help='Tailles de lexiques synthétiques à tester, séparées par des virgules',
+            default='1000,10000,50000'
+        )
+        parser.add_argument(
+            '--number',
+            type=int,
+            help='Nombre de classifications mesurées par lexique',
+            default=2000
+        )
+
+    def _synthetic_matcher(self, base, size, rng):
+        # Phrases synthétiques de 1 à 3 mots, à partir du vocabulaire du lexique réel
+        vocabulary = sorted({token for phrase in base.phrases for token in phrase.split()})
+        entries = [(phrase, severity, weight) for phrase, (severity, weight) in base.phrases.items()]
+        while len(entries) < size:
+            words = [rng.choice(vocabulary) + rng.choice(['', 'a', 'o', 'y', 'ka', 'na']) for _ in range(rng.randint(1, 3))]
+            entries.append((' '.join(words), rng.choice(SEVERITY_LEVELS), 1.0))
+        return SymptomMatcher(entries)
+
+    def _measure(self, label, matcher, number):
+        count = 0
+
+        def run():
+            nonlocal count
+            matcher.classify(SAMPLE_TEXTS[count % len(SAMPLE_TEXTS)])
+            count += 1
+
+        seconds = min(timeit.repeat(run, number=number, repeat=3))
+        self.stdout.write(f'{label:>24} : {len(matcher):>7} phrases, {seconds / number * 1e6:8.1f} µs / texte')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        number = options['number']
+        base = get_symptom_matcher()
+        
+        self._measure('lexique de production', base, number)
+        for size in (int(value) for value in options['sizes'].split(',') if value.strip()):
+            self._measure('lexique synthétique', self._synthetic_matcher(base, size, rng), number)
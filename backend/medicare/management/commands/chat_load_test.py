@@ -0,0 +1,97 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from medicare.channel_layer import consultation_group, get_chat_config
+from medicare.chat import CLOSE_TOO_SLOW, pump
+from medicare.services.percentiles import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Charge le chat en mémoire : nombreuses consultations simultanées, diffusion aux clients '
+        'connectés et clients lents (contre-pression), sans serveur ni base de données'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consultations', type=int, default=1000, help='Consultations simultanées')
+        parser.add_argument('--clients', type=int, default=2, help='Clients connectés par consultation')
+        parser.add_argument('--messages', type=int, default=20, help='Messages envoyés par consultation')
+        parser.add_argument(
+            '--interval', type=float, default=0.01,
+            help='Secondes entre deux messages d\'une consultation (0 : en rafale)'
+        )
+        parser.add_argument('--slow-clients', type=float, default=0.0, help='Part des clients lents (0 à 1)')
+        parser.add_argument('--slow-delay', type=float, default=0.05, help='Temps d\'envoi d\'une trame à un client lent')
+        parser.add_argument('--queue-size', type=int, help='File par client (défaut : CHAT[\'QUEUE_SIZE\'])')
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        config = get_chat_config()
+        layer = import_string(config['CHANNEL_LAYER'])(queue_size=options['queue_size'] or config['QUEUE_SIZE'])
+        rng = random.Random(42)
+        latencies = []
+        closed = 0
+
+        def make_send(slow):
+            async def send(event):
+                nonlocal closed
+                if event['type'] == 'websocket.close':
+                    if event['code'] == CLOSE_TOO_SLOW:
+                        closed += 1
+                    return
+                if slow:
+                    await asyncio.sleep(options['slow_delay'])
+                latencies.append(time.perf_counter() - json.loads(event['text'])['message']['sentAt'])
+            return send
+
+        groups = [consultation_group(uuid.uuid4()) for _ in range(options['consultations'])]
+        subscriptions, pumps = [], []
+        for group in groups:
+            for _ in range(options['clients']):
+                subscription = layer.subscribe(group)
+                subscriptions.append(subscription)
+                slow = rng.random() < options['slow_clients']
+                pumps.append(asyncio.ensure_future(pump(subscription, make_send(slow))))
+
+        async def publisher(group):
+            await asyncio.sleep(rng.random() * options['interval'])
+            for _ in range(options['messages']):
+                layer.publish(group, {'type': 'message', 'message': {
+                    'id': uuid.uuid4().hex, 'content': 'Bonjour docteur', 'sentAt': time.perf_counter(),
+                }})
+                await asyncio.sleep(options['interval'])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(publisher(group) for group in groups))
+        # Attendre que les files des clients encore connectés soient vidées
+        while any(not subscription.queue.empty() for subscription in subscriptions):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+        for task in pumps:
+            task.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+
+        published = layer.stats['published']
+        self.stdout.write(
+            f"{options['consultations']} consultations, {len(subscriptions)} connexions, "
+            f"{published} messages publiés en {elapsed:.2f} s"
+        )
+        self.stdout.write(f'Trames transmises : {len(latencies)} ({len(latencies) / elapsed:.0f} / s)')
+        if latencies:
+            self.stdout.write(
+                'Latence de diffusion : '
+                f'p50 {percentile(latencies, 50) * 1000:.2f} ms, '
+                f'p99 {percentile(latencies, 99) * 1000:.2f} ms, '
+                f'max {max(latencies) * 1000:.2f} ms'
+            )
+        self.stdout.write(f'Clients fermés pour lenteur (4008) : {closed}')
+        self.stdout.write(self.style.SUCCESS('✓ Test de charge terminé'))
@@ -0,0 +1,123 @@
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from medicare.loaders import message_page_queryset, message_stats_queryset
+from medicare.models import (
+    AITriage, Consultation, Doctor, JournalEntry, Payment, Reminder, ReminderOccurrence, SyncTombstone,
+)
+from medicare.pagination import page_queryset
+from medicare.services.payments import pending_payments
+from medicare.services.reminder_scheduler import _claimable
+
+
+def hot_queries():
+    """
+    Requêtes des resolvers et tâches les plus sollicités (valeurs factices), avec l'index
+    que chacune doit utiliser : nom de l'index, ou colonne d'un champ unique (index implicite).
+    """
+    some_id = uuid.uuid4()
+    now = timezone.now()
+    today = timezone.localdate()
+    return [
+        # sync_doctor_presence : médecins marqués en ligne qui ne le sont plus
+        ('médecins en ligne (is_online)', Doctor.objects.filter(is_online=True).exclude(pk__in=[some_id]),
+         'doctors_online_rating_idx'),
+        ('pendingDoctorsConnection', page_queryset(Doctor.objects.filter(is_approved=False), ('-created_at',)),
+         'doctors_pending_created_idx'),
+        ('reminders', Reminder.objects.filter(patient_id=some_id).order_by('date', 'time'),
+         'reminders_patient_due_idx'),
+        ('refresh_reminder_occurrences', Reminder.objects.filter(is_active=True, date__lte=today),
+         'reminders_active_due_idx'),
+        ('reminderOccurrences', ReminderOccurrence.objects.filter(
+            patient_id=some_id, due_at__gte=now, due_at__lt=now + timedelta(days=7),
+        ).order_by('due_at'), 'occurrences_patient_due_idx'),
+        ('échéances à réserver (run_reminder_scheduler)', ReminderOccurrence.objects.filter(
+            _claimable(now), due_at__lte=now,
+        ).order_by('due_at'), 'occurrences_pending_due_idx'),
+        ('journalEntriesConnection', page_queryset(JournalEntry.objects.filter(patient_id=some_id), ('-created_at',)),
+         'journal_patient_created_idx'),
+        ('journalEntries(date)', JournalEntry.objects.filter(patient_id=some_id, date=today).order_by('-created_at'),
+         'journal_patient_date_idx'),
+        ('consultationsConnection (patient)', page_queryset(
+            Consultation.objects.filter(patient_id=some_id, status='active'), ('-created_at',),
+        ), 'consult_patient_status_idx'),
+        ('consultationsConnection (médecin)', page_queryset(
+            Consultation.objects.filter(doctor_id=some_id, status='active'), ('-created_at',),
+        ), 'consult_doctor_status_idx'),
+        ('messages', message_page_queryset([some_id], None, None, 50), 'messages_consult_created_idx'),
+        ('messages(since)', message_page_queryset([some_id], now, None, 50), 'messages_consult_created_idx'),
+        ('latestMessage / messageCount', message_stats_queryset([some_id]), 'messages_consult_created_idx'),
+        ('aiTriagesConnection', page_queryset(AITriage.objects.filter(patient_id=some_id), ('-created_at',)),
+         'ai_triages_patient_idx'),
+        ('file des triages', AITriage.objects.filter(status='pending').order_by('created_at'),
+         'ai_triages_status_created_idx'),
+        ('sync (rappels)', Reminder.objects.filter(patient_id=some_id, sync_version__gt=0).order_by('sync_version'),
+         'reminders_patient_sync_idx'),
+        ('sync (suppressions)', SyncTombstone.objects.filter(
+            patient_id=some_id, sync_version__gt=0,
+        ).order_by('sync_version'), 'tombstones_patient_sync_idx'),
+        ('paymentsConnection', page_queryset(Payment.objects.all(), ('-created_at',)), 'payments_created_idx'),
+        ('paymentsConnection(status)', page_queryset(Payment.objects.filter(status='pending'), ('-created_at',)),
+         'payments_status_created_idx'),
+        ('callbacks de paiement', pending_payments(
+            Payment.objects.filter(operator='mvola', transaction_id__in=['MVOLA-1', 'MVOLA-2']),
+        ), 'transaction_id'),
+    ]
+
+
+def explain(queryset) -> str:
+    # QuerySet.explain() ne sait pas expliquer les filtres sur fonctions de fenêtre
+    # (sous-requête "qualify") : la requête compilée est expliquée directement
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def uses_index(plan: str, index: str) -> bool:
+    """Vrai si une ligne du plan parcourt `index` (SQLite : "USING INDEX", PostgreSQL : "Index Scan"...)"""
+    return any('INDEX' in line.upper() and index.lower() in line.lower() for line in plan.splitlines())
+
+
+@contextmanager
+def prefer_indexes():
+    # Sur une base peu remplie, PostgreSQL préfère un parcours séquentiel :
+    # on le désactive pour vérifier que l'index est utilisable
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        yield
+
+
+class Command(BaseCommand):
+    help = 'Exécute EXPLAIN sur les requêtes des resolvers et vérifie qu\'elles utilisent leur index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Affiche le plan complet de chaque requête'
+        )
+
+    def handle(self, *args, **options):
+        missing = []
+        
+        with prefer_indexes():
+            for label, queryset, index in hot_queries():
+                plan = explain(queryset)
+                if uses_index(plan, index):
+                    self.stdout.write(self.style.SUCCESS(f'✓ {label} ({index})'))
+                else:
+                    missing.append(label)
+                    self.stdout.write(self.style.ERROR(f'✗ {label} : {index} non utilisé'))
+                if options['verbose_plans']:
+                    self.stdout.write(f'    {plan}')
+        
+        if missing:
+            raise CommandError(f"{len(missing)} requête(s) sans leur index : {', '.join(missing)}")
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from medicare.services.patient_sync import purge_tombstones, tombstone_retention
+
+
+class Command(BaseCommand):
+    help = 'Purge les suppressions (tombstones) déjà anciennes de la synchronisation mobile (à lancer chaque jour)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Conserve les tombstones plus récents que ce nombre de jours',
+            default=tombstone_retention().days
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'✓ {deleted} tombstone(s) purgé(s)'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from medicare.services.admin_stats import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs du tableau de bord admin (COUNT ... GROUP BY) et corrige leur dérive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Intervalle (secondes) entre deux rapprochements',
+            default=3600
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Rapproche une fois puis s\'arrête'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            drift = reconcile_counters()
+            close_old_connections()
+            for key, (stored, actual) in sorted(drift.items()):
+                self.stdout.write(f'  {key} : {stored} → {actual}')
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(drift)} compteur(s) corrigé(s)'))
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import time
+from datetime import datetime, time as time_of_day, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from medicare.services.payment_reconciliation import DEFAULT_CHUNK_SIZE, REPORT_COLUMNS, Reconciler
+from medicare.services.payments import is_operator
+
+
+def open_settlement(path):
+    # Les fichiers compressés sont lus en flux, sans décompression préalable
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8-sig')
+    return open(path, newline='', encoding='utf-8-sig')
+
+
+def settlement_rows(handle):
+    reader = csv.DictReader(handle)
+    for row in reader:
+        yield reader.line_num, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Rapproche les paiements d\'un fichier de règlement CSV d\'opérateur '
+        '(transaction_id, amount, status[, operator]) et écrit un rapport des écarts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Fichier de règlement (.csv ou .csv.gz)')
+        parser.add_argument('--operator', help='Opérateur du fichier (mvola, orange, airtel)')
+        parser.add_argument('--report', help='Rapport des écarts (défaut : <fichier>.discrepancies.csv)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Lignes traitées par requête groupée'
+        )
+        parser.add_argument(
+            '--date',
+            help='Journée réglée (AAAA-MM-JJ) : signale aussi les paiements de ce jour absents du fichier'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='N\'écrit rien en base (références retrouvées gardées en mémoire pour les doublons)'
+        )
+
+    def handle(self, *args, **options):
+        operator = options['operator']
+        if operator is not None and not is_operator(operator):
+            raise CommandError(f'Opérateur inconnu : {operator}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size doit être positif')
+        period = None
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Date invalide : {options['date']}")
+            start = timezone.make_aware(datetime.combine(day, time_of_day.min))
+            period = (start, start + timedelta(days=1))
+
+        report_path = options['report'] or f"{options['file']}.discrepancies.csv"
+        started = time.perf_counter()
+        try:
+            settlement = open_settlement(options['file'])
+        except OSError as error:
+            raise CommandError(f'Fichier illisible : {error}')
+        with settlement, open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+            writer = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            reconciler = Reconciler(
+                writer.writerow, operator=operator, chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+            )
+            stats = reconciler.run(settlement_rows(settlement))
+            if period is not None:
+                reconciler.report_missing(*period)
+        elapsed = time.perf_counter() - started
+
+        issues = {key: value for key, value in stats.items() if key not in ('lines', 'matched', 'updated', 'ok')}
+        self.stdout.write(
+            f"{stats['lines']} lignes en {elapsed:.2f} s ({stats['lines'] / max(elapsed, 1e-9):.0f} lignes / s) : "
+            f"{stats['matched']} paiements retrouvés, {stats['updated']} finalisés, {stats['ok']} déjà conformes"
+        )
+        for issue, count in sorted(issues.items()):
+            self.stdout.write(f'  {issue} : {count}')
+        prefix = '(simulation) ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {prefix}{sum(issues.values())} écart(s) écrit(s) dans {report_path}'
+        ))
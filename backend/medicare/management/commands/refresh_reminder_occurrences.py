@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from medicare.models import ReminderOccurrence
+from medicare.services.reminder_occurrences import HORIZON_DAYS, extend_horizon
+
+
+class Command(BaseCommand):
+    help = 'Fait glisser la fenêtre des échéances de rappels matérialisées (à lancer chaque jour)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            help='Nombre de jours d\'échéances à matérialiser',
+            default=HORIZON_DAYS
+        )
+        parser.add_argument(
+            '--purge-before-days',
+            type=int,
+            help='Supprime les échéances envoyées plus anciennes que ce nombre de jours',
+            default=30
+        )
+
+    def handle(self, *args, **options):
+        processed = extend_horizon(options['horizon_days'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {processed} échéance(s) à venir matérialisée(s)'))
+        
+        cutoff = timezone.now() - timedelta(days=options['purge_before_days'])
+        deleted, _ = ReminderOccurrence.objects.filter(is_dispatched=True, due_at__lt=cutoff).delete()
+        if deleted:
+            self.stdout.write(f'✓ {deleted} échéance(s) envoyée(s) purgée(s)')
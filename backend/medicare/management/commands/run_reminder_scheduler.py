@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from medicare.services.reminder_scheduler import ReminderScheduler, overdue_backlog
+
+
+class Command(BaseCommand):
+    help = 'Envoie les rappels à leur échéance (plusieurs processus possibles en parallèle)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Nombre d\'échéances réclamées ou envoyées par requête',
+            default=500
+        )
+        parser.add_argument(
+            '--lookahead',
+            type=float,
+            help='Fenêtre (secondes) des échéances réclamées à l\'avance',
+            default=60
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Intervalle (secondes) entre deux réclamations',
+            default=5
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=float,
+            help='Intervalle (secondes) entre deux affichages des métriques de retard',
+            default=60
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Envoie les échéances déjà dues puis s\'arrête'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            batch_size=max(1, options['batch_size']),
+            lookahead=0 if options['once'] else options['lookahead'],
+            poll_interval=options['poll_interval'],
+        )
+        self.stdout.write(f'Planificateur de rappels démarré ({scheduler.worker_id})')
+        
+        if options['once']:
+            while scheduler.claim():
+                scheduler.dispatch_due()
+            self._report(scheduler)
+            return
+        
+        next_report = time.monotonic() + options['stats_interval']
+        try:
+            while True:
+                time.sleep(scheduler.run_once())
+                if time.monotonic() >= next_report:
+                    self._report(scheduler)
+                    next_report = time.monotonic() + options['stats_interval']
+        except KeyboardInterrupt:
+            pass
+        
+        self._report(scheduler)
+        self.stdout.write(self.style.SUCCESS('Planificateur de rappels arrêté'))
+
+    def _report(self, scheduler):
+        stats = scheduler.stats()
+        
+        def seconds(value):
+            return '-' if value is None else f'{value:.2f}s'
+        
+        self.stdout.write(
+            f"✓ {stats['dispatched']} rappel(s) envoyé(s), {stats['queued']} en attente, "
+            f"retard p50={seconds(stats['lag_p50'])} p99={seconds(stats['lag_p99'])} "
+            f"max={seconds(stats['lag_max'])}, {overdue_backlog()} échéance(s) en retard"
+        )
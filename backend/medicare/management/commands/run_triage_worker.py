@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from medicare.services.triage_jobs import claim_triages, process_triage
+
+
+def _process(triage_id):
+    try:
+        process_triage(triage_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Traite les triages IA en attente (file stockée en base, plusieurs workers possibles)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Nombre d\'appels Ollama simultanés',
+            default=4
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Attente (secondes) quand la file est vide',
+            default=1.0
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Traite les triages en attente puis s\'arrête'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        
+        self.stdout.write(f'Worker de triage IA démarré ({concurrency} threads)')
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-triage') as executor:
+            while True:
+                triage_ids = claim_triages(concurrency)
+                close_old_connections()
+                
+                if triage_ids:
+                    # Attendre la fin du lot avant d'en réclamer un autre
+                    list(executor.map(_process, triage_ids))
+                    self.stdout.write(f'✓ {len(triage_ids)} triage(s) traité(s)')
+                    continue
+                
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+        
+        self.stdout.write(self.style.SUCCESS('Worker de triage IA arrêté'))
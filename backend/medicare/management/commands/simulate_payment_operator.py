@@ -0,0 +1,128 @@
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from medicare.models import Consultation, Payment, PaymentCallback
+from medicare.services.admin_stats import apply_deltas, counter_key
+from medicare.services.payments import get_payments_config
+
+
+class Command(BaseCommand):
+    help = (
+        'Simule les opérateurs mobile money : crée des paiements en attente puis envoie leurs '
+        'callbacks par rafales, avec doublons, et vérifie les statuts finaux'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=2000, help='Paiements simulés')
+        parser.add_argument('--batch', type=int, default=50, help='Callbacks par requête')
+        parser.add_argument('--duplicates', type=float, default=0.3, help='Part de callbacks renvoyés en double')
+        parser.add_argument('--failure-rate', type=float, default=0.1, help='Part des paiements échoués')
+        parser.add_argument(
+            '--url',
+            help='Serveur à appeler (ex. http://localhost:8000) ; par défaut, requêtes en processus'
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Envois simultanés (avec --url)')
+        parser.add_argument('--keep', action='store_true', help='Conserver les paiements simulés et leurs callbacks')
+
+    def handle(self, *args, **options):
+        consultations = list(Consultation.objects.select_related('doctor').order_by('created_at')[:100])
+        if not consultations:
+            raise CommandError('Aucune consultation : lancez d\'abord create_test_data')
+        rng = random.Random(42)
+        prefix = f'SIM-{uuid.uuid4().hex[:8]}-'
+
+        payments = []
+        for index in range(options['payments']):
+            consultation = rng.choice(consultations)
+            payments.append(Payment(
+                consultation=consultation,
+                amount=consultation.doctor.price,
+                operator=rng.choice(['mvola', 'orange', 'airtel']),
+                transaction_id=f'{prefix}{index}',
+            ))
+        Payment.objects.bulk_create(payments, batch_size=500)
+        # bulk_create n'émet pas de signaux : compteurs de adminStats ajustés ici
+        apply_deltas({
+            counter_key(Payment): len(payments),
+            counter_key(Payment, 'status', 'pending'): len(payments),
+        })
+
+        expected = {}
+        callbacks = []
+        for payment in payments:
+            status = 'failed' if rng.random() < options['failure_rate'] else 'success'
+            expected[payment.transaction_id] = status
+            callback = (payment.operator, {'transactionId': payment.transaction_id, 'status': status})
+            callbacks.append(callback)
+            if rng.random() < options['duplicates']:
+                callbacks.append(callback)
+        rng.shuffle(callbacks)
+
+        batches = []
+        for operator in ('mvola', 'orange', 'airtel'):
+            items = [item for name, item in callbacks if name == operator]
+            for start in range(0, len(items), options['batch']):
+                batches.append((operator, items[start:start + options['batch']]))
+        rng.shuffle(batches)
+
+        totals = Counter()
+        started = time.perf_counter()
+        if options['url']:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                for result in executor.map(lambda batch: self._post_http(options['url'], *batch), batches):
+                    totals.update(result)
+        else:
+            client = Client()
+            for operator, items in batches:
+                totals.update(self._post(client, operator, items))
+        elapsed = time.perf_counter() - started
+
+        simulated = Payment.objects.filter(transaction_id__startswith=prefix)
+        final = dict(simulated.values_list('transaction_id', 'status'))
+        mismatches = sum(1 for reference, status in expected.items() if final.get(reference) != status)
+
+        self.stdout.write(
+            f"{len(callbacks)} callbacks ({len(callbacks) - len(payments)} doublons) en {len(batches)} requêtes, "
+            f"{elapsed:.2f} s ({len(callbacks) / elapsed * 60:.0f} / min)"
+        )
+        self.stdout.write(
+            f"Appliqués : {totals['applied']} (succès {totals['success']}, échecs {totals['failed']}), "
+            f"ignorés : {totals['ignored']}, inconnus : {totals['unknown']}, invalides : {totals['invalid']}"
+        )
+        if not options['keep']:
+            simulated.delete()
+            PaymentCallback.objects.filter(transaction_id__startswith=prefix).delete()
+        if mismatches:
+            raise CommandError(f'{mismatches} paiements dans un statut inattendu')
+        self.stdout.write(self.style.SUCCESS('✓ Tous les paiements simulés ont leur statut final'))
+
+    def _headers(self, operator):
+        token = get_payments_config()['CALLBACK_TOKENS'].get(operator)
+        return {'X-Callback-Token': token} if token else {}
+
+    def _post(self, client, operator, items):
+        response = client.post(
+            f'/payments/callback/{operator}/', json.dumps({'callbacks': items}),
+            content_type='application/json', headers=self._headers(operator),
+        )
+        if response.status_code != 200:
+            raise CommandError(f'Callback refusé ({response.status_code}) : {response.content.decode()}')
+        return response.json()
+
+    def _post_http(self, url, operator, items):
+        request = Request(
+            f"{url.rstrip('/')}/payments/callback/{operator}/",
+            data=json.dumps({'callbacks': items}).encode('utf-8'),
+            headers={'Content-Type': 'application/json', **self._headers(operator)},
+            method='POST',
+        )
+        with urlopen(request, timeout=30) as response:
+            return json.loads(response.read())
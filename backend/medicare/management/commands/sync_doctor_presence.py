@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from medicare.checks import PROCESS_LOCAL_CACHES
+from medicare.services.presence import sync_presence_to_database
+
+
+class Command(BaseCommand):
+    help = 'Recopie la présence des médecins (cache) dans Doctor.is_online, en masse'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Intervalle (secondes) entre deux synchronisations',
+            default=60
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Synchronise une fois puis s\'arrête'
+        )
+        parser.add_argument(
+            '--local-cache',
+            action='store_true',
+            help='Autorise un cache local au processus (tests)'
+        )
+
+    def handle(self, *args, **options):
+        if settings.CACHES['shared']['BACKEND'] in PROCESS_LOCAL_CACHES and not options['local_cache']:
+            # Les battements reçus par le serveur web sont invisibles depuis ce processus
+            raise CommandError(
+                "Le cache 'shared' est local au processus : configurez un cache partagé "
+                "(DatabaseCache, Redis) pour synchroniser la présence"
+            )
+        
+        while True:
+            stats = sync_presence_to_database()
+            close_old_connections()
+            if stats['went_online'] or stats['went_offline'] or options['once']:
+                self.stdout.write(
+                    f"✓ {stats['online']} médecin(s) en ligne "
+                    f"(+{stats['went_online']} / -{stats['went_offline']})"
+                )
+            if options['once']:
+                break
+            time.sleep(options['interval'])
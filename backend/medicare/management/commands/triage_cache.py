@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from medicare.services.analysis_cache import get_analysis_cache_stats, invalidate_analysis_cache
+
+
+class Command(BaseCommand):
+    help = 'Affiche les statistiques du cache des analyses IA ou l\'invalide'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invalidate',
+            action='store_true',
+            help='Invalide toutes les analyses en cache'
+        )
+
+    def handle(self, *args, **options):
+        if options['invalidate']:
+            invalidate_analysis_cache()
+            self.stdout.write(self.style.SUCCESS('✓ Cache des analyses IA invalidé'))
+        
+        stats = get_analysis_cache_stats()
+        total = stats['hits'] + stats['misses']
+        hit_rate = (stats['hits'] / total * 100) if total else 0
+        self.stdout.write(f"Hits: {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Taux de hit: {hit_rate:.1f}%")
+        self.stdout.write(f"Génération: {stats['generation']}")
@@ -0,0 +1,227 @@
+"""
+Métriques GraphQL en mémoire du processus, exposées au format texte Prometheus (`/metrics`).
+
+Chaque opération échantillonnée (`GRAPHQL_METRICS_SAMPLE_RATE`) alimente des histogrammes :
+durée de l'opération, nombre et durée des requêtes SQL, complexité (nombre de champs
+sélectionnés) et temps de chaque résolveur. Les compteurs d'opérations et d'erreurs
+portent sur toutes les requêtes. Avec plusieurs processus, chaque processus expose
+ses propres valeurs (Prometheus agrège par instance).
+"""
+import random
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FIELD_DURATION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+INF_LABEL = 'le="+Inf"'
+
+# Noms d'opération choisis par les clients : au-delà, regroupés sous "other"
+MAX_OPERATION_LABELS = 200
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Histogramme cumulatif à seaux fixes, une série par combinaison d'étiquettes"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [compte par seau (+Inf en dernier), somme, total]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _labels(self.label_names, labels, f'le="{_format(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, INF_LABEL)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {_format(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {_format(value)}')
+        return lines
+
+
+OPERATIONS = Counter('graphql_operations_total', 'Opérations GraphQL reçues', ('operation', 'type'))
+ERRORS = Counter('graphql_errors_total', 'Opérations GraphQL terminées avec des erreurs', ('operation', 'type'))
+OPERATION_DURATION = Histogram(
+    'graphql_operation_duration_seconds', 'Durée des opérations GraphQL échantillonnées',
+    ('operation', 'type'), DURATION_BUCKETS,
+)
+SQL_QUERIES = Histogram(
+    'graphql_operation_sql_queries', 'Requêtes SQL par opération GraphQL échantillonnée',
+    ('operation', 'type'), COUNT_BUCKETS,
+)
+SQL_DURATION = Histogram(
+    'graphql_operation_sql_duration_seconds', 'Temps SQL cumulé par opération GraphQL échantillonnée',
+    ('operation', 'type'), DURATION_BUCKETS,
+)
+COMPLEXITY = Histogram(
+    'graphql_operation_complexity', 'Nombre de champs sélectionnés par opération GraphQL échantillonnée',
+    ('operation', 'type'), COUNT_BUCKETS,
+)
+FIELD_DURATION = Histogram(
+    'graphql_field_resolve_duration_seconds', 'Temps des résolveurs GraphQL (opérations échantillonnées)',
+    ('field',), FIELD_DURATION_BUCKETS,
+)
+
+REGISTRY = (OPERATIONS, ERRORS, OPERATION_DURATION, SQL_QUERIES, SQL_DURATION, COMPLEXITY, FIELD_DURATION)
+
+_operation_labels = set()
+_operation_labels_lock = Lock()
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def sample_rate() -> float:
+    return getattr(settings, 'GRAPHQL_METRICS_SAMPLE_RATE', 1.0)
+
+
+def operation_label(name: Optional[str]) -> str:
+    """Nom d'opération utilisable comme étiquette (cardinalité bornée)"""
+    if not name:
+        return 'anonymous'
+    with _operation_labels_lock:
+        if name in _operation_labels:
+            return name
+        if len(_operation_labels) < MAX_OPERATION_LABELS:
+            _operation_labels.add(name)
+            return name
+    return 'other'
+
+
+def selection_complexity(selection_set, fragments, visited=None) -> int:
+    """Nombre de champs sélectionnés, fragments développés"""
+    if selection_set is None:
+        return 0
+    visited = visited if visited is not None else set()
+    total = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            total += 1 + selection_complexity(selection.selection_set, fragments, visited)
+        elif isinstance(selection, InlineFragmentNode):
+            total += selection_complexity(selection.selection_set, fragments, visited)
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = fragments.get(name)
+            if fragment is not None and name not in visited:
+                total += selection_complexity(fragment.selection_set, fragments, visited | {name})
+    return total
+
+
+class OperationMetrics:
+    """
+    Mesures d'une opération, attachées au contexte de la requête.
+
+    Le nom et le type de l'opération sont toujours relevés ; durées, requêtes SQL,
+    complexité et temps des résolveurs seulement si l'opération est échantillonnée.
+    """
+
+    def __init__(self, sampled: bool):
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.seen_operation = False
+        self.operation_name: Optional[str] = None
+        self.operation_type = 'query'
+        self.complexity: Optional[int] = None
+        self.sql_queries = 0
+        self.sql_duration = 0.0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        """Wrapper pour `connection.execute_wrapper` : compte et chronomètre les requêtes"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_queries += 1
+            self.sql_duration += time.perf_counter() - started
+
+    def set_operation(self, operation, fragments) -> None:
+        self.seen_operation = True
+        self.operation_name = operation.name.value if operation.name else None
+        self.operation_type = operation.operation.value
+        if self.sampled:
+            self.complexity = selection_complexity(operation.selection_set, fragments)
+
+
+def should_sample() -> bool:
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def record_operation(metrics: OperationMetrics, operation_name: Optional[str], has_errors: bool) -> None:
+    """Enregistre une opération terminée (`operation_name` : nom transmis par le client)"""
+    labels = (operation_label(metrics.operation_name or operation_name), metrics.operation_type)
+    OPERATIONS.inc(*labels)
+    if has_errors:
+        ERRORS.inc(*labels)
+    if not metrics.sampled:
+        return
+    OPERATION_DURATION.observe(time.perf_counter() - metrics.started, *labels)
+    SQL_QUERIES.observe(metrics.sql_queries, *labels)
+    SQL_DURATION.observe(metrics.sql_duration, *labels)
+    if metrics.complexity is not None:
+        COMPLEXITY.observe(metrics.complexity, *labels)
@@ -1,4 +1,8 @@
 import logging
+import time
+
+from .actor import get_actor
+from .metrics import FIELD_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -12,3 +16,36 @@ class GraphQLErrorMiddleware:
             logger.error(f"GraphQL Error: {str(e)}", exc_info=True)
             raise
 
+
+
+class ActorMiddleware:
+    """Middleware qui attache l'acteur (patient/médecin/admin) au contexte de la requête"""
+
+    def resolve(self, next, root, info, **args):
+        if root is None:
+            # Champs racine uniquement : l'acteur est ensuite partagé par tout le document
+            get_actor(info)
+        return next(root, info, **args)
+
+
+class InstrumentationMiddleware:
+    """
+    Middleware qui relève l'opération (nom, type, complexité) et le temps de chaque résolveur.
+
+    Les mesures sont portées par `request.graphql_metrics`, créé par InstrumentedGraphQLView ;
+    le temps des résolveurs n'est mesuré que pour les opérations échantillonnées.
+    """
+
+    def resolve(self, next, root, info, **args):
+        metrics = getattr(info.context, 'graphql_metrics', None)
+        if metrics is None:
+            return next(root, info, **args)
+        if root is None and not metrics.seen_operation:
+            metrics.set_operation(info.operation, info.fragments)
+        if not metrics.sampled:
+            return next(root, info, **args)
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            FIELD_DURATION.observe(time.perf_counter() - started, f'{info.parent_type.name}.{info.field_name}')
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0004_reminder_end_date_reminder_frequency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aitriage',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aitriage',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aitriage',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Les triages existants ont déjà été analysés de façon synchrone
+        migrations.AddField(
+            model_name='aitriage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='aitriage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='aitriage',
+            index=models.Index(fields=['status', 'created_at'], name='ai_triages_status_created_idx'),
+        ),
+    ]
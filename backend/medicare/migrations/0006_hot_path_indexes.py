@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0005_aitriage_job_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aitriage',
+            index=models.Index(fields=['patient', '-created_at'], name='ai_triages_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['patient', 'status', '-created_at'], name='consult_patient_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['doctor', 'status', '-created_at'], name='consult_doctor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(condition=models.Q(('is_online', True)), fields=['-rating', 'name'], name='doctors_online_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['-created_at'], name='doctors_pending_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['patient', 'date', '-created_at'], name='journal_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['patient', '-created_at'], name='journal_patient_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['consultation', 'created_at'], name='messages_consult_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otpcode',
+            index=models.Index(fields=['phone', 'is_used', 'expires_at'], name='otp_phone_valid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['patient', 'date', 'time'], name='reminders_patient_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['date', 'time'], name='reminders_active_due_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:09
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderOccurrence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('due_at', models.DateTimeField()),
+                ('is_dispatched', models.BooleanField(default=False)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_occurrences', to='medicare.patient')),
+                ('reminder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='medicare.reminder')),
+            ],
+            options={
+                'db_table': 'reminder_occurrences',
+                'ordering': ['due_at'],
+                'indexes': [models.Index(condition=models.Q(('is_dispatched', False)), fields=['due_at'], name='occurrences_pending_due_idx'), models.Index(fields=['patient', 'due_at'], name='occurrences_patient_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reminder', 'due_at'), name='reminder_occurrence_unique')],
+            },
+        ),
+    ]
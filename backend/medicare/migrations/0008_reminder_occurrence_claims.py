@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0007_reminder_occurrences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderoccurrence',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='reminderoccurrence',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:27
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0008_reminder_occurrence_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('reminder', 'Rappel'), ('journalentry', 'Entrée du journal'), ('aitriage', 'Triage IA')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('sync_version', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'sync_tombstones',
+            },
+        ),
+        migrations.AddField(
+            model_name='aitriage',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='sync_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='aitriage',
+            index=models.Index(fields=['patient', 'sync_version'], name='ai_triages_patient_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['patient', 'sync_version'], name='journal_patient_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['patient', 'sync_version'], name='reminders_patient_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to='medicare.patient'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['patient', 'sync_version'], name='tombstones_patient_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstones_deleted_idx'),
+        ),
+    ]
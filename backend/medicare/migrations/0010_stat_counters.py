@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+# Copie figée des compteurs suivis à cette migration (medicare.services.admin_stats.TRACKED
+# peut évoluer ; reconcile_admin_stats recalcule ensuite les clés ajoutées)
+SEEDED = {
+    'Patient': ('patients', ()),
+    'Doctor': ('doctors', ('is_approved',)),
+    'Consultation': ('consultations', ('status',)),
+    'AITriage': ('ai_triages', ('severity',)),
+    'Payment': ('payments', ('status',)),
+}
+
+
+def _label(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return 'none' if value is None else str(value)
+
+
+def seed_counters(apps, schema_editor):
+    """Compte les lignes existantes : les signaux n'appliquent ensuite que des différences"""
+    StatCounter = apps.get_model('medicare', 'StatCounter')
+    counts = {}
+    for model_name, (prefix, fields) in SEEDED.items():
+        queryset = apps.get_model('medicare', model_name).objects.order_by()
+        counts[prefix] = queryset.count()
+        for field in fields:
+            for row in queryset.values(field).annotate(count=models.Count('pk')):
+                counts[f'{prefix}:{field}:{_label(row[field])}'] = row['count']
+    StatCounter.objects.bulk_create([StatCounter(key=key, value=value) for key, value in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0009_sync_versions_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'stat_counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+def deduplicate_transaction_ids(apps, schema_editor):
+    """Références vides -> NULL ; doublons existants suffixés par l'id du paiement"""
+    Payment = apps.get_model('medicare', 'Payment')
+    Payment.objects.filter(transaction_id='').update(transaction_id=None)
+    seen = set()
+    rows = Payment.objects.exclude(transaction_id=None).order_by('created_at', 'id').values_list('id', 'transaction_id')
+    for payment_id, transaction_id in rows.iterator():
+        if transaction_id in seen:
+            Payment.objects.filter(pk=payment_id).update(transaction_id=f'{transaction_id[:160]}:{payment_id}')
+        seen.add(transaction_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0010_stat_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(deduplicate_transaction_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='transaction_id',
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', 'id'], name='payments_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='payments_status_created_idx'),
+        ),
+    ]
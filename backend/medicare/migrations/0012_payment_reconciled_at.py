@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0011_payment_transaction_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0012_payment_reconciled_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='client_sequence',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='message',
+            constraint=models.UniqueConstraint(fields=('consultation', 'sender_id', 'client_sequence'), name='messages_client_sequence_uniq'),
+        ),
+    ]
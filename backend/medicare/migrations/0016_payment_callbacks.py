@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicare', '0015_ai_triage_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operator', models.CharField(choices=[('mvola', 'MVola'), ('orange', 'Orange Money'), ('airtel', 'Airtel Money')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=200)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'payment_callbacks',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['transaction_id', 'received_at'], name='payment_callbacks_ref_idx')],
+            },
+        ),
+    ]
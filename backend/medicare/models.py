@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
@@ -12,6 +12,10 @@ class Patient(models.Model):
     name = models.CharField(max_length=200, null=True, blank=True)
     age = models.IntegerField(null=True, blank=True)
     pathologies = models.JSONField(default=list, blank=True)
+    # Synchronisation mobile : dernière version attribuée aux données du patient, et version
+    # des plus récents tombstones purgés (une synchronisation plus ancienne repart de zéro)
+    sync_version = models.BigIntegerField(default=0)
+    sync_floor = models.BigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -19,9 +23,70 @@ class Patient(models.Model):
         db_table = 'patients'
         ordering = ['-created_at']
 
+    # Avancés uniquement par UPDATE (next_sync_version, purge des tombstones)
+    SYNC_FIELDS = ('sync_version', 'sync_floor')
+
     def __str__(self):
         return f"{self.name or 'Patient'} - {self.phone}"
 
+    def save(self, *args, **kwargs):
+        # Une instance chargée avant un next_sync_version ne doit pas réécrire une version périmée
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SYNC_FIELDS
+            ]
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def next_sync_version(patient_id) -> int:
+        """
+        Attribue la version suivante du patient, à appeler dans une transaction.
+
+        L'UPDATE verrouille la ligne du patient jusqu'au commit : les versions d'un même
+        patient sont validées dans l'ordre, un client ne peut donc pas dépasser une
+        modification encore en cours.
+        """
+        Patient.objects.filter(pk=patient_id).update(sync_version=models.F('sync_version') + 1)
+        return Patient.objects.filter(pk=patient_id).values_list('sync_version', flat=True).get()
+
+
+class PatientSyncedModel(models.Model):
+    """Données synchronisées par l'application mobile : version à chaque écriture, tombstone à la suppression"""
+    sync_version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.patient_id is None:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.sync_version = Patient.next_sync_version(self.patient_id)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'sync_version'}
+            return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if self.patient_id is None:
+            return super().delete(*args, **kwargs)
+        with transaction.atomic():
+            SyncTombstone.objects.create(
+                patient_id=self.patient_id,
+                entity=self._meta.model_name,
+                object_id=self.pk,
+                sync_version=Patient.next_sync_version(self.patient_id),
+            )
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def bump_sync_version(cls, pk) -> None:
+        """Nouvelle version pour une ligne modifiée par update(), dans la même transaction"""
+        patient_id = cls.objects.filter(pk=pk).values_list('patient_id', flat=True).first()
+        if patient_id is not None:
+            cls.objects.filter(pk=pk).update(sync_version=Patient.next_sync_version(patient_id))
+
 
 class Doctor(models.Model):
     """Modèle pour les médecins"""
@@ -41,6 +106,22 @@ class Doctor(models.Model):
     class Meta:
         db_table = 'doctors'
         ordering = ['-rating', 'name']
+        # Index partiels : Django filtre les booléens par `WHERE "is_online"`, que SQLite
+        # ne sait pas résoudre avec un index composite (is_online, ...)
+        indexes = [
+            # Annuaire public : médecins en ligne triés par note
+            models.Index(
+                fields=['-rating', 'name'],
+                name='doctors_online_rating_idx',
+                condition=models.Q(is_online=True),
+            ),
+            # Validation admin : médecins en attente
+            models.Index(
+                fields=['-created_at'],
+                name='doctors_pending_created_idx',
+                condition=models.Q(is_approved=False),
+            ),
+        ]
 
     def __str__(self):
         return f"Dr. {self.name} - {self.specialty}"
@@ -63,7 +144,7 @@ class Admin(models.Model):
         return f"Admin: {self.name}"
 
 
-class Reminder(models.Model):
+class Reminder(PatientSyncedModel):
     """Modèle pour les rappels santé"""
     REMINDER_TYPES = [
         ('medication', 'Médicament'),
@@ -95,12 +176,55 @@ class Reminder(models.Model):
     class Meta:
         db_table = 'reminders'
         ordering = ['date', 'time']
+        indexes = [
+            models.Index(fields=['patient', 'date', 'time'], name='reminders_patient_due_idx'),
+            models.Index(fields=['patient', 'sync_version'], name='reminders_patient_sync_idx'),
+            # Index partiel : seuls les rappels actifs sont à déclencher
+            models.Index(
+                fields=['date', 'time'],
+                name='reminders_active_due_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.patient.name}"
 
 
-class JournalEntry(models.Model):
+class ReminderOccurrence(models.Model):
+    """Échéance matérialisée d'un rappel (fenêtre glissante des prochains jours)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    reminder = models.ForeignKey(Reminder, on_delete=models.CASCADE, related_name='occurrences')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='reminder_occurrences')
+    due_at = models.DateTimeField()
+    is_dispatched = models.BooleanField(default=False)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Réservation par un processus run_reminder_scheduler (bail expirant)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'reminder_occurrences'
+        ordering = ['due_at']
+        constraints = [
+            models.UniqueConstraint(fields=['reminder', 'due_at'], name='reminder_occurrence_unique'),
+        ]
+        indexes = [
+            # "Échéances entre T1 et T2, tous patients confondus" : parcours d'intervalle sur l'index
+            models.Index(
+                fields=['due_at'],
+                name='occurrences_pending_due_idx',
+                condition=models.Q(is_dispatched=False),
+            ),
+            models.Index(fields=['patient', 'due_at'], name='occurrences_patient_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reminder_id} - {self.due_at}"
+
+
+class JournalEntry(PatientSyncedModel):
     """Modèle pour les entrées du journal santé"""
     ENTRY_TYPES = [
         ('note', 'Note'),
@@ -130,6 +254,11 @@ class JournalEntry(models.Model):
     class Meta:
         db_table = 'journal_entries'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', 'date', '-created_at'], name='journal_patient_date_idx'),
+            models.Index(fields=['patient', '-created_at'], name='journal_patient_created_idx'),
+            models.Index(fields=['patient', 'sync_version'], name='journal_patient_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type} - {self.patient.name} - {self.date}"
@@ -154,6 +283,10 @@ class Consultation(models.Model):
     class Meta:
         db_table = 'consultations'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', 'status', '-created_at'], name='consult_patient_status_idx'),
+            models.Index(fields=['doctor', 'status', '-created_at'], name='consult_doctor_status_idx'),
+        ]
 
     def __str__(self):
         return f"Consultation {self.id} - {self.patient.name} / {self.doctor.name}"
@@ -173,11 +306,22 @@ class Message(models.Model):
     content = models.TextField(null=True, blank=True)
     photo_url = models.URLField(null=True, blank=True)
     audio_url = models.URLField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Horodatage fixé à l'écriture : les messages d'un même lot reçoivent des instants croissants
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Numéro attribué par le client à ses messages (file hors ligne) : ordre et idempotence des renvois
+    client_sequence = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         db_table = 'messages'
         ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['consultation', 'sender_id', 'client_sequence'], name='messages_client_sequence_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['consultation', 'created_at'], name='messages_consult_created_idx'),
+        ]
 
     def __str__(self):
         return f"Message {self.id} - {self.sender_type}"
@@ -202,18 +346,46 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     operator = models.CharField(max_length=20, choices=OPERATOR_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    transaction_id = models.CharField(max_length=200, null=True, blank=True)
+    # Référence envoyée à l'opérateur, clé d'idempotence des créations et des callbacks
+    transaction_id = models.CharField(max_length=200, null=True, blank=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Dernier rapprochement avec un fichier de règlement de l'opérateur (reconcile_payments)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'payments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='payments_created_idx'),
+            models.Index(fields=['status', '-created_at', 'id'], name='payments_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Paiement {self.id} - {self.amount} {self.operator}"
 
 
-class AITriage(models.Model):
+class PaymentCallback(models.Model):
+    """Callback d'opérateur tel que reçu, doublons et rejeux compris (journal d'audit)"""
+    operator = models.CharField(max_length=20, choices=Payment.OPERATOR_CHOICES)
+    # Vides pour une entrée mal formée ; `payload` conserve l'entrée brute
+    transaction_id = models.CharField(max_length=200, blank=True)
+    status = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'payment_callbacks'
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['transaction_id', 'received_at'], name='payment_callbacks_ref_idx'),
+        ]
+
+    def __str__(self):
+        return f"Callback {self.operator} {self.transaction_id} - {self.status}"
+
+
+class AITriage(PatientSyncedModel):
     """Modèle pour les résultats de triage IA"""
     SEVERITY_CHOICES = [
         ('low', 'Faible'),
@@ -222,17 +394,34 @@ class AITriage(models.Model):
         ('critical', 'Critique'),
     ]
 
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échoué'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='ai_triages', null=True, blank=True)
     symptoms = models.TextField()
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES)
     advice = models.TextField()
     recommendation = models.TextField()
+    # File de traitement : l'analyse IA est faite par un worker, pas dans la requête HTTP
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'ai_triages'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='ai_triages_status_created_idx'),
+            models.Index(fields=['patient', '-created_at'], name='ai_triages_patient_idx'),
+            models.Index(fields=['patient', 'sync_version'], name='ai_triages_patient_sync_idx'),
+        ]
 
     def __str__(self):
         return f"Triage IA {self.id} - {self.severity}"
@@ -250,6 +439,49 @@ class OTPCode(models.Model):
     class Meta:
         db_table = 'otp_codes'
         ordering = ['-created_at']
+        indexes = [
+            # Vérification OTP : code non utilisé et non expiré pour un numéro
+            models.Index(fields=['phone', 'is_used', 'expires_at'], name='otp_phone_valid_idx'),
+        ]
 
     def __str__(self):
         return f"OTP {self.code} - {self.phone}"
+
+
+class SyncTombstone(models.Model):
+    """Suppression d'une donnée synchronisée, transmise aux applications mobiles"""
+    ENTITY_CHOICES = [
+        ('reminder', 'Rappel'),
+        ('journalentry', 'Entrée du journal'),
+        ('aitriage', 'Triage IA'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='sync_tombstones')
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.UUIDField()
+    sync_version = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'sync_tombstones'
+        indexes = [
+            models.Index(fields=['patient', 'sync_version'], name='tombstones_patient_sync_idx'),
+            models.Index(fields=['deleted_at'], name='tombstones_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Suppression {self.entity} {self.object_id}"
+
+
+class StatCounter(models.Model):
+    """Compteur du tableau de bord admin, tenu à jour par signaux (voir medicare/services/admin_stats.py)"""
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'stat_counters'
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
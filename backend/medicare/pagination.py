@@ -0,0 +1,124 @@
+"""
+Pagination par clé (keyset) pour les connexions GraphQL de style Relay.
+
+Le curseur est opaque : il encode les valeurs des champs de tri de la dernière
+ligne renvoyée. La page suivante est obtenue par une comparaison sur ces champs
+(index range scan) au lieu d'un OFFSET qui relit toutes les lignes précédentes.
+"""
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.db.models import F, Q, QuerySet
+from graphene.relay import PageInfo
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _parse_ordering(queryset: QuerySet, ordering: Sequence[str]) -> List[Tuple[str, bool, bool]]:
+    """Retourne (champ, décroissant, nullable) pour chaque champ de tri, terminé par la clé primaire"""
+    keys = []
+    for item in ordering:
+        name = item.lstrip('-')
+        field = queryset.model._meta.get_field(name)
+        keys.append((name, item.startswith('-'), field.null))
+    pk_name = queryset.model._meta.pk.name
+    if pk_name not in (name for name, _, _ in keys):
+        keys.append((pk_name, False, False))
+    return keys
+
+
+def _serialize(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(row, keys: List[Tuple[str, bool, bool]]) -> str:
+    values = [_serialize(getattr(row, name)) for name, _, _ in keys]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str, keys: List[Tuple[str, bool, bool]]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise Exception("Curseur de pagination invalide")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise Exception("Curseur de pagination invalide")
+    return values
+
+
+def _after_condition(name: str, descending: bool, nullable: bool, value: Any) -> Q:
+    """Lignes situées strictement après `value` sur un champ (NULL toujours en dernier)"""
+    if value is None:
+        return Q(pk__in=[])
+    condition = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+    if nullable:
+        condition |= Q(**{f'{name}__isnull': True})
+    return condition
+
+
+def _equal_condition(name: str, value: Any) -> Q:
+    if value is None:
+        return Q(**{f'{name}__isnull': True})
+    return Q(**{name: value})
+
+
+def keyset_filter(keys: List[Tuple[str, bool, bool]], values: List[Any]) -> Q:
+    """(a > va) OR (a = va AND b > vb) OR ... pour l'ordre de tri donné"""
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (name, descending, nullable), value in zip(keys, values):
+        condition |= prefix & _after_condition(name, descending, nullable, value)
+        prefix &= _equal_condition(name, value)
+    return condition
+
+
+def _ordered(queryset: QuerySet, keys: List[Tuple[str, bool, bool]]) -> QuerySet:
+    return queryset.order_by(*[
+        F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+        for name, descending, _ in keys
+    ])
+
+
+def page_queryset(queryset: QuerySet, ordering: Sequence[str], first: int = DEFAULT_PAGE_SIZE) -> QuerySet:
+    """Requête de la première page exécutée par `paginate` (pour EXPLAIN)"""
+    return _ordered(queryset, _parse_ordering(queryset, ordering))[:first + 1]
+
+
+def paginate(connection_type, queryset: QuerySet, ordering: Sequence[str],
+             first: Optional[int] = None, after: Optional[str] = None):
+    """
+    Construit une connexion Relay à partir d'un queryset trié par `ordering`.
+
+    Seule la pagination vers l'avant (first/after) est supportée.
+    """
+    if first is None:
+        first = DEFAULT_PAGE_SIZE
+    if first < 0:
+        raise Exception("L'argument 'first' doit être positif")
+    first = min(first, MAX_PAGE_SIZE)
+
+    keys = _parse_ordering(queryset, ordering)
+    if after:
+        queryset = queryset.filter(keyset_filter(keys, decode_cursor(after, keys)))
+
+    rows = list(_ordered(queryset, keys)[:first + 1])
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+
+    edges = [connection_type.Edge(node=row, cursor=encode_cursor(row, keys)) for row in rows]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_next_page=has_next_page,
+            has_previous_page=bool(after),
+        ),
+    )
@@ -0,0 +1,116 @@
+"""
+Requêtes persistées automatiques (protocole APQ d'Apollo) et cache des documents analysés.
+
+Le client envoie `extensions.persistedQuery.sha256Hash` sans le texte de la requête ;
+si le serveur ne connaît pas ce hash, il répond `PersistedQueryNotFound` et le client
+renvoie le texte accompagné du hash. Le texte est conservé dans le cache Django
+(partagé entre processus) ; le document analysé et validé est gardé dans un cache LRU
+du processus, pour toutes les requêtes, persistées ou non : une requête déjà vue
+n'est ni ré-analysée ni re-validée.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError
+
+DEFAULT_PERSISTED_QUERIES = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 7 * 24 * 3600,
+    'DOCUMENT_CACHE_SIZE': 500,
+    # Durée de mise en cache (CDN, navigateur) des réponses GET sans authentification
+    'GET_MAX_AGE': 60,
+}
+
+PERSISTED_QUERY_NOT_FOUND = 'PERSISTED_QUERY_NOT_FOUND'
+
+
+def get_persisted_queries_config() -> Dict:
+    return {**DEFAULT_PERSISTED_QUERIES, **getattr(settings, 'GRAPHQL_PERSISTED_QUERIES', {})}
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """Cache LRU hash de requête -> document analysé et validé"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._documents: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                self.misses += 1
+                return None
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def set(self, key: str, document) -> None:
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+
+
+document_cache = DocumentCache(get_persisted_queries_config()['DOCUMENT_CACHE_SIZE'])
+
+
+def _persisted_query_extension(extensions) -> Optional[Dict]:
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise GraphQLError("Extensions invalides (JSON attendu)")
+    if not isinstance(extensions, dict):
+        return None
+    persisted = extensions.get('persistedQuery')
+    return persisted if isinstance(persisted, dict) else None
+
+
+def resolve_persisted_query(query: Optional[str], extensions) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Texte de la requête et son hash SHA-256.
+
+    Avec une extension `persistedQuery`, retrouve le texte à partir du hash (ou
+    l'enregistre s'il est fourni) ; lève PersistedQueryNotFound si le hash est inconnu.
+    """
+    persisted = _persisted_query_extension(extensions)
+    if persisted is None:
+        return query, query_hash(query) if query else None
+
+    if persisted.get('version') != 1:
+        raise GraphQLError("Version de requête persistée non supportée")
+    sha256 = persisted.get('sha256Hash')
+    if not isinstance(sha256, str):
+        raise GraphQLError("Hash de requête persistée manquant")
+
+    config = get_persisted_queries_config()
+    cache = caches[config['CACHE_ALIAS']]
+    key = f'apq:{sha256}'
+    if not query:
+        query = cache.get(key)
+        if query is None:
+            raise GraphQLError('PersistedQueryNotFound', extensions={'code': PERSISTED_QUERY_NOT_FOUND})
+        return query, sha256
+
+    if query_hash(query) != sha256:
+        raise GraphQLError("Le hash ne correspond pas à la requête fournie")
+    cache.set(key, query, timeout=config['TIMEOUT'])
+    return query, sha256
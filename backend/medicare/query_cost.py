@@ -0,0 +1,137 @@
+"""
+Règle de validation GraphQL : profondeur et coût estimé de chaque opération, avant exécution.
+
+Coût d'un champ = coût propre (`FIELD_COSTS`, 1 par défaut pour un objet, 0 pour un scalaire)
++ multiplicateur x coût de ses sous-champs. Le multiplicateur vaut l'argument `first` des
+champs paginés (borné par MAX_PAGE_SIZE ; valeur maximale si `first` est une variable sans
+défaut, DEFAULT_PAGE_SIZE s'il est absent), `LIST_SIZES` ou DEFAULT_LIST_SIZE pour les
+autres listes, 1 sinon.
+
+`consultations { messages { consultation { messages ... } } }` voit ainsi son coût
+multiplié à chaque niveau et est refusé au-delà de `GRAPHQL_QUERY_LIMITS['MAX_COST']`.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from graphql import GraphQLError, ValidationRule, get_named_type, get_nullable_type, is_list_type
+from graphql.language import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode, IntValueNode, VariableNode,
+)
+
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_LIMITS = {
+    'MAX_DEPTH': 10,
+    'MAX_COST': 2000,
+    'DEFAULT_LIST_SIZE': 20,
+    'FIELD_COSTS': {},
+    'LIST_SIZES': {},
+}
+
+
+def get_query_limits() -> Dict:
+    return {**DEFAULT_QUERY_LIMITS, **getattr(settings, 'GRAPHQL_QUERY_LIMITS', {})}
+
+
+class QueryCostRule(ValidationRule):
+    """Refuse les opérations trop profondes ou trop coûteuses et journalise leur coût"""
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.limits = get_query_limits()
+        self.fragments = {
+            definition.name.value: definition
+            for definition in context.document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.variable_defaults: Dict[str, Optional[int]] = {}
+
+    def enter_operation_definition(self, node, *_args):
+        root_type = self.context.schema.get_root_type(node.operation)
+        if root_type is None:
+            return
+        self.variable_defaults = {
+            definition.variable.name.value: (
+                int(definition.default_value.value)
+                if isinstance(definition.default_value, IntValueNode) else None
+            )
+            for definition in node.variable_definitions or ()
+        }
+        cost, depth = self._measure(node.selection_set, root_type, 0, frozenset())
+        name = node.name.value if node.name else 'anonymous'
+        logger.info("Coût GraphQL %s %s : %s (profondeur %s)", node.operation.value, name, cost, depth)
+
+        if depth > self.limits['MAX_DEPTH']:
+            self.report_error(GraphQLError(
+                f"Requête trop profonde : {depth} niveaux (maximum {self.limits['MAX_DEPTH']})", node
+            ))
+        if cost > self.limits['MAX_COST']:
+            self.report_error(GraphQLError(
+                f"Requête trop coûteuse : coût estimé {cost} (maximum {self.limits['MAX_COST']})", node
+            ))
+
+    def _measure(self, selection_set, parent_type, level: int, visited) -> Tuple[int, int]:
+        """(coût, profondeur maximale) d'une sélection sur `parent_type`"""
+        cost = 0
+        depth = level
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._measure_field(selection, parent_type, level + 1, visited)
+                cost += field_cost
+                depth = max(depth, field_depth)
+                continue
+            fragment_visited = visited
+            if isinstance(selection, InlineFragmentNode):
+                fragment_type, fragment_selection = selection.type_condition, selection.selection_set
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited:
+                    continue
+                fragment_visited = visited | {name}
+                fragment_type, fragment_selection = fragment.type_condition, fragment.selection_set
+            else:
+                continue
+            target_type = self.context.schema.get_type(fragment_type.name.value) if fragment_type else parent_type
+            fragment_cost, fragment_depth = self._measure(
+                fragment_selection, target_type or parent_type, level, fragment_visited
+            )
+            cost += fragment_cost
+            depth = max(depth, fragment_depth)
+        return cost, depth
+
+    def _measure_field(self, node: FieldNode, parent_type, level: int, visited) -> Tuple[int, int]:
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or fields is None or name not in fields:
+            # Introspection, ou champ inconnu signalé par les règles standard
+            return 0, level
+        field_type = fields[name].type
+        key = f'{parent_type.name}.{name}'
+
+        child_cost, depth = 0, level
+        if node.selection_set is not None:
+            child_cost, depth = self._measure(node.selection_set, get_named_type(field_type), level, visited)
+        own_cost = self.limits['FIELD_COSTS'].get(key, 1 if node.selection_set is not None else 0)
+        return own_cost + self._multiplier(node, parent_type, field_type, key) * child_cost, depth
+
+    def _multiplier(self, node: FieldNode, parent_type, field_type, key: str) -> int:
+        for argument in node.arguments or ():
+            if argument.name.value != 'first':
+                continue
+            if isinstance(argument.value, IntValueNode):
+                return max(0, min(int(argument.value.value), MAX_PAGE_SIZE))
+            if isinstance(argument.value, VariableNode):
+                default = self.variable_defaults.get(argument.value.name.value)
+                return MAX_PAGE_SIZE if default is None else max(0, min(default, MAX_PAGE_SIZE))
+        if get_named_type(field_type).name.endswith('Connection'):
+            return DEFAULT_PAGE_SIZE
+        if not is_list_type(get_nullable_type(field_type)):
+            return 1
+        if node.name.value == 'edges' and parent_type.name.endswith('Connection'):
+            # Taille déjà comptée sur le champ paginé (`first`)
+            return 1
+        return self.limits['LIST_SIZES'].get(key, self.limits['DEFAULT_LIST_SIZE'])
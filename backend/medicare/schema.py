@@ -1,13 +1,27 @@
 import graphene
 from graphene_django import DjangoObjectType
 from django.contrib.auth.models import User
+from django.db.models import Sum
 from graphql_jwt import mutations as graphql_jwt
 from graphql_jwt.decorators import login_required
 from graphql_jwt.shortcuts import get_token
 from .models import (
     Patient, Doctor, Admin, Reminder, JournalEntry, Consultation,
-    Message, Payment, AITriage as AITriageModel
+    Message, Payment, AITriage as AITriageModel, ReminderOccurrence, SyncTombstone
 )
+from .actor import get_actor
+from .loaders import get_loaders
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from .services.admin_stats import get_admin_stats
+from .services.consultations import consultation_participant, update_consultation_status, write_messages
+from .services.doctor_search import search_doctors
+from .services.patient_sync import changes_since
+from .services.payments import create_payment, is_operator
+from .services.presence import get_request_online_ids
+from .services.reminder_occurrences import materialize_reminder
+
+# Messages renvoyés par ConsultationType.messages sans argument `first`
+MESSAGE_PAGE_SIZE = 50
 
 
 # ==================== TYPES ====================
@@ -38,11 +52,16 @@ class DoctorType(DjangoObjectType):
         fields = ('id', 'name', 'specialty', 'phone', 'avatar', 'price', 'is_online', 'is_approved', 'rating')
     
     def resolve_email(self, info):
-        return self.user.email if self.user else None
+        user = get_loaders(info).users.load(self.user_id)
+        return user.email if user else None
     
     def resolve_phone(self, info):
         return self.phone if self.phone else None
     
+    def resolve_is_online(self, info):
+        # Présence tenue dans le cache (battements), pas la colonne is_online
+        return str(self.id) in get_request_online_ids(info.context)
+    
     def resolve_is_approved(self, info):
         return getattr(self, 'is_approved', False)
 
@@ -77,6 +96,12 @@ class ReminderType(DjangoObjectType):
         return self.end_date.isoformat() if self.end_date else None
 
 
+class ReminderOccurrenceType(DjangoObjectType):
+    class Meta:
+        model = ReminderOccurrence
+        fields = ('id', 'reminder', 'due_at', 'is_dispatched')
+
+
 class JournalEntryType(DjangoObjectType):
     class Meta:
         model = JournalEntry
@@ -88,35 +113,173 @@ class MessageType(DjangoObjectType):
     class Meta:
         model = Message
         fields = ('id', 'consultation', 'sender_id', 'sender_type', 'content', 
-                 'photo_url', 'audio_url', 'created_at')
+                 'photo_url', 'audio_url', 'client_sequence', 'created_at')
+
+    def resolve_consultation(self, info):
+        return get_loaders(info).consultations.load(self.consultation_id)
 
 
 class ConsultationType(DjangoObjectType):
     doctor = graphene.Field(DoctorType)
-    messages = graphene.List(MessageType)
+    messages = graphene.List(
+        MessageType,
+        since=graphene.DateTime(),
+        before=graphene.DateTime(),
+        first=graphene.Int(),
+        description=(
+            "Messages par date croissante : les `first` suivants après `since`, sinon les "
+            "`first` plus récents (avant `before`)"
+        ),
+    )
+    latest_message = graphene.Field(MessageType)
+    message_count = graphene.Int(required=True)
 
     class Meta:
         model = Consultation
         fields = ('id', 'patient', 'doctor', 'status', 'created_at', 'updated_at')
 
-    def resolve_messages(self, info):
-        return self.messages.all().order_by('created_at')
+    def resolve_patient(self, info):
+        return get_loaders(info).patients.load(self.patient_id)
+
+    def resolve_doctor(self, info):
+        return get_loaders(info).doctors.load(self.doctor_id)
+
+    def resolve_messages(self, info, since=None, before=None, first=None):
+        if first is None:
+            first = MESSAGE_PAGE_SIZE
+        if first < 0:
+            raise Exception("L'argument 'first' doit être positif")
+        first = min(first, MAX_PAGE_SIZE)
+        return get_loaders(info).message_page(since, before, first).load(self.id)
+
+    def resolve_latest_message(self, info):
+        return get_loaders(info).message_stats.load(self.id)[0]
+
+    def resolve_message_count(self, info):
+        return get_loaders(info).message_stats.load(self.id)[1]
 
 
 class PaymentType(DjangoObjectType):
     class Meta:
         model = Payment
-        fields = ('id', 'consultation', 'amount', 'operator', 'status', 'transaction_id', 'created_at')
+        fields = ('id', 'consultation', 'amount', 'operator', 'status', 'transaction_id', 'created_at', 'updated_at')
+
+    def resolve_consultation(self, info):
+        return get_loaders(info).consultations.load(self.consultation_id)
 
 
 class AITriageType(DjangoObjectType):
     class Meta:
         model = AITriageModel
-        fields = ('id', 'symptoms', 'severity', 'advice', 'recommendation', 'created_at')
+        fields = ('id', 'symptoms', 'severity', 'advice', 'recommendation', 'status', 'created_at', 'completed_at')
+
+
+class SyncTombstoneType(DjangoObjectType):
+    class Meta:
+        model = SyncTombstone
+        fields = ('entity', 'object_id', 'sync_version', 'deleted_at')
+
+
+class SyncType(graphene.ObjectType):
+    """Modifications depuis le dernier watermark du client"""
+    watermark = graphene.BigInt(required=True, description="À renvoyer dans `updatedSince` à la prochaine synchronisation")
+    reset = graphene.Boolean(
+        required=True, description="Instantané complet : remplacer les données locales au lieu de les fusionner"
+    )
+    reminders = graphene.List(ReminderType)
+    journal_entries = graphene.List(JournalEntryType)
+    ai_triages = graphene.List(AITriageType)
+    deleted = graphene.List(SyncTombstoneType)
+
+
+class StatCountType(graphene.ObjectType):
+    value = graphene.String(required=True)
+    count = graphene.Int(required=True)
+
+
+class AdminStatsType(graphene.ObjectType):
+    """Compteurs du tableau de bord admin (table stat_counters)"""
+    patients = graphene.Int(required=True)
+    doctors = graphene.Int(required=True)
+    approved_doctors = graphene.Int(required=True)
+    pending_doctors = graphene.Int(required=True)
+    consultations = graphene.Int(required=True)
+    consultations_by_status = graphene.List(StatCountType)
+    ai_triages = graphene.Int(required=True)
+    ai_triages_by_severity = graphene.List(StatCountType)
+    payments = graphene.Int(required=True)
+    payments_by_status = graphene.List(StatCountType)
+    updated_at = graphene.DateTime()
+
+
+class SpecialtyFacetType(graphene.ObjectType):
+    specialty = graphene.String(required=True)
+    count = graphene.Int(required=True)
+
+
+class DoctorSearchResultType(graphene.ObjectType):
+    """Page de résultats de searchDoctors, nombre total et facettes par spécialité"""
+    total = graphene.Int(required=True)
+    doctors = graphene.List(DoctorType)
+    specialties = graphene.List(SpecialtyFacetType)
+
+
+# ==================== CONNECTIONS ====================
+
+class DoctorConnection(graphene.relay.Connection):
+    class Meta:
+        node = DoctorType
+
+
+class PatientConnection(graphene.relay.Connection):
+    class Meta:
+        node = PatientType
+
+
+class ReminderConnection(graphene.relay.Connection):
+    class Meta:
+        node = ReminderType
+
+
+class JournalEntryConnection(graphene.relay.Connection):
+    class Meta:
+        node = JournalEntryType
+
+
+class ConsultationConnection(graphene.relay.Connection):
+    class Meta:
+        node = ConsultationType
+
+
+class AITriageConnection(graphene.relay.Connection):
+    class Meta:
+        node = AITriageType
+
+
+class PaymentConnection(graphene.relay.Connection):
+    class Meta:
+        node = PaymentType
+
+    # Agrégats sur l'ensemble des paiements filtrés, calculés seulement s'ils sont demandés
+    total_count = graphene.Int(required=True)
+    success_amount = graphene.Decimal(required=True)
+
+    def resolve_total_count(self, info):
+        return self.filtered.count()
+
+    def resolve_success_amount(self, info):
+        return self.filtered.filter(status='success').aggregate(total=Sum('amount'))['total'] or 0
 
 
 # ==================== INPUT TYPES ====================
 
+class MessageInput(graphene.InputObjectType):
+    content = graphene.String()
+    photo_url = graphene.String()
+    audio_url = graphene.String()
+    client_sequence = graphene.Int()  # Ordre et idempotence des messages mis en file hors ligne
+
+
 class ProfileInput(graphene.InputObjectType):
     name = graphene.String()
     age = graphene.Int()
@@ -335,10 +498,8 @@ class UpdateProfile(graphene.Mutation):
     @login_required
     def mutate(self, info, input):
         # Récupérer le patient depuis l'utilisateur authentifié
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-        except Patient.DoesNotExist:
+        patient = get_actor(info).patient
+        if patient is None:
             raise Exception("Patient non trouvé")
         
         # Mettre à jour le profil
@@ -349,7 +510,7 @@ class UpdateProfile(graphene.Mutation):
         if input.pathologies:
             patient.pathologies = input.pathologies
         
-        patient.save()
+        patient.save(update_fields=['name', 'age', 'pathologies', 'updated_at'])
         
         return UpdateProfile(patient=patient)
 
@@ -371,10 +532,8 @@ class CreateReminder(graphene.Mutation):
 
     @login_required
     def mutate(self, info, type, title, description=None, date=None, time=None, frequency='once', end_date=None, endDate=None, notification_id=None, notificationId=None):
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-        except Patient.DoesNotExist:
+        patient = get_actor(info).patient
+        if patient is None:
             raise Exception("Patient non trouvé")
         
         # Convertir les chaînes en objets date et time
@@ -425,6 +584,7 @@ class CreateReminder(graphene.Mutation):
             is_active=True,
             notification_id=notification_id or notificationId
         )
+        materialize_reminder(reminder)
         
         return CreateReminder(reminder=reminder)
 
@@ -446,10 +606,8 @@ class UpdateReminder(graphene.Mutation):
 
     @login_required
     def mutate(self, info, id, type=None, title=None, description=None, date=None, time=None, is_active=None, isActive=None, notification_id=None, notificationId=None):
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-        except Patient.DoesNotExist:
+        patient = get_actor(info).patient
+        if patient is None:
             raise Exception("Patient non trouvé")
         
         try:
@@ -492,6 +650,7 @@ class UpdateReminder(graphene.Mutation):
             reminder.notification_id = notification_id if notification_id is not None else notificationId
         
         reminder.save()
+        materialize_reminder(reminder)
         
         return UpdateReminder(reminder=reminder)
 
@@ -505,15 +664,13 @@ class DeleteReminder(graphene.Mutation):
 
     @login_required
     def mutate(self, info, id):
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-        except Patient.DoesNotExist:
+        patient = get_actor(info).patient
+        if patient is None:
             raise Exception("Patient non trouvé")
         
         try:
             reminder = Reminder.objects.get(id=id, patient=patient)
-            reminder.delete()
+            reminder.delete()  # Les échéances matérialisées sont supprimées en cascade
             return DeleteReminder(success=True, message="Rappel supprimé avec succès")
         except Reminder.DoesNotExist:
             raise Exception("Rappel non trouvé ou accès refusé")
@@ -522,48 +679,116 @@ class DeleteReminder(graphene.Mutation):
 class AITriage(graphene.Mutation):
     class Arguments:
         symptoms = graphene.String(required=True)
+        stream = graphene.Boolean()  # Résultat suivi via /triage/<id>/stream/ (SSE)
 
     triage = graphene.Field(AITriageType)
 
-    def mutate(self, info, symptoms):
-        from .services.ollama_service import analyze_symptoms_with_ollama
-        
-        # Analyser les symptômes avec Ollama
-        analysis = analyze_symptoms_with_ollama(symptoms)
+    def mutate(self, info, symptoms, stream=False):
+        from .services.triage_jobs import enqueue_triage
         
-        # Log pour déboguer
-        print(f"Analysis result: {analysis}")
-        print(f"Severity: {analysis.get('severity')}")
-        
-        # Récupérer le patient si l'utilisateur est connecté
-        patient = None
-        if info.context.user and info.context.user.is_authenticated:
-            try:
-                patient = Patient.objects.get(user=info.context.user)
-            except Patient.DoesNotExist:
-                pass
-        
-        # Créer l'entrée de triage
-        triage = AITriageModel.objects.create(
-            patient=patient,
-            symptoms=symptoms,
-            severity=analysis.get('severity', 'medium'),
-            advice=analysis.get('advice', 'Surveillez vos symptômes.'),
-            recommendation=analysis.get('recommendation', 'Consultez un médecin si nécessaire.')
-        )
-        
-        # Vérifier que severity est bien sauvegardé
-        print(f"Triage created with severity: {triage.severity}")
+        # Le triage est créé en attente avec une évaluation provisoire,
+        # l'analyse Ollama est faite par un worker (interroger `aiTriage(id)`)
+        # ou par le flux SSE si `stream` est demandé
+        triage = enqueue_triage(symptoms, patient=get_actor(info).patient, stream=bool(stream))
         
         return AITriage(triage=triage)
 
 
 # ==================== QUERIES ====================
 
+def _current_patient(info):
+    """Patient associé à l'utilisateur authentifié, ou None"""
+    return get_actor(info).patient
+
+
+def _require_admin(info):
+    # Vérifier que l'utilisateur est admin
+    admin = get_actor(info).admin
+    if admin is None:
+        raise Exception("Accès refusé. Administrateur requis.")
+    return admin
+
+
+def _consultations_queryset(info, status=None):
+    """Consultations du patient ou du docteur authentifié, ou None si aucun des deux"""
+    actor = get_actor(info)
+    
+    # Vérifier que l'utilisateur est authentifié
+    if not actor.is_authenticated:
+        raise Exception("Vous devez être authentifié pour accéder aux consultations")
+    
+    # Vérifier si c'est un patient, sinon un docteur
+    if actor.patient is not None:
+        queryset = Consultation.objects.filter(patient=actor.patient)
+    elif actor.doctor is not None:
+        queryset = Consultation.objects.filter(doctor=actor.doctor)
+    else:
+        return None
+    
+    # Filtrer par status si fourni
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def _payments_queryset(status=None, operator=None, consultation_id=None, search=None,
+                       created_after=None, created_before=None):
+    """Paiements filtrés pour l'administration"""
+    queryset = Payment.objects.all()
+    if status:
+        if status not in dict(Payment.STATUS_CHOICES):
+            raise Exception("Statut de paiement inconnu")
+        queryset = queryset.filter(status=status)
+    if operator:
+        if not is_operator(operator):
+            raise Exception("Opérateur de paiement inconnu")
+        queryset = queryset.filter(operator=operator)
+    if consultation_id:
+        queryset = queryset.filter(consultation_id=consultation_id)
+    if search:
+        queryset = queryset.filter(transaction_id__startswith=search.strip())
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
+
+
+def _consultation_participant(info, consultation_id):
+    """(consultation, participant) de l'utilisateur authentifié, sans charger la consultation complète"""
+    consultation, participant = consultation_participant(consultation_id, info.context.user.pk)
+    if consultation is None:
+        raise Exception("Consultation non trouvée")
+    if participant is None:
+        raise Exception("Accès refusé à cette consultation")
+    return consultation, participant
+
+
+def _journal_entries_queryset(patient, date=None):
+    queryset = JournalEntry.objects.filter(patient=patient)
+    if date:
+        queryset = queryset.filter(date=date)
+    return queryset
+
+
 class Query(graphene.ObjectType):
     # Queries pour les médecins
     doctors = graphene.List(DoctorType)
     doctor = graphene.Field(DoctorType, id=graphene.UUID(required=True))
+    # Recherche dans l'annuaire (texte sans accents, spécialité, prix, note) avec facettes
+    search_doctors = graphene.Field(
+        DoctorSearchResultType,
+        query=graphene.String(),
+        specialty=graphene.String(),
+        min_price=graphene.Float(),
+        max_price=graphene.Float(),
+        min_rating=graphene.Float(),
+        max_rating=graphene.Float(),
+        online_only=graphene.Boolean(),
+        approved=graphene.Boolean(),  # Admin uniquement : les autres ne voient que les médecins validés
+        first=graphene.Int(),
+        offset=graphene.Int(),
+    )
     
     # Queries pour les patients
     me = graphene.Field(PatientType)
@@ -571,6 +796,11 @@ class Query(graphene.ObjectType):
     # Queries pour les rappels
     reminders = graphene.List(ReminderType)
     
+    # Échéances des rappels (récurrences déroulées côté serveur)
+    reminder_occurrences = graphene.List(
+        ReminderOccurrenceType, start=graphene.DateTime(required=True), end=graphene.DateTime(required=True)
+    )
+    
     # Queries pour le journal
     journal_entries = graphene.List(JournalEntryType, date=graphene.String())
     
@@ -580,130 +810,342 @@ class Query(graphene.ObjectType):
     
     # Queries pour les triages IA
     ai_triages = graphene.List(AITriageType)
+    ai_triage = graphene.Field(AITriageType, id=graphene.UUID(required=True))  # Suivi d'un triage en cours
+    
+    # Synchronisation différentielle de l'application mobile (rappels, journal, triages)
+    sync = graphene.Field(SyncType, updated_since=graphene.BigInt())
     
     # Queries admin
     all_patients = graphene.List(PatientType)
     all_doctors = graphene.List(DoctorType)
     pending_doctors = graphene.List(DoctorType)  # Médecins en attente de validation
+    admin_stats = graphene.Field(AdminStatsType)  # Compteurs du tableau de bord
+    payments = graphene.List(
+        PaymentType,
+        status=graphene.String(),
+        operator=graphene.String(),
+        consultation_id=graphene.UUID(),
+        search=graphene.String(),  # Début de la référence de transaction
+        created_after=graphene.DateTime(),
+        created_before=graphene.DateTime(),
+        first=graphene.Int(),
+    )
+
+    # Versions paginées (curseur) des listes ci-dessus
+    doctors_connection = graphene.Field(DoctorConnection, first=graphene.Int(), after=graphene.String())
+    reminders_connection = graphene.Field(ReminderConnection, first=graphene.Int(), after=graphene.String())
+    journal_entries_connection = graphene.Field(
+        JournalEntryConnection, date=graphene.String(), first=graphene.Int(), after=graphene.String()
+    )
+    consultations_connection = graphene.Field(
+        ConsultationConnection, status=graphene.String(), first=graphene.Int(), after=graphene.String()
+    )
+    ai_triages_connection = graphene.Field(AITriageConnection, first=graphene.Int(), after=graphene.String())
+    all_patients_connection = graphene.Field(PatientConnection, first=graphene.Int(), after=graphene.String())
+    all_doctors_connection = graphene.Field(DoctorConnection, first=graphene.Int(), after=graphene.String())
+    pending_doctors_connection = graphene.Field(DoctorConnection, first=graphene.Int(), after=graphene.String())
+    payments_connection = graphene.Field(
+        PaymentConnection,
+        status=graphene.String(),
+        operator=graphene.String(),
+        consultation_id=graphene.UUID(),
+        search=graphene.String(),
+        created_after=graphene.DateTime(),
+        created_before=graphene.DateTime(),
+        first=graphene.Int(),
+        after=graphene.String(),
+    )
 
     def resolve_doctors(self, info):
-        return Doctor.objects.filter(is_online=True).order_by('-rating', 'name')
+        online_ids = get_request_online_ids(info.context)
+        doctors = list(Doctor.objects.filter(pk__in=online_ids).order_by('-rating', 'name')) if online_ids else []
+        get_loaders(info).queue_doctors(doctors)
+        return doctors
     
     def resolve_doctor(self, info, id):
-        try:
-            return Doctor.objects.get(id=id)
-        except Doctor.DoesNotExist:
-            return None
+        return get_loaders(info).doctors.load(id)
+    
+    def resolve_search_doctors(self, info, query=None, specialty=None, min_price=None, max_price=None,
+                               min_rating=None, max_rating=None, online_only=False, approved=None,
+                               first=None, offset=None):
+        first = DEFAULT_PAGE_SIZE if first is None else first
+        offset = offset or 0
+        if first < 0 or offset < 0:
+            raise Exception("Les arguments first et offset doivent être positifs")
+        if get_actor(info).admin is None:
+            approved = True
+        result = search_doctors(
+            min(first, MAX_PAGE_SIZE),
+            offset,
+            query=query or '',
+            specialty=specialty,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            approved=approved,
+            among_ids=get_request_online_ids(info.context) if online_only else None,
+        )
+        found = Doctor.objects.in_bulk(result['ids'])
+        doctors = [found[doctor_id] for doctor_id in result['ids'] if doctor_id in found]
+        get_loaders(info).queue_doctors(doctors)
+        return DoctorSearchResultType(
+            total=result['total'],
+            doctors=doctors,
+            specialties=[SpecialtyFacetType(specialty=name, count=count) for name, count in result['facets']],
+        )
     
     @login_required
     def resolve_me(self, info):
         # Récupérer le patient depuis l'utilisateur authentifié
-        user = info.context.user
-        try:
-            return Patient.objects.get(user=user)
-        except Patient.DoesNotExist:
-            return None
+        return _current_patient(info)
     
     @login_required
     def resolve_reminders(self, info):
         # Filtrer par patient authentifié
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-            # Retourner tous les rappels du patient (actifs et inactifs)
-            return Reminder.objects.filter(patient=patient).order_by('date', 'time')
-        except Patient.DoesNotExist:
+        patient = _current_patient(info)
+        if patient is None:
+            return []
+        # Retourner tous les rappels du patient (actifs et inactifs)
+        return Reminder.objects.filter(patient=patient).order_by('date', 'time')
+    
+    @login_required
+    def resolve_reminder_occurrences(self, info, start, end):
+        patient = _current_patient(info)
+        if patient is None:
             return []
+        return list(
+            ReminderOccurrence.objects.filter(patient=patient, due_at__gte=start, due_at__lt=end)
+            .select_related('reminder')
+            .order_by('due_at')
+        )
     
     @login_required
     def resolve_journal_entries(self, info, date=None):
         # Filtrer par patient authentifié
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-            queryset = JournalEntry.objects.filter(patient=patient)
-            if date:
-                queryset = queryset.filter(date=date)
-            return queryset.order_by('-created_at')
-        except Patient.DoesNotExist:
+        patient = _current_patient(info)
+        if patient is None:
             return []
+        return _journal_entries_queryset(patient, date).order_by('-created_at')
     
     @login_required
     def resolve_consultations(self, info, status=None):
         # Filtrer par patient ou docteur authentifié
-        user = info.context.user
-        
-        # Vérifier que l'utilisateur est authentifié
-        if not user or not user.is_authenticated:
-            raise Exception("Vous devez être authentifié pour accéder aux consultations")
-        
-        queryset = None
-        
-        # Vérifier si c'est un patient
-        try:
-            patient = Patient.objects.get(user=user)
-            queryset = Consultation.objects.filter(patient=patient)
-        except Patient.DoesNotExist:
-            # Vérifier si c'est un docteur
-            try:
-                doctor = Doctor.objects.get(user=user)
-                queryset = Consultation.objects.filter(doctor=doctor)
-            except Doctor.DoesNotExist:
-                # Si ni patient ni docteur, retourner une liste vide
-                return []
-        
-        # Filtrer par status si fourni
-        if status:
-            queryset = queryset.filter(status=status)
+        queryset = _consultations_queryset(info, status)
+        if queryset is None:
+            # Si ni patient ni docteur, retourner une liste vide
+            return []
         
-        return queryset.order_by('-created_at')
+        consultations = list(queryset.order_by('-created_at'))
+        get_loaders(info).queue_consultations(consultations)
+        return consultations
     
     def resolve_consultation(self, info, id):
-        try:
-            return Consultation.objects.get(id=id)
-        except Consultation.DoesNotExist:
-            return None
+        return get_loaders(info).consultations.load(id)
     
     @login_required
     def resolve_ai_triages(self, info):
         # Filtrer par patient authentifié
-        user = info.context.user
-        try:
-            patient = Patient.objects.get(user=user)
-            return AITriageModel.objects.filter(patient=patient).order_by('-created_at')
-        except Patient.DoesNotExist:
+        patient = _current_patient(info)
+        if patient is None:
             return []
+        return AITriageModel.objects.filter(patient=patient).order_by('-created_at')
+    
+    def resolve_ai_triage(self, info, id):
+        try:
+            triage = AITriageModel.objects.get(id=id)
+        except AITriageModel.DoesNotExist:
+            return None
+        # Un triage rattaché à un patient n'est visible que par ce patient
+        if triage.patient_id is not None:
+            patient = get_actor(info).patient
+            if patient is None or patient.id != triage.patient_id:
+                return None
+        return triage
+    
+    @login_required
+    def resolve_sync(self, info, updated_since=None):
+        patient = _current_patient(info)
+        if patient is None:
+            raise Exception("Patient non trouvé")
+        return SyncType(**changes_since(patient.id, updated_since))
     
     # Resolvers admin
     @login_required
     def resolve_all_patients(self, info):
-        # Vérifier que l'utilisateur est admin
-        user = info.context.user
-        try:
-            Admin.objects.get(user=user)
-        except Admin.DoesNotExist:
-            raise Exception("Accès refusé. Administrateur requis.")
+        _require_admin(info)
         return Patient.objects.all().order_by('-created_at')
     
     @login_required
     def resolve_all_doctors(self, info):
-        # Vérifier que l'utilisateur est admin
-        user = info.context.user
-        try:
-            Admin.objects.get(user=user)
-        except Admin.DoesNotExist:
-            raise Exception("Accès refusé. Administrateur requis.")
-        return Doctor.objects.all().order_by('-created_at')
+        _require_admin(info)
+        doctors = list(Doctor.objects.all().order_by('-created_at'))
+        get_loaders(info).queue_doctors(doctors)
+        return doctors
+    
+    @login_required
+    def resolve_admin_stats(self, info):
+        _require_admin(info)
+        stats = get_admin_stats()
+        for name in ('consultations_by_status', 'ai_triages_by_severity', 'payments_by_status'):
+            stats[name] = [StatCountType(value=value, count=count) for value, count in stats[name]]
+        return AdminStatsType(**stats)
+    
+    @login_required
+    def resolve_payments(self, info, first=None, **filters):
+        _require_admin(info)
+        first = DEFAULT_PAGE_SIZE if first is None else first
+        if first < 0:
+            raise Exception("L'argument 'first' doit être positif")
+        payments = list(_payments_queryset(**filters).order_by('-created_at', 'id')[:min(first, MAX_PAGE_SIZE)])
+        get_loaders(info).consultations.queue(payment.consultation_id for payment in payments)
+        return payments
     
     @login_required
     def resolve_pending_doctors(self, info):
-        # Vérifier que l'utilisateur est admin
-        user = info.context.user
-        try:
-            Admin.objects.get(user=user)
-        except Admin.DoesNotExist:
-            raise Exception("Accès refusé. Administrateur requis.")
-        return Doctor.objects.filter(is_approved=False).order_by('-created_at')
+        _require_admin(info)
+        doctors = list(Doctor.objects.filter(is_approved=False).order_by('-created_at'))
+        get_loaders(info).queue_doctors(doctors)
+        return doctors
+
+    # Resolvers paginés
+    def resolve_doctors_connection(self, info, first=None, after=None):
+        queryset = Doctor.objects.filter(pk__in=get_request_online_ids(info.context))
+        page = paginate(DoctorConnection, queryset, ('-rating', 'name'), first, after)
+        get_loaders(info).queue_doctors(edge.node for edge in page.edges)
+        return page
+    
+    @login_required
+    def resolve_reminders_connection(self, info, first=None, after=None):
+        patient = _current_patient(info)
+        queryset = Reminder.objects.filter(patient=patient) if patient else Reminder.objects.none()
+        return paginate(ReminderConnection, queryset, ('date', 'time'), first, after)
+    
+    @login_required
+    def resolve_journal_entries_connection(self, info, date=None, first=None, after=None):
+        patient = _current_patient(info)
+        queryset = _journal_entries_queryset(patient, date) if patient else JournalEntry.objects.none()
+        return paginate(JournalEntryConnection, queryset, ('-created_at',), first, after)
+    
+    @login_required
+    def resolve_consultations_connection(self, info, status=None, first=None, after=None):
+        queryset = _consultations_queryset(info, status)
+        if queryset is None:
+            queryset = Consultation.objects.none()
+        page = paginate(ConsultationConnection, queryset, ('-created_at',), first, after)
+        get_loaders(info).queue_consultations(edge.node for edge in page.edges)
+        return page
+    
+    @login_required
+    def resolve_ai_triages_connection(self, info, first=None, after=None):
+        patient = _current_patient(info)
+        queryset = AITriageModel.objects.filter(patient=patient) if patient else AITriageModel.objects.none()
+        return paginate(AITriageConnection, queryset, ('-created_at',), first, after)
+    
+    @login_required
+    def resolve_all_patients_connection(self, info, first=None, after=None):
+        _require_admin(info)
+        return paginate(PatientConnection, Patient.objects.all(), ('-created_at',), first, after)
+    
+    @login_required
+    def resolve_all_doctors_connection(self, info, first=None, after=None):
+        _require_admin(info)
+        page = paginate(DoctorConnection, Doctor.objects.all(), ('-created_at',), first, after)
+        get_loaders(info).queue_doctors(edge.node for edge in page.edges)
+        return page
+    
+    @login_required
+    def resolve_pending_doctors_connection(self, info, first=None, after=None):
+        _require_admin(info)
+        page = paginate(DoctorConnection, Doctor.objects.filter(is_approved=False), ('-created_at',), first, after)
+        get_loaders(info).queue_doctors(edge.node for edge in page.edges)
+        return page
+    
+    @login_required
+    def resolve_payments_connection(self, info, first=None, after=None, **filters):
+        _require_admin(info)
+        queryset = _payments_queryset(**filters)
+        page = paginate(PaymentConnection, queryset, ('-created_at',), first, after)
+        page.filtered = queryset
+        get_loaders(info).consultations.queue(edge.node.consultation_id for edge in page.edges)
+        return page
+
+
+class CreatePayment(graphene.Mutation):
+    """Paiement en attente ; rejouer avec le même transactionId renvoie le même paiement"""
+    class Arguments:
+        consultation_id = graphene.UUID(required=True)
+        operator = graphene.String(required=True)
+        transaction_id = graphene.String()
+
+    payment = graphene.Field(PaymentType)
+    created = graphene.Boolean()
+
+    @login_required
+    def mutate(self, info, consultation_id, operator, transaction_id=None):
+        patient = get_actor(info).patient
+        if patient is None:
+            raise Exception("Patient non trouvé")
+        consultation = Consultation.objects.select_related('doctor').filter(
+            pk=consultation_id, patient=patient
+        ).first()
+        if consultation is None:
+            raise Exception("Consultation non trouvée")
+        payment, created = create_payment(consultation, operator, transaction_id)
+        return CreatePayment(payment=payment, created=created)
+
+
+class SendMessage(graphene.Mutation):
+    class Arguments:
+        consultation_id = graphene.UUID(required=True)
+        content = graphene.String()
+        photo_url = graphene.String()
+        audio_url = graphene.String()
+        client_sequence = graphene.Int()
+
+    Output = MessageType
+
+    @login_required
+    def mutate(self, info, consultation_id, content=None, photo_url=None, audio_url=None, client_sequence=None):
+        _, participant = _consultation_participant(info, consultation_id)
+        item = {'content': content, 'photo_url': photo_url, 'audio_url': audio_url, 'client_sequence': client_sequence}
+        return write_messages(consultation_id, participant, [item])[0]
+
+
+class SendMessages(graphene.Mutation):
+    """File de messages écrits hors ligne, envoyée en un seul appel (un seul INSERT)"""
+    class Arguments:
+        consultation_id = graphene.UUID(required=True)
+        messages = graphene.List(graphene.NonNull(MessageInput), required=True)
+
+    messages = graphene.List(MessageType)
+
+    @login_required
+    def mutate(self, info, consultation_id, messages):
+        _, participant = _consultation_participant(info, consultation_id)
+        items = [
+            {
+                'content': message.get('content'),
+                'photo_url': message.get('photo_url'),
+                'audio_url': message.get('audio_url'),
+                'client_sequence': message.get('client_sequence'),
+            }
+            for message in messages
+        ]
+        return SendMessages(messages=write_messages(consultation_id, participant, items))
+
+
+class UpdateConsultation(graphene.Mutation):
+    class Arguments:
+        id = graphene.UUID(required=True)
+        status = graphene.String(required=True)
+
+    Output = ConsultationType
+
+    @login_required
+    def mutate(self, info, id, status):
+        consultation, _ = _consultation_participant(info, id)
+        return update_consultation_status(consultation, status)
 
 
 # ==================== MUTATIONS ROOT ====================
@@ -717,12 +1159,7 @@ class ApproveDoctor(graphene.Mutation):
 
     @login_required
     def mutate(self, info, id, approved):
-        # Vérifier que l'utilisateur est admin
-        user = info.context.user
-        try:
-            Admin.objects.get(user=user)
-        except Admin.DoesNotExist:
-            raise Exception("Accès refusé. Administrateur requis.")
+        _require_admin(info)
         
         try:
             doctor = Doctor.objects.get(id=id)
@@ -745,6 +1182,10 @@ class Mutation(graphene.ObjectType):
     create_reminder = CreateReminder.Field()  # Pour créer un rappel
     update_reminder = UpdateReminder.Field()  # Pour mettre à jour un rappel
     delete_reminder = DeleteReminder.Field()  # Pour supprimer un rappel
+    create_payment = CreatePayment.Field()  # Paiement mobile money (idempotent sur transactionId)
+    send_message = SendMessage.Field()
+    send_messages = SendMessages.Field()  # Lot de messages mis en file hors ligne
+    update_consultation = UpdateConsultation.Field()  # Changement de statut d'une consultation
     
     # Mutations JWT (authentification)
     token_auth = graphql_jwt.ObtainJSONWebToken.Field()
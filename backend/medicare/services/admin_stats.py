@@ -0,0 +1,139 @@
+"""
+Statistiques du tableau de bord admin, servies par la table de compteurs `StatCounter`.
+
+Pour chaque modèle suivi, une ligne compte dans le total et dans une clé par champ suivi
+(`consultations:status:active`, `doctors:is_approved:false`...). Les signaux
+(medicare/signals.py) appliquent, après commit, la différence entre les clés d'une ligne
+avant et après écriture. Les `update()` en masse échappent aux signaux : elles appellent
+`record_change` explicitement, et `reconcile_counters` (commande reconcile_admin_stats)
+recalcule périodiquement les valeurs exactes par COUNT(*) ... GROUP BY.
+
+`adminStats` lit ainsi tous les compteurs en une seule requête, quel que soit le volume.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from ..models import AITriage, Consultation, Doctor, Patient, Payment, StatCounter
+
+# Modèle -> (préfixe des clés, champs comptés par valeur)
+TRACKED = {
+    Patient: ('patients', ()),
+    Doctor: ('doctors', ('is_approved',)),
+    Consultation: ('consultations', ('status',)),
+    AITriage: ('ai_triages', ('severity',)),
+    Payment: ('payments', ('status',)),
+}
+
+
+def _label(value) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return 'none' if value is None else str(value)
+
+
+def counter_key(model, field: Optional[str] = None, value=None) -> str:
+    prefix = TRACKED[model][0]
+    return prefix if field is None else f'{prefix}:{field}:{_label(value)}'
+
+
+def tracked_fields(model) -> Tuple[str, ...]:
+    return TRACKED[model][1]
+
+
+def tracked_values(instance) -> Dict:
+    return {field: getattr(instance, field) for field in tracked_fields(type(instance))}
+
+
+def stat_keys(model, values: Dict) -> List[str]:
+    return [counter_key(model)] + [counter_key(model, field, values[field]) for field in tracked_fields(model)]
+
+
+def apply_deltas(deltas: Dict[str, int]) -> None:
+    now = timezone.now()
+    # Ordre fixe des clés : deux transactions ne se verrouillent pas mutuellement
+    for key in sorted(deltas):
+        delta = deltas[key]
+        if not delta:
+            continue
+        if not StatCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now):
+            StatCounter.objects.bulk_create([StatCounter(key=key)], ignore_conflicts=True)
+            StatCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now)
+
+
+def record_change(model, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Ligne créée (before=None), modifiée ou supprimée (after=None)"""
+    deltas = Counter()
+    if before is not None:
+        deltas.subtract(stat_keys(model, before))
+    if after is not None:
+        deltas.update(stat_keys(model, after))
+    apply_deltas(deltas)
+
+
+def compute_counts() -> Dict[str, int]:
+    """Valeurs exactes de tous les compteurs, par un COUNT(*) ... GROUP BY par champ suivi"""
+    counts = {}
+    for model, (_, fields) in TRACKED.items():
+        queryset = model.objects.order_by()
+        if not fields:
+            counts[counter_key(model)] = queryset.count()
+            continue
+        for field in fields:
+            total = 0
+            for row in queryset.values(field).annotate(count=Count('pk')):
+                counts[counter_key(model, field, row[field])] = row['count']
+                total += row['count']
+            counts[counter_key(model)] = total
+    return counts
+
+
+def reconcile_counters() -> Dict[str, Tuple[Optional[int], int]]:
+    """
+    Corrige les compteurs qui ont dérivé ; renvoie {clé: (valeur stockée, valeur exacte)}.
+
+    Les COUNT sont faits après le verrouillage des compteurs : une différence appliquée
+    entre le comptage et l'écriture attend la fin de la transaction au lieu d'être écrasée.
+    """
+    with transaction.atomic():
+        stored = dict(StatCounter.objects.select_for_update().values_list('key', 'value'))
+        actual = compute_counts()
+        drift = {
+            key: (stored.get(key), actual.get(key, 0))
+            for key in set(actual) | set(stored)
+            if stored.get(key) != actual.get(key, 0)
+        }
+        now = timezone.now()
+        for key, (_, value) in drift.items():
+            StatCounter.objects.update_or_create(key=key, defaults={'value': value, 'updated_at': now})
+    return drift
+
+
+def _by_value(counters: Dict[str, int], model, field: str, choices: Iterable) -> List[Tuple[str, int]]:
+    return [(_label(value), counters.get(counter_key(model, field, value), 0)) for value, _ in choices]
+
+
+def get_admin_stats() -> Dict:
+    """Statistiques du tableau de bord, lues en une requête (recalculées s'il manque un total)"""
+    rows = list(StatCounter.objects.values_list('key', 'value', 'updated_at'))
+    # Un total absent : compteurs jamais initialisés, ou seulement par des écritures récentes
+    if not {counter_key(model) for model in TRACKED} <= {key for key, _, _ in rows}:
+        reconcile_counters()
+        rows = list(StatCounter.objects.values_list('key', 'value', 'updated_at'))
+    counters = {key: value for key, value, _ in rows}
+    return {
+        'patients': counters.get(counter_key(Patient), 0),
+        'doctors': counters.get(counter_key(Doctor), 0),
+        'approved_doctors': counters.get(counter_key(Doctor, 'is_approved', True), 0),
+        'pending_doctors': counters.get(counter_key(Doctor, 'is_approved', False), 0),
+        'consultations': counters.get(counter_key(Consultation), 0),
+        'consultations_by_status': _by_value(counters, Consultation, 'status', Consultation.STATUS_CHOICES),
+        'ai_triages': counters.get(counter_key(AITriage), 0),
+        'ai_triages_by_severity': _by_value(counters, AITriage, 'severity', AITriage.SEVERITY_CHOICES),
+        'payments': counters.get(counter_key(Payment), 0),
+        'payments_by_status': _by_value(counters, Payment, 'status', Payment.STATUS_CHOICES),
+        'updated_at': max((updated_at for _, _, updated_at in rows), default=None),
+    }
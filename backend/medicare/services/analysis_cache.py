@@ -0,0 +1,98 @@
+"""
+Cache des analyses de symptômes produites par Ollama.
+
+La clé est le texte normalisé des symptômes (minuscules, sans accents ni ponctuation,
+mots triés) : "Maux de tête et fatigue" et "fatigue, maux de tete" partagent la même
+entrée. Les analyses sont rangées dans l'alias de cache `ai_triage` (table en base ou
+Redis), commun aux workers web et à `run_triage_worker` ; l'éviction et la durée de vie
+sont celles du backend. La génération (invalidation) et les compteurs hits/misses sont
+tenus dans le cache `shared` : `manage.py triage_cache` agit sur les serveurs en cours
+d'exécution et lit leurs statistiques.
+"""
+import hashlib
+import re
+from typing import Dict, Optional
+
+from django.core.cache import InvalidCacheBackendError, caches
+
+from .symptom_matcher import fold_accents
+
+CACHE_ALIAS = 'ai_triage'
+
+_HITS_KEY = 'ai_triage:stats:hits'
+_MISSES_KEY = 'ai_triage:stats:misses'
+_GENERATION_KEY = 'ai_triage:generation'
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def _get_cache():
+    try:
+        return caches[CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _get_state_cache():
+    return caches['shared']
+
+
+def normalize_symptoms(symptoms: str) -> str:
+    """Minuscules, accents retirés, ponctuation supprimée, mots uniques triés"""
+    tokens = {token for token in _NON_WORD.split(fold_accents(symptoms)) if token}
+    return ' '.join(sorted(tokens))
+
+
+def _prompt_version() -> str:
+    """Empreinte du modèle et du prompt : les changer invalide toutes les entrées"""
+    from .ollama_service import PROMPT_TEMPLATE, SYSTEM_PROMPT, get_ollama_config
+
+    raw = '\x00'.join([get_ollama_config()['MODEL'], SYSTEM_PROMPT, PROMPT_TEMPLATE])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _cache_key(symptoms: str) -> str:
+    generation = _get_state_cache().get_or_set(_GENERATION_KEY, 1, timeout=None)
+    digest = hashlib.sha256(normalize_symptoms(symptoms).encode('utf-8')).hexdigest()
+    return f'ai_triage:analysis:{_prompt_version()}:{generation}:{digest}'
+
+
+def _incr(key: str) -> None:
+    cache = _get_state_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Compteur absent (premier appel ou éviction) : add évite d'écraser un autre worker
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cached_analysis(symptoms: str) -> Optional[Dict[str, str]]:
+    result = _get_cache().get(_cache_key(symptoms))
+    _incr(_HITS_KEY if result is not None else _MISSES_KEY)
+    return result
+
+
+def store_analysis(symptoms: str, result: Dict[str, str]) -> None:
+    # Durée de vie : TIMEOUT de l'alias de cache
+    _get_cache().set(_cache_key(symptoms), result)
+
+
+def invalidate_analysis_cache() -> None:
+    """Invalide toutes les analyses en cache en changeant de génération"""
+    cache = _get_state_cache()
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, timeout=None)
+
+
+def get_analysis_cache_stats() -> Dict[str, int]:
+    cache = _get_state_cache()
+    hits = cache.get(_HITS_KEY, 0)
+    misses = cache.get(_MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'generation': cache.get(_GENERATION_KEY, 1),
+    }
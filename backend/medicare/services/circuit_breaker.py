@@ -0,0 +1,129 @@
+"""
+Disjoncteur (circuit breaker) autour d'un service externe, avec état partagé par le cache.
+
+- fermé : les appels passent ; N échecs consécutifs (ou réponses trop lentes) l'ouvrent
+- ouvert : les appels sont refusés immédiatement (l'appelant passe au fallback)
+- semi-ouvert : après `recovery_timeout`, un seul appel de test est autorisé à la fois ;
+  un succès referme le disjoncteur, un échec le rouvre
+
+L'état est stocké dans le cache Django `cache_alias` : partagé entre processus avec un
+backend commun (cache `shared` : Redis ou table en base), local sinon. Les dernières latences servent à calculer
+p50/p99 et un timeout de lecture adaptatif ; elles sont rangées par fenêtre (`window`)
+pour que des appels de durées différentes (réponse complète, début d'un flux) ne faussent
+pas le timeout les uns des autres.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import caches
+
+from .percentiles import percentile
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+LATENCY_SAMPLES = 256
+DEFAULT_WINDOW = 'latencies'
+
+
+class CircuitBreaker:
+    """Disjoncteur nommé ; plusieurs instances de même nom partagent le même état"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30,
+                 latency_threshold: Optional[float] = None, cache_alias: str = 'default'):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_threshold = latency_threshold
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, suffix: str) -> str:
+        return f'circuit:{self.name}:{suffix}'
+
+    @property
+    def state(self) -> str:
+        opened_at = self.cache.get(self._key('opened_at'))
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        # Semi-ouvert : un seul processus obtient le droit de tester le service
+        return self.cache.add(self._key('probe'), 1, timeout=self.recovery_timeout)
+
+    def record_success(self, latency: Optional[float] = None, window: str = DEFAULT_WINDOW) -> None:
+        """Appel réussi ; sans `latency`, la durée a déjà été enregistrée par `record_latency`"""
+        if latency is not None:
+            self.record_latency(latency, window)
+        if self.latency_threshold is not None and latency is not None and latency > self.latency_threshold:
+            # Réponse trop lente : comptée comme un échec
+            self.record_failure()
+            return
+        if self.cache.get(self._key('opened_at')) is not None:
+            self.cache.delete_many([self._key('opened_at'), self._key('probe')])
+        self.cache.set(self._key('failures'), 0, timeout=None)
+
+    def record_failure(self, latency: Optional[float] = None, window: str = DEFAULT_WINDOW) -> None:
+        if latency is not None:
+            self.record_latency(latency, window)
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        try:
+            failures = self.cache.incr(self._key('failures'))
+        except ValueError:
+            self.cache.set(self._key('failures'), 1, timeout=None)
+            failures = 1
+        if failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.cache.set(self._key('opened_at'), time.time(), timeout=None)
+        self.cache.delete(self._key('probe'))
+
+    def reset(self, windows: Tuple[str, ...] = (DEFAULT_WINDOW,)) -> None:
+        self.cache.delete_many([
+            self._key('opened_at'), self._key('probe'), self._key('failures'),
+            *(self._key(window) for window in windows),
+        ])
+
+    def record_latency(self, latency: float, window: str = DEFAULT_WINDOW) -> None:
+        # Lecture-écriture non atomique : une mesure concurrente peut être perdue,
+        # sans conséquence pour des percentiles de supervision
+        latencies = self.cache.get(self._key(window), [])
+        latencies.append(round(latency, 4))
+        self.cache.set(self._key(window), latencies[-LATENCY_SAMPLES:], timeout=None)
+
+    def latencies(self, window: str = DEFAULT_WINDOW) -> List[float]:
+        return self.cache.get(self._key(window), [])
+
+    def adaptive_timeout(self, default: float, minimum: float, multiplier: float, min_samples: int = 20,
+                         window: str = DEFAULT_WINDOW) -> float:
+        """Timeout de lecture : `multiplier` x p99 observé dans `window`, borné par [minimum, default]"""
+        latencies = self.latencies(window)
+        if len(latencies) < min_samples:
+            return default
+        return max(minimum, min(default, percentile(latencies, 99) * multiplier))
+
+    def status(self) -> Dict[str, Any]:
+        latencies = self.latencies()
+        return {
+            'name': self.name,
+            'state': self.state,
+            'consecutive_failures': self.cache.get(self._key('failures'), 0),
+            'latency_samples': len(latencies),
+            'latency_p50': percentile(latencies, 50),
+            'latency_p99': percentile(latencies, 99),
+        }
@@ -0,0 +1,187 @@
+"""
+Écritures sur les consultations : messages (sendMessage, sendMessages, chat WebSocket) et statut.
+
+Un envoi ne relit ni la consultation ni ses messages : une requête vérifie que l'auteur
+participe à la consultation, un seul INSERT écrit tout le lot, puis un UPDATE conditionnel
+avance `Consultation.updated_at` (sans effet si une écriture plus récente l'a déjà fait).
+
+Les messages d'un lot (file hors ligne de l'application) sont rangés par numéro de
+séquence client puis reçoivent des `created_at` croissants : l'ordre du client est conservé
+et la reprise du chat par `created_at` ne peut pas en sauter un. L'unicité
+(consultation, auteur, séquence) rend le renvoi d'un lot sans effet ; seuls les messages
+réellement insérés sont diffusés aux participants connectés.
+"""
+from datetime import timedelta
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..channel_layer import consultation_group, get_channel_layer
+from ..models import Consultation, Message
+from .admin_stats import record_change
+
+MAX_MESSAGE_BATCH = 100
+
+# Statut cible -> statuts depuis lesquels la transition est permise
+STATUS_TRANSITIONS = {
+    'active': ('pending',),
+    'completed': ('pending', 'active'),
+    'cancelled': ('pending', 'active'),
+}
+
+Participant = Tuple[str, object]
+
+
+def message_payload(message: Message) -> Dict:
+    """Message sérialisé comme le type GraphQL (camelCase)"""
+    return {
+        'id': str(message.id),
+        'consultationId': str(message.consultation_id),
+        'senderId': str(message.sender_id),
+        'senderType': message.sender_type,
+        'content': message.content,
+        'photoUrl': message.photo_url,
+        'audioUrl': message.audio_url,
+        'clientSequence': message.client_sequence,
+        'createdAt': message.created_at.isoformat(),
+    }
+
+
+def publish_message(message: Message) -> None:
+    get_channel_layer().publish(
+        consultation_group(message.consultation_id), {'type': 'message', 'message': message_payload(message)}
+    )
+
+
+def consultation_participant(consultation_id, user_id) -> Tuple[Optional[Dict], Optional[Participant]]:
+    """(consultation, participant) ; participant = (sender_type, sender_id), None si l'utilisateur n'y participe pas"""
+    consultation = (
+        Consultation.objects.filter(pk=consultation_id)
+        .values('id', 'status', 'created_at', 'patient_id', 'patient__user_id', 'doctor_id', 'doctor__user_id')
+        .first()
+    )
+    if consultation is None:
+        return None, None
+    if consultation['patient__user_id'] == user_id:
+        return consultation, ('patient', consultation['patient_id'])
+    if consultation['doctor__user_id'] == user_id:
+        return consultation, ('doctor', consultation['doctor_id'])
+    return consultation, None
+
+
+def write_messages(consultation_id, participant: Participant, items: List[Dict]) -> List[Message]:
+    """
+    Écrit un lot de messages {content, photo_url, audio_url, client_sequence} d'un participant.
+
+    Renvoie les messages du lot dans l'ordre, y compris ceux déjà reçus lors d'un envoi
+    précédent (même `client_sequence`).
+    """
+    if not items:
+        return []
+    if len(items) > MAX_MESSAGE_BATCH:
+        raise Exception(f"Lot trop volumineux : {MAX_MESSAGE_BATCH} messages au plus")
+    sequences = [item.get('client_sequence') for item in items if item.get('client_sequence') is not None]
+    if any(sequence < 0 for sequence in sequences):
+        raise Exception("Numéro de séquence invalide")
+    if len(set(sequences)) != len(sequences):
+        raise Exception("Numéro de séquence en double dans le lot")
+    for item in items:
+        if not (item.get('content') or item.get('photo_url') or item.get('audio_url')):
+            raise Exception("Message vide")
+
+    # Ordre du client : séquence croissante, messages sans séquence à leur place d'envoi
+    ordered = sorted(
+        enumerate(items),
+        key=lambda entry: (entry[1].get('client_sequence') is None, entry[1].get('client_sequence') or 0, entry[0]),
+    )
+    sender_type, sender_id = participant
+    now = timezone.now()
+    messages = [
+        Message(
+            consultation_id=consultation_id,
+            sender_type=sender_type,
+            sender_id=sender_id,
+            content=item.get('content') or None,
+            photo_url=item.get('photo_url') or None,
+            audio_url=item.get('audio_url') or None,
+            client_sequence=item.get('client_sequence'),
+            created_at=now + timedelta(microseconds=offset),
+        )
+        for offset, (_, item) in enumerate(ordered)
+    ]
+
+    with transaction.atomic():
+        # Un seul INSERT ; les séquences déjà enregistrées sont ignorées par la contrainte d'unicité
+        Message.objects.bulk_create(messages, ignore_conflicts=bool(sequences))
+        stored = {}
+        if sequences:
+            stored = {
+                message.client_sequence: message
+                for message in Message.objects.filter(
+                    consultation_id=consultation_id, sender_id=sender_id, client_sequence__in=sequences,
+                )
+            }
+        inserted_ids = {message.id for message in messages}
+        result = [stored.get(message.client_sequence, message) if message.client_sequence is not None else message
+                  for message in messages]
+        inserted = [message for message in result if message.id in inserted_ids]
+        if inserted:
+            latest = inserted[-1].created_at
+            Consultation.objects.filter(pk=consultation_id, updated_at__lt=latest).update(updated_at=latest)
+            for message in inserted:
+                # bulk_create n'émet pas post_save : diffusion explicite après commit
+                transaction.on_commit(partial(publish_message, message))
+    return result
+
+
+def update_consultation_status(consultation: Dict, status: str, attempts: int = 3) -> Consultation:
+    """
+    Change le statut par compare-and-set (UPDATE ... WHERE status = statut lu) : deux
+    changements simultanés ne peuvent pas s'écraser. `consultation` : ligne lue par
+    `consultation_participant`. Si la consultation a déjà le statut demandé (dès la lecture
+    ou après un changement concurrent), rien n'est écrit et la ligne stockée est renvoyée.
+    """
+    allowed = STATUS_TRANSITIONS.get(status)
+    if allowed is None:
+        raise Exception("Statut de consultation invalide")
+    current = consultation['status']
+    now = timezone.now()
+    attempt = 0
+    updated = 0
+    while current != status:
+        if current not in allowed:
+            raise Exception(f"Transition de statut impossible : {current} -> {status}")
+        if attempt == attempts:
+            raise Exception("Statut modifié simultanément, réessayez")
+        attempt += 1
+        with transaction.atomic():
+            updated = Consultation.objects.filter(pk=consultation['id'], status=current).update(
+                status=status, updated_at=now,
+            )
+            if updated:
+                # update() n'émet pas de signaux : compteurs de adminStats mis à jour explicitement
+                transaction.on_commit(partial(record_change, Consultation, {'status': current}, {'status': status}))
+                break
+        current = Consultation.objects.filter(pk=consultation['id']).values_list('status', flat=True).first()
+        if current is None:
+            raise Exception("Consultation non trouvée")
+    if not updated:
+        # Aucune écriture : updated_at (et le statut) sont ceux de la base, pas `now`
+        stored = (
+            Consultation.objects.filter(pk=consultation['id'])
+            .only('id', 'patient_id', 'doctor_id', 'status', 'created_at', 'updated_at')
+            .first()
+        )
+        if stored is None:
+            raise Exception("Consultation non trouvée")
+        return stored
+    return Consultation(
+        id=consultation['id'],
+        patient_id=consultation['patient_id'],
+        doctor_id=consultation['doctor_id'],
+        status=status,
+        created_at=consultation['created_at'],
+        updated_at=now,
+    )
@@ -0,0 +1,100 @@
+"""
+Cache des réponses de l'annuaire des médecins (`doctors`, `doctor`, `doctorsConnection`).
+
+Ces requêtes ne dépendent pas de l'utilisateur : la réponse d'une opération est mise
+en cache sous une clé (document, nom d'opération, variables) et une version de
+l'annuaire. Toute modification d'un médecin (signaux post_save/post_delete, ou appel
+explicite après un `update()` en masse) change la version, ce qui invalide d'un coup
+toutes les réponses et met à jour la date Last-Modified ; l'ensemble des médecins en
+ligne entre aussi dans la version.
+
+La version est tenue dans le cache `shared`, commun à tous les workers ; les réponses,
+indexées par version, restent dans le cache local de chaque processus.
+"""
+import hashlib
+import json
+import time
+import uuid
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql.language import FieldNode
+
+from .presence import presence_state
+
+DIRECTORY_FIELDS = frozenset(['doctors', 'doctor', 'doctorsConnection'])
+
+_STATE_KEY = 'doctor_directory:state'
+
+
+def _get_cache():
+    return caches['default']
+
+
+def _get_state_cache():
+    return caches['shared']
+
+
+def _timeout() -> int:
+    return getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 300)
+
+
+def is_directory_operation(operation) -> bool:
+    """Vrai si l'opération est une lecture qui ne sélectionne que des champs de l'annuaire"""
+    if operation is None or operation.operation.value != 'query':
+        return False
+    fields = []
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            # Fragments à la racine : non pris en charge, la requête est exécutée normalement
+            return False
+        if selection.name.value != '__typename':
+            fields.append(selection.name.value)
+    return bool(fields) and all(field in DIRECTORY_FIELDS for field in fields)
+
+
+def _stored_state() -> Dict:
+    return _get_state_cache().get_or_set(
+        _STATE_KEY, lambda: {'version': uuid.uuid4().hex, 'last_modified': int(time.time())}, timeout=None
+    )
+
+
+def directory_version() -> str:
+    """Version des données des médecins seules (hors présence)"""
+    return _stored_state()['version']
+
+
+def get_directory_state(request=None) -> Dict:
+    """
+    Version courante de l'annuaire et date (timestamp) de sa dernière modification.
+
+    La présence des médecins (medicare/services/presence.py) en fait partie : un médecin
+    qui se connecte ou se déconnecte change la version sans invalider le reste.
+    """
+    state = _stored_state()
+    presence = presence_state()
+    if request is not None:
+        request.online_doctor_ids = presence['online']
+    return {
+        'version': f"{state['version']}:{presence['fingerprint']}",
+        'last_modified': max(state['last_modified'], presence['changed_at']),
+    }
+
+
+def invalidate_doctor_directory() -> None:
+    """À appeler après toute modification de médecins qui ne passe pas par save()/delete()"""
+    _get_state_cache().set(_STATE_KEY, {'version': uuid.uuid4().hex, 'last_modified': int(time.time())}, timeout=None)
+
+
+def response_cache_key(state: Dict, document_key: str, operation_name: Optional[str], variables) -> str:
+    raw = json.dumps([document_key, operation_name, variables or {}], sort_keys=True, default=str)
+    return f"doctor_directory:{state['version']}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def get_cached_response(key: str) -> Optional[Dict]:
+    return _get_cache().get(key)
+
+
+def store_response(key: str, data: Dict) -> None:
+    _get_cache().set(key, data, timeout=_timeout())
@@ -0,0 +1,163 @@
+"""
+Recherche dans l'annuaire des médecins : index en mémoire par processus.
+
+Les extensions trigrammes / plein texte de PostgreSQL ne sont pas disponibles sur SQLite,
+et l'annuaire (quelques milliers de médecins) tient en mémoire. L'index est reconstruit
+en une seule requête lorsque la version de l'annuaire change (signaux post_save /
+post_delete, voir medicare/services/directory_cache.py), puis chaque recherche est
+servie sans lire la base, hormis le chargement des médecins de la page renvoyée.
+
+- Texte : nom, spécialité, e-mail et téléphone, sans casse ni accents (`fold_accents`).
+  Chaque mot recherché doit apparaître dans l'un de ces champs : les candidats sont
+  l'intersection des listes de trigrammes du mot (n-grammes plus courts pour les mots
+  courts), puis vérifiés par sous-chaîne.
+- Prix et note : tableaux triés, bornes trouvées par recherche dichotomique.
+- Facettes : nombre de médecins par spécialité parmi les résultats, hors filtre de spécialité.
+"""
+import bisect
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from ..models import Doctor
+from .directory_cache import directory_version
+from .symptom_matcher import fold_accents
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class DoctorSearchIndex:
+    """Index des médecins : n-grammes, intervalles de prix et de note, ordre d'affichage"""
+
+    def __init__(self, rows: Iterable[Dict]):
+        rows = list(rows)
+        self.ids = [row['id'] for row in rows]
+        self.positions = {str(doctor_id): position for position, doctor_id in enumerate(self.ids)}
+        self.texts = []
+        self.specialties = []
+        self.specialty_keys = []
+        self.approved = []
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        prices, ratings = [], []
+
+        for position, row in enumerate(rows):
+            fields = (row['name'], row['specialty'], row['user__email'], row['phone'])
+            text = ' | '.join(fold_accents(value) for value in fields if value)
+            self.texts.append(text)
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in _ngrams(text, size):
+                    self._grams[gram].add(position)
+            specialty = (row['specialty'] or '').strip()
+            self.specialties.append(specialty)
+            self.specialty_keys.append(fold_accents(specialty))
+            self.approved.append(row['is_approved'])
+            prices.append((float(row['price']), position))
+            if row['rating'] is not None:
+                ratings.append((float(row['rating']), position))
+
+        prices.sort()
+        ratings.sort()
+        self._prices = prices
+        self._price_keys = [price for price, _ in prices]
+        self._ratings = ratings
+        self._rating_keys = [rating for rating, _ in ratings]
+        # Ordre de l'annuaire : meilleure note d'abord (sans note en dernier), puis nom
+        order = sorted(
+            range(len(rows)),
+            key=lambda position: (
+                rows[position]['rating'] is None, -float(rows[position]['rating'] or 0), rows[position]['name'],
+            ),
+        )
+        self.rank = [0] * len(rows)
+        for rank, position in enumerate(order):
+            self.rank[position] = rank
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _match_token(self, token: str) -> Set[int]:
+        grams = _ngrams(token, NGRAM_SIZE) if len(token) >= NGRAM_SIZE else {token}
+        postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        if len(token) <= NGRAM_SIZE:
+            return candidates
+        # Les trigrammes peuvent être présents sans former le mot recherché
+        return {position for position in candidates if token in self.texts[position]}
+
+    @staticmethod
+    def _range(keys: List[float], entries: List[Tuple[float, int]],
+               minimum: Optional[float], maximum: Optional[float]) -> Set[int]:
+        start = 0 if minimum is None else bisect.bisect_left(keys, minimum)
+        end = len(keys) if maximum is None else bisect.bisect_right(keys, maximum)
+        return {position for _, position in entries[start:end]}
+
+    def search(self, query: str = '', specialty: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               min_rating: Optional[float] = None, max_rating: Optional[float] = None,
+               approved: Optional[bool] = None, among_ids: Optional[FrozenSet[str]] = None) -> Dict:
+        """Positions des résultats dans l'ordre de l'annuaire, et facettes par spécialité"""
+        candidates: Optional[Set[int]] = None
+
+        def narrow(matches: Set[int]) -> None:
+            nonlocal candidates
+            candidates = matches if candidates is None else candidates & matches
+
+        for token in fold_accents(query or '').split():
+            narrow(self._match_token(token))
+        if min_price is not None or max_price is not None:
+            narrow(self._range(self._price_keys, self._prices, min_price, max_price))
+        if min_rating is not None or max_rating is not None:
+            narrow(self._range(self._rating_keys, self._ratings, min_rating, max_rating))
+        if among_ids is not None:
+            narrow({self.positions[doctor_id] for doctor_id in among_ids if doctor_id in self.positions})
+        if candidates is None:
+            candidates = set(range(len(self.ids)))
+        if approved is not None:
+            candidates = {position for position in candidates if self.approved[position] == approved}
+
+        facets = Counter(self.specialties[position] for position in candidates)
+        if specialty:
+            key = fold_accents(specialty.strip())
+            candidates = {position for position in candidates if self.specialty_keys[position] == key}
+        return {
+            'positions': sorted(candidates, key=self.rank.__getitem__),
+            'facets': sorted(facets.items(), key=lambda item: (-item[1], item[0])),
+        }
+
+
+_lock = threading.Lock()
+_index: Tuple[Optional[str], Optional[DoctorSearchIndex]] = (None, None)
+
+
+def build_index() -> DoctorSearchIndex:
+    return DoctorSearchIndex(
+        Doctor.objects.values('id', 'name', 'specialty', 'phone', 'price', 'rating', 'is_approved', 'user__email')
+    )
+
+
+def get_search_index() -> DoctorSearchIndex:
+    """Index de la version courante de l'annuaire, reconstruit une fois par modification"""
+    global _index
+    version = directory_version()
+    if _index[0] == version:
+        return _index[1]
+    with _lock:
+        if _index[0] != version:
+            _index = (version, build_index())
+        return _index[1]
+
+
+def search_doctors(first: int, offset: int = 0, **filters) -> Dict:
+    """Identifiants des médecins de la page demandée, nombre total de résultats et facettes"""
+    index = get_search_index()
+    result = index.search(**filters)
+    positions = result['positions']
+    return {
+        'total': len(positions),
+        'ids': [index.ids[position] for position in positions[offset:offset + first]],
+        'facets': result['facets'],
+    }
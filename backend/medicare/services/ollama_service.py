@@ -3,27 +3,145 @@ Service pour l'intégration avec l'API Ollama pour le triage médical par IA
 """
 import requests
 import json
-from typing import Dict, Optional
+import logging
+import re
+import time
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Clé API Ollama
-OLLAMA_API_KEY = "9461e12c2edd4b51b21f1406f89a167c.N0PkBrfSB6W3nVWe2b0O1b_z"
-OLLAMA_API_URL = "https://ollama.com/api/generate"  # Endpoint pour l'API cloud Ollama
+from .circuit_breaker import DEFAULT_WINDOW, CircuitBreaker
 
+# Valeurs par défaut, surchargées par settings.OLLAMA
+DEFAULT_OLLAMA_CONFIG = {
+    'API_URL': "https://ollama.com/api/generate",  # Endpoint pour l'API cloud Ollama
+    'API_KEY': "",
+    'MODEL': "llama3.2",  # Modèle par défaut, peut être ajusté
+    'POOL_SIZE': 10,  # Connexions keep-alive conservées par hôte
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 30,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.5,  # Attente entre tentatives : 0.5s, 1s, 2s...
+    # Disjoncteur : après N échecs consécutifs, fallback direct pendant RECOVERY_TIMEOUT secondes
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RECOVERY_TIMEOUT': 30,
+    'CIRCUIT_LATENCY_THRESHOLD': 20,  # Réponse plus lente comptée comme un échec
+    # Timeout de lecture adaptatif : multiplicateur du p99 observé, borné par [MIN_READ_TIMEOUT, READ_TIMEOUT]
+    'ADAPTIVE_TIMEOUT_MULTIPLIER': 2,
+    'MIN_READ_TIMEOUT': 5,
+}
 
-def analyze_symptoms_with_ollama(symptoms: str) -> Dict[str, str]:
+# Fenêtre des latences jusqu'au début d'un flux : quelques millisecondes, à ne pas mêler aux
+# générations complètes qui dimensionnent le timeout des appels non streamés
+STREAM_WINDOW = 'stream_latencies'
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = Lock()
+
+
+def get_ollama_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_OLLAMA_CONFIG)
+    config.update(getattr(settings, 'OLLAMA', {}))
+    return config
+
+
+def is_ollama_configured() -> bool:
+    """Faux sans clé d'API (OLLAMA_API_KEY) : les analyses passent par les mots-clés"""
+    return bool(get_ollama_config()['API_KEY'])
+
+
+def get_ollama_session() -> requests.Session:
     """
-    Analyse les symptômes avec Ollama et retourne une évaluation structurée.
-    
-    Args:
-        symptoms: Description des symptômes du patient
-        
-    Returns:
-        Dict contenant severity, advice, et recommendation
+    Client HTTP partagé par le processus : les connexions TCP/TLS vers Ollama sont
+    réutilisées entre les triages au lieu d'être rouvertes à chaque appel.
     """
-    try:
-        # Prompt structuré pour obtenir une réponse formatée
-        prompt = f"""Tu es un assistant médical expert en triage. Analyse les symptômes suivants et fournis une évaluation médicale professionnelle.
+    global _session
+    with _session_lock:
+        if _session is None:
+            config = get_ollama_config()
+            retry = Retry(
+                total=config['MAX_RETRIES'],
+                connect=config['MAX_RETRIES'],
+                read=0,  # Ne pas relancer une génération déjà envoyée au modèle
+                status=config['MAX_RETRIES'],
+                backoff_factor=config['BACKOFF_FACTOR'],
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset(['POST']),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=config['POOL_SIZE'],
+                pool_maxsize=config['POOL_SIZE'],
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {config['API_KEY']}",
+                "Content-Type": "application/json"
+            })
+            _session = session
+        return _session
+
+
+def reset_ollama_client() -> None:
+    """Ferme le client partagé ; le prochain appel le recrée avec la configuration courante"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    config = get_ollama_config()
+    return CircuitBreaker(
+        'ollama',
+        failure_threshold=config['CIRCUIT_FAILURE_THRESHOLD'],
+        recovery_timeout=config['CIRCUIT_RECOVERY_TIMEOUT'],
+        latency_threshold=config['CIRCUIT_LATENCY_THRESHOLD'],
+        # Workers web, run_triage_worker et /health/ollama/ voient le même disjoncteur
+        cache_alias='shared',
+    )
+
+
+def _read_timeout(config: Dict[str, Any], breaker: CircuitBreaker, window: str = DEFAULT_WINDOW) -> float:
+    return breaker.adaptive_timeout(
+        default=config['READ_TIMEOUT'],
+        minimum=config['MIN_READ_TIMEOUT'],
+        multiplier=config['ADAPTIVE_TIMEOUT_MULTIPLIER'],
+        window=window,
+    )
+
+
+def get_ollama_status() -> Dict[str, Any]:
+    """État du disjoncteur, latences p50/p99 et timeouts courants, pour la supervision"""
+    config = get_ollama_config()
+    breaker = get_circuit_breaker()
+    stream_latencies = breaker.latencies(STREAM_WINDOW)
+    return {
+        **breaker.status(),
+        'read_timeout': _read_timeout(config, breaker),
+        'stream_latency_samples': len(stream_latencies),
+        'stream_read_timeout': _read_timeout(config, breaker, STREAM_WINDOW),
+    }
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    # Permet aux tests de pointer le client vers un serveur local avec override_settings
+    if setting == 'OLLAMA':
+        reset_ollama_client()
+
+# Prompt structuré pour obtenir une réponse formatée
+PROMPT_TEMPLATE = """Tu es un assistant médical expert en triage. Analyse les symptômes suivants et fournis une évaluation médicale professionnelle.
 
 Symptômes décrits: {symptoms}
 
@@ -40,112 +158,289 @@ Critères de gravité:
 
 Réponds UNIQUEMENT avec un objet JSON valide, sans texte supplémentaire."""
 
-        headers = {
-            "Authorization": f"Bearer {OLLAMA_API_KEY}",
-            "Content-Type": "application/json"
-        }
+# Format pour l'API Ollama /api/generate
+SYSTEM_PROMPT = "Tu es un assistant médical expert. Tu fournis des évaluations de triage médical en français, toujours au format JSON strict."
+
 
-        # Format pour l'API Ollama /api/generate
-        full_prompt = f"""Tu es un assistant médical expert. Tu fournis des évaluations de triage médical en français, toujours au format JSON strict.
+def analyze_symptoms_with_ollama(symptoms: str) -> Dict[str, str]:
+    """
+    Analyse les symptômes avec Ollama et retourne une évaluation structurée.
+    
+    Les réponses du modèle sont mises en cache sur le texte normalisé des symptômes ;
+    les analyses de fallback ne sont jamais mises en cache.
+    
+    Args:
+        symptoms: Description des symptômes du patient
+        
+    Returns:
+        Dict contenant severity, advice, et recommendation
+    """
+    from .analysis_cache import get_cached_analysis, store_analysis
 
-{prompt}"""
+    cached = get_cached_analysis(symptoms)
+    if cached is not None:
+        return cached
+    if not is_ollama_configured():
+        # Sans clé, chaque appel serait refusé : ni requête, ni échec compté par le disjoncteur
+        return _fallback_analysis(symptoms)
 
-        payload = {
-            "model": "llama3.2",  # Modèle par défaut, peut être ajusté
-            "prompt": full_prompt,
-            "stream": False,  # Pas de streaming pour une réponse complète
-            "options": {
-                "temperature": 0.3,  # Température plus basse pour des réponses plus cohérentes
-                "num_predict": 500  # Nombre maximum de tokens à générer
-            }
-        }
+    breaker = get_circuit_breaker()
+    if not breaker.allow_request():
+        # Service dégradé : pas d'attente du timeout, fallback immédiat
+        return _fallback_analysis(symptoms)
 
-        response = requests.post(
-            OLLAMA_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            # L'API Ollama /api/generate retourne directement le texte dans "response"
-            content = data.get("response", "")
-            
-            if not content:
-                raise ValueError("Réponse vide de l'API Ollama")
-            
-            # Extraire le JSON de la réponse
-            try:
-                # Essayer de parser directement
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # Si la réponse contient du texte avant/après le JSON, essayer de l'extraire
-                import re
-                # Chercher un objet JSON dans la réponse
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    raise ValueError("Impossible d'extraire le JSON de la réponse")
-            
-            # Valider et normaliser la réponse
-            severity = result.get("severity", "medium").lower()
-            if severity not in ["low", "medium", "high", "critical"]:
-                severity = "medium"
-            
-            return {
-                "severity": severity,
-                "advice": result.get("advice", "Surveillez vos symptômes et consultez un médecin si nécessaire."),
-                "recommendation": result.get("recommendation", "Surveillance recommandée.")
-            }
-        else:
-            # En cas d'erreur API, utiliser une logique de fallback
-            print(f"Erreur API Ollama: {response.status_code} - {response.text}")
-            return _fallback_analysis(symptoms)
-            
+    started = time.monotonic()
+    try:
+        result = _request_ollama_analysis(symptoms, breaker)
     except requests.exceptions.RequestException as e:
+        breaker.record_failure(time.monotonic() - started)
         print(f"Erreur de connexion à Ollama: {str(e)}")
         return _fallback_analysis(symptoms)
+    except OllamaAPIError as e:
+        breaker.record_failure(time.monotonic() - started)
+        # En cas d'erreur API, utiliser une logique de fallback
+        print(f"Erreur API Ollama: {str(e)}")
+        return _fallback_analysis(symptoms)
     except (json.JSONDecodeError, ValueError, KeyError) as e:
+        # Le service a répondu : une réponse mal formée n'ouvre pas le disjoncteur
+        breaker.record_success(time.monotonic() - started)
         print(f"Erreur de parsing de la réponse Ollama: {str(e)}")
         return _fallback_analysis(symptoms)
     except Exception as e:
+        breaker.record_failure(time.monotonic() - started)
         print(f"Erreur inattendue avec Ollama: {str(e)}")
         return _fallback_analysis(symptoms)
 
+    breaker.record_success(time.monotonic() - started)
+    store_analysis(symptoms, result)
+    return result
 
-def _fallback_analysis(symptoms: str) -> Dict[str, str]:
-    """
-    Analyse de fallback basée sur des mots-clés si Ollama n'est pas disponible.
-    """
-    symptoms_lower = symptoms.lower()
+
+class OllamaAPIError(Exception):
+    """Réponse HTTP en erreur de l'API Ollama"""
+
+
+def _build_payload(symptoms: str, config: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    full_prompt = f"""{SYSTEM_PROMPT}
+
+{PROMPT_TEMPLATE.format(symptoms=symptoms)}"""
+
+    return {
+        "model": config['MODEL'],
+        "prompt": full_prompt,
+        "stream": stream,
+        "options": {
+            "temperature": 0.3,  # Température plus basse pour des réponses plus cohérentes
+            "num_predict": 500  # Nombre maximum de tokens à générer
+        }
+    }
+
+
+def _request_ollama_analysis(symptoms: str, breaker: CircuitBreaker) -> Dict[str, str]:
+    """Appelle Ollama et valide la réponse ; lève une exception en cas d'échec"""
+    config = get_ollama_config()
+
+    response = get_ollama_session().post(
+        config['API_URL'],
+        json=_build_payload(symptoms, config, stream=False),  # Pas de streaming pour une réponse complète
+        timeout=(config['CONNECT_TIMEOUT'], _read_timeout(config, breaker))
+    )
+
+    if response.status_code != 200:
+        raise OllamaAPIError(f"{response.status_code} - {response.text}")
+
+    data = response.json()
+    # L'API Ollama /api/generate retourne directement le texte dans "response"
+    content = data.get("response", "")
     
-    # Déterminer la gravité
-    critical_keywords = ['douleur poitrine', 'difficulté respirer', 'perte connaissance', 'douleur thoracique', 'essoufflement sévère']
-    high_keywords = ['fièvre élevée', 'vomissements', 'saignement', 'fièvre persistante', 'vomissements répétés']
-    medium_keywords = ['maux tête', 'fatigue', 'nausée', 'maux de tête', 'fatigue importante']
+    if not content:
+        raise ValueError("Réponse vide de l'API Ollama")
     
-    if any(keyword in symptoms_lower for keyword in critical_keywords):
-        severity = 'critical'
-        advice = "URGENCE MÉDICALE - Consultez immédiatement un médecin ou appelez les urgences."
-        recommendation = "Consultation d'urgence requise immédiatement."
-    elif any(keyword in symptoms_lower for keyword in high_keywords):
-        severity = 'high'
-        advice = "Consultez un médecin dans les prochaines heures. Surveillez vos symptômes attentivement."
-        recommendation = "Consultation recommandée dans les 2-4 heures."
-    elif any(keyword in symptoms_lower for keyword in medium_keywords):
-        severity = 'medium'
-        advice = "Surveillez vos symptômes. Reposez-vous et hydratez-vous bien. Si les symptômes persistent, consultez un médecin."
-        recommendation = "Consultation recommandée dans les 24-48h si les symptômes persistent."
-    else:
-        severity = 'low'
-        advice = "Vos symptômes semblent légers. Reposez-vous, hydratez-vous et surveillez l'évolution."
-        recommendation = "Surveillance à domicile recommandée. Consultez si aggravation."
+    return _parse_analysis(content)
+
+
+def _parse_analysis(content: str) -> Dict[str, str]:
+    """Extrait et normalise l'objet JSON produit par le modèle"""
+    try:
+        # Essayer de parser directement
+        result = json.loads(content)
+    except json.JSONDecodeError:
+        # Si la réponse contient du texte avant/après le JSON, essayer de l'extraire
+        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+        if json_match:
+            result = json.loads(json_match.group())
+        else:
+            raise ValueError("Impossible d'extraire le JSON de la réponse")
+    
+    # Valider et normaliser la réponse
+    severity = str(result.get("severity", "medium")).lower()
+    if severity not in ["low", "medium", "high", "critical"]:
+        severity = "medium"
     
     return {
         "severity": severity,
-        "advice": advice,
-        "recommendation": recommendation
+        "advice": result.get("advice", "Surveillez vos symptômes et consultez un médecin si nécessaire."),
+        "recommendation": result.get("recommendation", "Surveillance recommandée.")
     }
 
+
+class TriageStreamParser:
+    """
+    Analyse incrémentale du JSON généré token par token.
+
+    `severity` est signalée dès que sa valeur est complète (avant le reste de la
+    réponse), et le texte de `advice` est restitué au fur et à mesure.
+    """
+
+    _SEVERITY = re.compile(r'"severity"\s*:\s*"(low|medium|high|critical)"', re.IGNORECASE)
+    _ADVICE_START = re.compile(r'"advice"\s*:\s*"')
+    _INCOMPLETE_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{0,3})?$')
+
+    def __init__(self):
+        self.content = ""
+        self.severity: Optional[str] = None
+        self._advice_sent = ""
+        self._advice_done = False
+
+    def feed(self, token: str) -> List[Tuple[str, str]]:
+        """Ajoute un fragment et retourne les événements (type, valeur) nouvellement disponibles"""
+        self.content += token
+        events = []
+        if self.severity is None:
+            match = self._SEVERITY.search(self.content)
+            if match:
+                self.severity = match.group(1).lower()
+                events.append(('severity', self.severity))
+        if not self._advice_done:
+            delta = self._advice_delta()
+            if delta:
+                events.append(('advice', delta))
+        return events
+
+    def _advice_delta(self) -> str:
+        start = self._ADVICE_START.search(self.content)
+        if not start:
+            return ""
+        raw = self.content[start.end():]
+        # Fin de la chaîne : premier guillemet non échappé
+        end = re.search(r'(?<!\\)(?:\\\\)*"', raw)
+        if end:
+            raw = raw[:end.end() - 1]
+            self._advice_done = True
+        else:
+            raw = self._INCOMPLETE_ESCAPE.sub('', raw)
+        try:
+            text = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return ""
+        delta = text[len(self._advice_sent):]
+        self._advice_sent = text
+        return delta
+
+
+def stream_symptoms_analysis(symptoms: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Variante en streaming de `analyze_symptoms_with_ollama`.
+
+    Produit des événements ('severity', str), ('advice', fragment de texte) puis
+    toujours un dernier ('result', dict) identique au retour de la version non streamée.
+
+    Le disjoncteur reçoit un seul résultat par appel, une fois le flux terminé : une coupure
+    ou un timeout après le début de la réponse compte comme un échec, comme avant. La
+    latence enregistrée (fenêtre STREAM_WINDOW) est le délai jusqu'au début du flux.
+    """
+    from .analysis_cache import get_cached_analysis, store_analysis
+
+    cached = get_cached_analysis(symptoms)
+    if cached is not None:
+        yield ('severity', cached['severity'])
+        yield ('advice', cached['advice'])
+        yield ('result', cached)
+        return
+
+    breaker = get_circuit_breaker()
+    if not is_ollama_configured() or not breaker.allow_request():
+        result = _fallback_analysis(symptoms)
+        yield ('severity', result['severity'])
+        yield ('result', result)
+        return
+
+    parser = TriageStreamParser()
+    started = time.monotonic()
+    first_byte = None
+    try:
+        config = get_ollama_config()
+        with get_ollama_session().post(
+            config['API_URL'],
+            json=_build_payload(symptoms, config, stream=True),
+            # En streaming, le timeout de lecture porte sur l'attente entre deux lignes
+            timeout=(config['CONNECT_TIMEOUT'], _read_timeout(config, breaker, STREAM_WINDOW)),
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                raise OllamaAPIError(f"{response.status_code} - {response.text}")
+            first_byte = time.monotonic() - started
+            # Ollama renvoie un objet JSON par ligne (NDJSON)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                yield from parser.feed(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+        if not parser.content:
+            raise ValueError("Réponse vide de l'API Ollama")
+        result = _parse_analysis(parser.content)
+    except Exception as e:
+        if isinstance(e, (requests.exceptions.RequestException, OllamaAPIError)):
+            breaker.record_failure(first_byte, STREAM_WINDOW)
+            logger.warning("Erreur pendant le streaming Ollama : %s", e)
+        else:
+            # Le service a répondu : une réponse mal formée n'ouvre pas le disjoncteur
+            breaker.record_success(first_byte, STREAM_WINDOW)
+            if isinstance(e, ValueError):
+                logger.warning("Réponse de streaming Ollama invalide : %s", e)
+            else:
+                logger.exception("Erreur inattendue pendant le streaming Ollama")
+        result = _fallback_analysis(symptoms)
+        if parser.severity is None:
+            yield ('severity', result['severity'])
+    else:
+        breaker.record_success(first_byte, STREAM_WINDOW)
+        store_analysis(symptoms, result)
+    yield ('result', result)
+
+
+# Conseils associés à chaque gravité dans l'analyse par mots-clés
+FALLBACK_RESPONSES = {
+    'critical': {
+        "advice": "URGENCE MÉDICALE - Consultez immédiatement un médecin ou appelez les urgences.",
+        "recommendation": "Consultation d'urgence requise immédiatement.",
+    },
+    'high': {
+        "advice": "Consultez un médecin dans les prochaines heures. Surveillez vos symptômes attentivement.",
+        "recommendation": "Consultation recommandée dans les 2-4 heures.",
+    },
+    'medium': {
+        "advice": "Surveillez vos symptômes. Reposez-vous et hydratez-vous bien. Si les symptômes persistent, consultez un médecin.",
+        "recommendation": "Consultation recommandée dans les 24-48h si les symptômes persistent.",
+    },
+    'low': {
+        "advice": "Vos symptômes semblent légers. Reposez-vous, hydratez-vous et surveillez l'évolution.",
+        "recommendation": "Surveillance à domicile recommandée. Consultez si aggravation.",
+    },
+}
+
+
+def _fallback_analysis(symptoms: str) -> Dict[str, str]:
+    """
+    Analyse par mots-clés (lexique compilé de medicare/data/symptom_lexicon.csv),
+    utilisée si Ollama n'est pas disponible et comme évaluation provisoire des triages.
+    """
+    from .symptom_matcher import get_symptom_matcher
+
+    severity = get_symptom_matcher().classify(symptoms)
+    return {
+        "severity": severity,
+        **FALLBACK_RESPONSES[severity],
+    }
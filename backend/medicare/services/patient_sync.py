@@ -0,0 +1,69 @@
+"""
+Synchronisation différentielle des données d'un patient pour l'application mobile.
+
+Chaque écriture d'un rappel, d'une entrée du journal ou d'un triage IA reçoit la version
+suivante du patient (`Patient.next_sync_version`) ; chaque suppression laisse un
+`SyncTombstone` versionné. Le client conserve le `watermark` de sa dernière
+synchronisation et ne reçoit ensuite que les lignes de version supérieure.
+
+Les tombstones sont purgés après `SYNC_TOMBSTONE_RETENTION_DAYS` (purge_sync_tombstones) :
+un client dont le watermark est antérieur à la purge reçoit un instantané complet
+(`reset`) et remplace ses données locales.
+"""
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import AITriage, JournalEntry, Patient, Reminder, SyncTombstone
+
+
+def tombstone_retention() -> timedelta:
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+
+def changes_since(patient_id, updated_since: Optional[int]) -> Dict:
+    """Lignes modifiées et supprimées depuis `updated_since`, et nouveau watermark du client"""
+    # Watermark lu avant les lignes : toute version inférieure ou égale est déjà validée
+    state = Patient.objects.filter(pk=patient_id).values('sync_version', 'sync_floor').get()
+    reset = (
+        updated_since is None
+        or updated_since < state['sync_floor']
+        # Watermark inconnu du serveur (base restaurée, autre environnement)
+        or updated_since > state['sync_version']
+    )
+
+    def changed(model):
+        queryset = model.objects.filter(patient_id=patient_id)
+        if not reset:
+            queryset = queryset.filter(sync_version__gt=updated_since)
+        return list(queryset.order_by('sync_version'))
+
+    deleted = []
+    if not reset:
+        deleted = list(
+            SyncTombstone.objects.filter(patient_id=patient_id, sync_version__gt=updated_since)
+            .order_by('sync_version')
+        )
+    return {
+        'watermark': state['sync_version'],
+        'reset': reset,
+        'reminders': changed(Reminder),
+        'journal_entries': changed(JournalEntry),
+        'ai_triages': changed(AITriage),
+        'deleted': deleted,
+    }
+
+
+def purge_tombstones(older_than: Optional[timedelta] = None) -> int:
+    """Supprime les anciens tombstones et relève le plancher de synchronisation des patients"""
+    cutoff = timezone.now() - (older_than if older_than is not None else tombstone_retention())
+    expired = SyncTombstone.objects.filter(deleted_at__lt=cutoff)
+    with transaction.atomic():
+        for row in expired.values('patient_id').annotate(floor=Max('sync_version')):
+            Patient.objects.filter(pk=row['patient_id'], sync_floor__lt=row['floor']).update(sync_floor=row['floor'])
+        deleted, _ = expired.delete()
+    return deleted
@@ -0,0 +1,178 @@
+"""
+Rapprochement des paiements avec les fichiers de règlement des opérateurs (reconcile_payments).
+
+Le fichier CSV (`transaction_id,amount,status`, colonne `operator` facultative) est lu en
+flux et traité par tranches de `chunk_size` lignes : une requête `transaction_id IN (...)`
+par tranche retrouve les paiements, ceux encore en attente sont finalisés par UPDATE
+conditionnels (`finalize_pending`) et tous les paiements retrouvés sont marqués
+`reconciled_at`, dans le même UPDATE pour ceux qui sont finalisés. Ce marquage permet de repérer, sans garder en mémoire
+les références déjà lues, les lignes en double d'une tranche à l'autre puis, en fin de
+traitement, les paiements de la période absents du fichier.
+
+Les écarts sont écrits au fil de l'eau dans le rapport : la mémoire utilisée ne dépend que
+de la taille des tranches, pas de celle du fichier. Une simulation (`dry_run`) n'écrit pas
+`reconciled_at` : elle garde alors en mémoire les références retrouvées (une par paiement
+du fichier) pour signaler les mêmes doublons et paiements absents qu'un traitement réel.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.utils import timezone
+
+from ..models import Payment
+from .payments import finalize_pending, is_operator
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Statuts des fichiers de règlement -> statut final du paiement
+SETTLEMENT_STATUSES = {
+    'success': 'success',
+    'successful': 'success',
+    'settled': 'success',
+    'completed': 'success',
+    'failed': 'failed',
+    'failure': 'failed',
+    'rejected': 'failed',
+    'cancelled': 'failed',
+}
+
+REPORT_COLUMNS = ['line', 'transaction_id', 'issue', 'expected', 'actual']
+
+# Écarts signalés dans le rapport
+INVALID_ROW = 'invalid_row'
+UNKNOWN_TRANSACTION = 'unknown_transaction'
+DUPLICATE_ROW = 'duplicate_row'
+OPERATOR_MISMATCH = 'operator_mismatch'
+AMOUNT_MISMATCH = 'amount_mismatch'
+STATUS_MISMATCH = 'status_mismatch'
+MISSING_FROM_FILE = 'missing_from_file'
+
+Report = Callable[[Dict], None]
+
+
+def parse_settlement_row(row: Dict) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """(référence, ligne normalisée {reference, amount, status, operator}, None) ou (référence, None, raison)"""
+    row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items() if key is not None}
+    reference = row.get('transaction_id') or row.get('transactionid') or row.get('reference') or ''
+    if not reference:
+        return reference, None, 'référence absente'
+    try:
+        amount = Decimal(row.get('amount', '').replace(',', '.'))
+    except InvalidOperation:
+        return reference, None, f"montant invalide : {row.get('amount', '')}"
+    status = SETTLEMENT_STATUSES.get(row.get('status', '').lower())
+    if status is None:
+        return reference, None, f"statut inconnu : {row.get('status', '')}"
+    operator = row.get('operator', '').lower() or None
+    if operator is not None and not is_operator(operator):
+        return reference, None, f'opérateur inconnu : {operator}'
+    return reference, {'reference': reference, 'amount': amount, 'status': status, 'operator': operator}, None
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Reconciler:
+    """Rapprochement d'un fichier de règlement ; `stats` compte lignes, mises à jour et écarts"""
+
+    def __init__(self, report: Report, operator: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False):
+        self.report = report
+        self.operator = operator
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.started_at = timezone.now()
+        self.stats = Counter()
+        # Simulation seulement : références déjà retrouvées, en lieu et place de reconciled_at
+        self.matched_references = set()
+
+    def _issue(self, line, reference, issue, expected='', actual='') -> None:
+        self.stats[issue] += 1
+        self.report({'line': line, 'transaction_id': reference, 'issue': issue,
+                     'expected': expected, 'actual': actual})
+
+    def run(self, rows: Iterable[Tuple[int, Dict]]) -> Counter:
+        """`rows` : (numéro de ligne, ligne CSV brute), lues en flux"""
+        for chunk in _chunked(rows, self.chunk_size):
+            self._process_chunk(chunk)
+        return self.stats
+
+    def _process_chunk(self, chunk: List[Tuple[int, Dict]]) -> None:
+        parsed = []
+        for line, raw in chunk:
+            self.stats['lines'] += 1
+            reference, row, error = parse_settlement_row(raw)
+            if row is None:
+                self._issue(line, reference, INVALID_ROW, actual=error)
+            else:
+                parsed.append((line, row))
+
+        references = {row['reference'] for _, row in parsed}
+        payments = {
+            payment['transaction_id']: payment
+            for payment in Payment.objects.filter(transaction_id__in=references).values(
+                'id', 'transaction_id', 'operator', 'amount', 'status', 'reconciled_at',
+            )
+        }
+
+        seen = self.matched_references if self.dry_run else set()
+        matched_ids = set()
+        to_finalize: Dict[str, List] = defaultdict(list)
+        for line, row in parsed:
+            reference = row['reference']
+            payment = payments.get(reference)
+            if payment is None:
+                self._issue(line, reference, UNKNOWN_TRANSACTION)
+                continue
+            reconciled_at = payment['reconciled_at']
+            if reference in seen or (reconciled_at is not None and reconciled_at >= self.started_at):
+                self._issue(line, reference, DUPLICATE_ROW)
+                continue
+            seen.add(reference)
+            matched_ids.add(payment['id'])
+            self.stats['matched'] += 1
+
+            operator = row['operator'] or self.operator
+            if operator is not None and operator != payment['operator']:
+                self._issue(line, reference, OPERATOR_MISMATCH, payment['operator'], operator)
+            elif row['amount'] != payment['amount']:
+                self._issue(line, reference, AMOUNT_MISMATCH, payment['amount'], row['amount'])
+            elif payment['status'] == 'pending':
+                to_finalize[row['status']].append(payment['id'])
+            elif payment['status'] != row['status']:
+                self._issue(line, reference, STATUS_MISMATCH, payment['status'], row['status'])
+            else:
+                self.stats['ok'] += 1
+
+        if self.dry_run:
+            self.stats['updated'] += sum(len(ids) for ids in to_finalize.values())
+            return
+        now = timezone.now()
+        for status, ids in to_finalize.items():
+            updated = finalize_pending(Payment.objects.filter(pk__in=ids), status, now, reconciled_at=now)
+            self.stats['updated'] += updated
+            if updated == len(ids):
+                matched_ids.difference_update(ids)
+        if matched_ids:
+            # Paiements déjà finalisés, ou finalisés entre-temps par un callback
+            Payment.objects.filter(pk__in=matched_ids).update(reconciled_at=now)
+
+    def report_missing(self, start, end) -> None:
+        """Paiements créés dans [start, end) non retrouvés dans le fichier"""
+        payments = Payment.objects.filter(created_at__gte=start, created_at__lt=end)
+        if not self.dry_run:
+            payments = payments.exclude(reconciled_at__gte=self.started_at)
+        if self.operator is not None:
+            payments = payments.filter(operator=self.operator)
+        rows = payments.order_by('created_at').values_list('transaction_id', 'status')
+        for reference, status in rows.iterator(chunk_size=self.chunk_size):
+            if reference not in self.matched_references:
+                self._issue('', reference or '', MISSING_FROM_FILE, status)
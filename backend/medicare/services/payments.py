@@ -0,0 +1,174 @@
+"""
+Paiements mobile money (MVola, Orange Money, Airtel Money) : création et callbacks.
+
+`Payment.transaction_id` est la référence transmise à l'opérateur et porte un index
+unique : une création rejouée avec la même référence renvoie le paiement existant.
+
+Les opérateurs notifient le résultat par lots sur `/payments/callback/<opérateur>/`,
+souvent en double. `apply_callbacks` applique les transitions par des UPDATE conditionnels
+(`status='pending'` dans la clause WHERE), une requête par statut final et par tranche de
+références : aucune lecture-modification-écriture, et un callback rejoué ou traité en
+parallèle ne modifie plus aucune ligne. Les compteurs de `adminStats` sont ajustés dans
+la même transaction, les `update()` n'émettant pas de signaux.
+
+Chaque lot est d'abord journalisé tel quel dans `PaymentCallback` (un INSERT en masse par
+tranche), doublons et entrées mal formées compris, pour auditer a posteriori les rejeux.
+"""
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import Consultation, Payment, PaymentCallback
+from .admin_stats import apply_deltas, counter_key
+
+FINAL_STATUSES = ('success', 'failed')
+
+DEFAULT_PAYMENTS_CONFIG = {
+    'CALLBACK_TOKENS': {},
+    'CALLBACK_CHUNK_SIZE': 500,
+}
+
+
+def get_payments_config() -> Dict:
+    return {**DEFAULT_PAYMENTS_CONFIG, **getattr(settings, 'PAYMENTS', {})}
+
+
+def is_operator(operator: str) -> bool:
+    return operator in dict(Payment.OPERATOR_CHOICES)
+
+
+def create_payment(consultation: Consultation, operator: str,
+                   transaction_id: Optional[str] = None) -> Tuple[Payment, bool]:
+    """Paiement en attente de la consultation ; (paiement, créé) — idempotent sur `transaction_id`"""
+    if not is_operator(operator):
+        raise Exception("Opérateur de paiement inconnu")
+    transaction_id = (transaction_id or '').strip() or f'{operator.upper()}-{uuid.uuid4().hex}'
+    payment = Payment.objects.filter(transaction_id=transaction_id).first()
+    created = False
+    if payment is None:
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    consultation=consultation,
+                    amount=consultation.doctor.price,
+                    operator=operator,
+                    transaction_id=transaction_id,
+                )
+                created = True
+        except IntegrityError:
+            # Même référence créée en parallèle : l'index unique a tranché
+            payment = Payment.objects.get(transaction_id=transaction_id)
+    if payment.consultation_id != consultation.id or payment.operator != operator:
+        raise Exception("Référence de transaction déjà utilisée")
+    return payment, created
+
+
+def pending_payments(queryset):
+    """
+    Paiements de `queryset` encore en attente.
+
+    Écrit comme l'exclusion des statuts finaux : une condition NOT IN ne peut pas servir
+    d'index, le planificateur passe donc par la référence unique ou la clé primaire du
+    lot au lieu de parcourir tous les paiements en attente (payments_status_created_idx).
+    """
+    return queryset.exclude(status__in=FINAL_STATUSES)
+
+
+def finalize_pending(queryset, status: str, now=None, **fields) -> int:
+    """Passe à `status` (et `fields`) les paiements de `queryset` encore en attente ; lignes modifiées"""
+    with transaction.atomic():
+        count = pending_payments(queryset).update(
+            status=status, updated_at=now or timezone.now(), **fields,
+        )
+        if count:
+            apply_deltas({
+                counter_key(Payment, 'status', 'pending'): -count,
+                counter_key(Payment, 'status', status): count,
+            })
+    return count
+
+
+def parse_callbacks(items: Iterable) -> Tuple[Dict[str, str], Counter, int]:
+    """{référence: statut final} (première occurrence retenue), occurrences par référence, entrées invalides"""
+    statuses: Dict[str, str] = {}
+    occurrences = Counter()
+    invalid = 0
+    for item in items:
+        if not isinstance(item, dict):
+            invalid += 1
+            continue
+        reference = item.get('transactionId') or item.get('transaction_id')
+        status = str(item.get('status') or '').lower()
+        if not isinstance(reference, str) or not reference or status not in FINAL_STATUSES:
+            invalid += 1
+            continue
+        statuses.setdefault(reference, status)
+        occurrences[reference] += 1
+    return statuses, occurrences, invalid
+
+
+def record_callbacks(operator: str, items: List, now=None) -> None:
+    """Journalise les entrées d'un lot dans PaymentCallback, en INSERT groupés"""
+    now = now or timezone.now()
+    records = []
+    for item in items:
+        fields = item if isinstance(item, dict) else {}
+        reference = fields.get('transactionId') or fields.get('transaction_id')
+        status = fields.get('status')
+        records.append(PaymentCallback(
+            operator=operator,
+            transaction_id=reference[:200] if isinstance(reference, str) else '',
+            status=str(status or '').lower()[:20],
+            payload=item,
+            received_at=now,
+        ))
+    PaymentCallback.objects.bulk_create(records, batch_size=get_payments_config()['CALLBACK_CHUNK_SIZE'])
+
+
+def _chunks(values: List[str], size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def apply_callbacks(operator: str, items: Iterable) -> Dict[str, int]:
+    """
+    Applique un lot de callbacks d'un opérateur.
+
+    Renvoie `received` (entrées du lot), `applied` (paiements passés à success/failed),
+    `ignored` (paiements déjà finalisés : doublons, rejeux), `unknown` (références
+    inconnues de cet opérateur) et `invalid` (entrées mal formées), en nombre d'entrées.
+    """
+    items = list(items)
+    now = timezone.now()
+    record_callbacks(operator, items, now)
+    statuses, occurrences, invalid = parse_callbacks(items)
+    chunk_size = get_payments_config()['CALLBACK_CHUNK_SIZE']
+    payments = Payment.objects.filter(operator=operator)
+
+    by_status: Dict[str, List[str]] = {status: [] for status in FINAL_STATUSES}
+    for reference, status in statuses.items():
+        by_status[status].append(reference)
+
+    applied = Counter()
+    for status, references in by_status.items():
+        for chunk in _chunks(references, chunk_size):
+            applied[status] += finalize_pending(payments.filter(transaction_id__in=chunk), status, now)
+
+    known = set()
+    for chunk in _chunks(list(statuses), chunk_size):
+        known.update(payments.filter(transaction_id__in=chunk).values_list('transaction_id', flat=True))
+    unknown = sum(count for reference, count in occurrences.items() if reference not in known)
+    total_applied = sum(applied.values())
+    return {
+        'received': len(items),
+        'applied': total_applied,
+        'success': applied['success'],
+        'failed': applied['failed'],
+        'ignored': sum(occurrences.values()) - unknown - total_applied,
+        'unknown': unknown,
+        'invalid': invalid,
+    }
@@ -0,0 +1,13 @@
+"""
+Percentiles de séries de mesures (latences, retards) pour la supervision et les bancs de charge.
+"""
+from typing import List, Optional
+
+
+def percentile(values: List[float], rank: float) -> Optional[float]:
+    """Valeur au rang `rank` (0-100) par la méthode du plus proche rang ; None sans mesure"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(rank / 100 * (len(ordered) - 1))))
+    return ordered[index]
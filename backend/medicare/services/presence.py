@@ -0,0 +1,153 @@
+"""
+Présence des médecins tenue dans le cache, sans écriture en base à chaque battement.
+
+Chaque battement (`POST /presence/heartbeat/`) écrit une clé `presence:doctor:<id>` à durée
+de vie `DOCTOR_PRESENCE_TTL` : un médecin est en ligne tant que sa clé existe. L'ensemble
+des médecins en ligne est lu d'un seul `get_many` sur la liste des médecins (elle-même
+en cache). `sync_doctor_presence` recopie périodiquement cet état dans `Doctor.is_online`,
+en deux UPDATE en masse, pour l'administration et les rapports.
+
+Les clés vivent dans le cache `shared`, commun à tous les workers : un battement reçu par
+un processus est vu par les autres, y compris après un redémarrage. Ce cache doit être une
+mémoire partagée (Redis) en production : en base, chaque battement est une écriture SQL
+(signalé par medicare.W001). Les lectures ne le sollicitent pas à chaque requête : chaque
+processus garde un instantané des médecins en ligne, relu au plus toutes les
+`DOCTOR_PRESENCE_REFRESH` secondes, ou dès qu'un battement qu'il reçoit le contredit.
+"""
+import hashlib
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..models import Doctor
+
+_ROSTER_KEY = 'presence:roster'
+_STATE_KEY = 'presence:state'
+ROSTER_TIMEOUT = 300
+
+# Instantané local au processus : {'online', 'fingerprint', 'changed_at', 'fetched_at'}
+_local = {'snapshot': None}
+_local_lock = threading.Lock()
+
+
+def _get_cache():
+    return caches['shared']
+
+
+def presence_ttl() -> int:
+    return getattr(settings, 'DOCTOR_PRESENCE_TTL', 60)
+
+
+def presence_refresh() -> float:
+    return getattr(settings, 'DOCTOR_PRESENCE_REFRESH', 5)
+
+
+def _doctor_key(doctor_id) -> str:
+    return f'presence:doctor:{doctor_id}'
+
+
+def _user_key(username: str) -> str:
+    return f'presence:user:{username}'
+
+
+def doctor_id_for_username(username: str) -> Optional[str]:
+    """Médecin associé à un compte (mis en cache : un battement ne lit pas la base)"""
+    cache = _get_cache()
+    doctor_id = cache.get(_user_key(username))
+    if doctor_id is None:
+        doctor_id = Doctor.objects.filter(user__username=username).values_list('id', flat=True).first()
+        # '' mémorise aussi l'absence de profil médecin
+        doctor_id = str(doctor_id) if doctor_id is not None else ''
+        cache.set(_user_key(username), doctor_id, timeout=ROSTER_TIMEOUT)
+    return doctor_id or None
+
+
+def _expire_snapshot_unless(doctor_id, online: bool) -> None:
+    # Le battement contredit l'instantané local : relu à la prochaine lecture
+    snapshot = _local['snapshot']
+    if snapshot is not None and (str(doctor_id) in snapshot['online']) != online:
+        _local['snapshot'] = None
+
+
+def heartbeat(doctor_id) -> None:
+    _get_cache().set(_doctor_key(doctor_id), int(time.time()), timeout=presence_ttl())
+    _expire_snapshot_unless(doctor_id, online=True)
+
+
+def go_offline(doctor_id) -> None:
+    _get_cache().delete(_doctor_key(doctor_id))
+    _expire_snapshot_unless(doctor_id, online=False)
+
+
+def _roster():
+    roster = _get_cache().get(_ROSTER_KEY)
+    if roster is None:
+        roster = [str(doctor_id) for doctor_id in Doctor.objects.values_list('id', flat=True)]
+        _get_cache().set(_ROSTER_KEY, roster, timeout=ROSTER_TIMEOUT)
+    return roster
+
+
+def invalidate_roster() -> None:
+    """Médecin créé ou supprimé"""
+    _get_cache().delete(_ROSTER_KEY)
+
+
+def fetch_online_doctor_ids() -> FrozenSet[str]:
+    """Médecins dont le dernier battement date de moins de TTL, lus dans le cache partagé"""
+    keys = {_doctor_key(doctor_id): doctor_id for doctor_id in _roster()}
+    return frozenset(keys[key] for key in _get_cache().get_many(list(keys)))
+
+
+def presence_state() -> Dict:
+    """
+    Médecins en ligne, empreinte de l'ensemble et date (timestamp) de son dernier changement.
+
+    Servi par l'instantané local tant qu'il a moins de `DOCTOR_PRESENCE_REFRESH` secondes.
+    Les départs (expiration d'une clé) ne sont pas notifiés : le changement est constaté
+    à la relecture, en comparant l'empreinte à la précédente ; la date du changement n'est
+    lue et écrite dans le cache partagé que dans ce cas.
+    """
+    snapshot = _local['snapshot']
+    if snapshot is not None and time.monotonic() - snapshot['fetched_at'] < presence_refresh():
+        return snapshot
+    with _local_lock:
+        snapshot = _local['snapshot']
+        if snapshot is not None and time.monotonic() - snapshot['fetched_at'] < presence_refresh():
+            return snapshot
+        online = fetch_online_doctor_ids()
+        fingerprint = hashlib.sha256(','.join(sorted(online)).encode('utf-8')).hexdigest()[:16]
+        if snapshot is not None and snapshot['fingerprint'] == fingerprint:
+            state = {'fingerprint': fingerprint, 'changed_at': snapshot['changed_at']}
+        else:
+            cache = _get_cache()
+            state = cache.get(_STATE_KEY)
+            if state is None or state['fingerprint'] != fingerprint:
+                state = {'fingerprint': fingerprint, 'changed_at': int(time.time())}
+                cache.set(_STATE_KEY, state, timeout=None)
+        snapshot = _local['snapshot'] = {'online': online, **state, 'fetched_at': time.monotonic()}
+    return snapshot
+
+
+def online_doctor_ids() -> FrozenSet[str]:
+    """Identifiants (str) des médecins en ligne, d'après l'instantané local"""
+    return presence_state()['online']
+
+
+def get_request_online_ids(request) -> FrozenSet[str]:
+    """Médecins en ligne, lus une seule fois par requête"""
+    online = getattr(request, 'online_doctor_ids', None)
+    if online is None:
+        online = request.online_doctor_ids = online_doctor_ids()
+    return online
+
+
+def sync_presence_to_database() -> Dict[str, int]:
+    """Recopie la présence dans Doctor.is_online ; seules les lignes qui changent sont écrites"""
+    online = fetch_online_doctor_ids()
+    # update() ne modifie ni updated_at ni les réponses en cache (aucun signal)
+    went_online = Doctor.objects.filter(pk__in=online, is_online=False).update(is_online=True)
+    went_offline = Doctor.objects.exclude(pk__in=online).filter(is_online=True).update(is_online=False)
+    return {'online': len(online), 'went_online': went_online, 'went_offline': went_offline}
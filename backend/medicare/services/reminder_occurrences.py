@@ -0,0 +1,138 @@
+"""
+Expansion des rappels récurrents et fenêtre matérialisée des prochaines échéances.
+
+Un `Reminder` ne stocke que sa première date, son heure, sa fréquence et sa date de fin.
+`iter_occurrences` déroule paresseusement ses échéances ; la table `ReminderOccurrence`
+conserve celles des `REMINDER_OCCURRENCE_HORIZON_DAYS` prochains jours, indexées sur
+`due_at`, de sorte que « tout ce qui est dû entre T1 et T2 » est un simple parcours
+d'intervalle sur l'index.
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Reminder, ReminderOccurrence
+
+HORIZON_DAYS = getattr(settings, 'REMINDER_OCCURRENCE_HORIZON_DAYS', 14)
+
+_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+def _due_at(day: date, reminder: Reminder) -> datetime:
+    # Date et heure saisies par le patient, dans le fuseau du serveur (Indian/Antananarivo)
+    return timezone.make_aware(datetime.combine(day, reminder.time), timezone.get_default_timezone())
+
+
+def iter_occurrences(reminder: Reminder, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Iterator[datetime]:
+    """
+    Échéances du rappel dans [start, end), dans l'ordre chronologique.
+
+    Sans `end`, un rappel récurrent sans date de fin produit une suite infinie :
+    le générateur doit alors être consommé partiellement.
+    """
+    first_day = reminder.date
+    last_day = reminder.end_date
+
+    if reminder.frequency in _STEPS:
+        step = _STEPS[reminder.frequency]
+        index = 0
+        if start is not None:
+            # Sauter directement à la première échéance >= start
+            days_before = (timezone.localtime(start).date() - first_day).days
+            index = max(0, days_before // step.days)
+
+        def day_at(i):
+            return first_day + step * i
+    elif reminder.frequency == 'monthly':
+        index = 0
+        if start is not None:
+            local_start = timezone.localtime(start).date()
+            index = max(0, (local_start.year - first_day.year) * 12 + local_start.month - first_day.month - 1)
+
+        def day_at(i):
+            # Calculé depuis la première date : le 31 janvier donne le 28/29 février puis le 31 mars
+            return first_day + relativedelta(months=i)
+    else:
+        due_at = _due_at(first_day, reminder)
+        if (start is None or due_at >= start) and (end is None or due_at < end):
+            yield due_at
+        return
+
+    while True:
+        day = day_at(index)
+        index += 1
+        if last_day is not None and day > last_day:
+            return
+        due_at = _due_at(day, reminder)
+        if end is not None and due_at >= end:
+            return
+        if start is None or due_at >= start:
+            yield due_at
+
+
+def _build_occurrences(reminder: Reminder, start: datetime, end: datetime):
+    return [
+        ReminderOccurrence(reminder_id=reminder.id, patient_id=reminder.patient_id, due_at=due_at)
+        for due_at in iter_occurrences(reminder, start, end)
+    ]
+
+
+def materialize_reminder(reminder: Reminder, horizon_days: int = HORIZON_DAYS) -> int:
+    """
+    Recalcule les échéances à venir d'un rappel (création, modification).
+
+    Les échéances déjà envoyées sont conservées ; les autres sont remplacées.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ReminderOccurrence.objects.filter(reminder_id=reminder.id, is_dispatched=False).delete()
+        if not reminder.is_active:
+            return 0
+        occurrences = _build_occurrences(reminder, now, now + timedelta(days=horizon_days))
+        ReminderOccurrence.objects.bulk_create(occurrences, ignore_conflicts=True)
+    return len(occurrences)
+
+
+def extend_horizon(horizon_days: int = HORIZON_DAYS, batch_size: int = 1000) -> int:
+    """
+    Fait glisser la fenêtre matérialisée pour tous les rappels actifs.
+
+    Idempotent (contrainte unique reminder/due_at) : à lancer périodiquement.
+    Retourne le nombre d'échéances examinées, y compris celles déjà présentes.
+    """
+    now = timezone.now()
+    end = now + timedelta(days=horizon_days)
+    today = timezone.localdate()
+    reminders = (
+        Reminder.objects.filter(is_active=True, date__lte=end.date())
+        .exclude(end_date__lt=today)
+        .only('id', 'patient_id', 'date', 'time', 'frequency', 'end_date')
+    )
+    processed = 0
+    pending = []
+    for reminder in reminders.iterator(chunk_size=batch_size):
+        pending.extend(_build_occurrences(reminder, now, end))
+        if len(pending) >= batch_size:
+            ReminderOccurrence.objects.bulk_create(pending, ignore_conflicts=True)
+            processed += len(pending)
+            pending = []
+    if pending:
+        ReminderOccurrence.objects.bulk_create(pending, ignore_conflicts=True)
+        processed += len(pending)
+    return processed
+
+
+def occurrences_between(start: datetime, end: datetime, include_dispatched: bool = False):
+    """Échéances dues dans [start, end) pour tous les patients, par ordre d'échéance"""
+    queryset = ReminderOccurrence.objects.filter(due_at__gte=start, due_at__lt=end)
+    if not include_dispatched:
+        queryset = queryset.filter(is_dispatched=False)
+    return queryset.order_by('due_at')
@@ -0,0 +1,224 @@
+"""
+Envoi des rappels côté serveur à partir des échéances matérialisées (`ReminderOccurrence`).
+
+Chaque processus `run_reminder_scheduler` réclame, par lots ordonnés sur `due_at`, les
+échéances des prochaines secondes (`SELECT ... FOR UPDATE SKIP LOCKED` puis bail
+`claimed_until`), les range dans un tas trié par échéance et les confie au notifier
+à l'heure dite. Plusieurs processus peuvent tourner en parallèle : une échéance n'est
+réclamée que par un seul d'entre eux, et reprise par un autre si son bail expire.
+
+Le notifier est configurable (`REMINDER_NOTIFIER`) ; `LocalNotifier` se contente de
+journaliser et de conserver les envois en mémoire (développement, tests).
+"""
+import heapq
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import ReminderOccurrence
+from .percentiles import percentile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFIER = 'medicare.services.reminder_scheduler.LocalNotifier'
+
+LAG_SAMPLES = 1024
+
+
+class BaseNotifier:
+    """Interface des notifiers : reçoit un lot d'échéances dues (rappel et patient chargés)"""
+
+    def send(self, occurrences: List[ReminderOccurrence]) -> None:
+        raise NotImplementedError
+
+
+class LocalNotifier(BaseNotifier):
+    """Notifier local : journalise et garde les envois en mémoire, sans service externe"""
+
+    def __init__(self):
+        self.sent: List[ReminderOccurrence] = []
+
+    def send(self, occurrences: List[ReminderOccurrence]) -> None:
+        for occurrence in occurrences:
+            logger.info(
+                "Rappel '%s' pour %s (échéance %s)",
+                occurrence.reminder.title, occurrence.patient.phone, occurrence.due_at.isoformat(),
+            )
+        self.sent.extend(occurrences)
+
+
+def get_notifier() -> BaseNotifier:
+    """Instancie le notifier configuré par settings.REMINDER_NOTIFIER (chemin de classe)"""
+    return import_string(getattr(settings, 'REMINDER_NOTIFIER', DEFAULT_NOTIFIER))()
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _claimable(now) -> Q:
+    return Q(is_dispatched=False) & (Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+
+def claim_due_occurrences(worker_id: str, until, limit: int, lease: timedelta) -> List[ReminderOccurrence]:
+    """
+    Réclame jusqu'à `limit` échéances dues avant `until`, les plus proches d'abord.
+
+    Retourne les échéances (id et due_at seulement) réservées à `worker_id` jusqu'à now + lease.
+    """
+    now = timezone.now()
+    candidates = (
+        ReminderOccurrence.objects.filter(_claimable(now), due_at__lte=until)
+        .order_by('due_at')
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # UPDATE conditionnel : sans SKIP LOCKED (SQLite), seul le premier processus gagne
+        ReminderOccurrence.objects.filter(_claimable(now), id__in=ids).update(
+            claimed_by=worker_id,
+            claimed_until=now + lease,
+        )
+    return list(
+        ReminderOccurrence.objects.filter(id__in=ids, claimed_by=worker_id, is_dispatched=False)
+        .only('id', 'due_at')
+        .order_by('due_at')
+    )
+
+
+def dispatch_occurrences(worker_id: str, ids: List, notifier: BaseNotifier) -> List[ReminderOccurrence]:
+    """
+    Envoie les échéances encore réservées par `worker_id` puis les marque envoyées.
+
+    Une échéance supprimée entre-temps (rappel modifié ou désactivé) ou reprise par un
+    autre processus après expiration du bail est ignorée.
+    """
+    occurrences = list(
+        ReminderOccurrence.objects.filter(id__in=ids, claimed_by=worker_id, is_dispatched=False)
+        .select_related('reminder', 'patient')
+    )
+    inactive = [occurrence.id for occurrence in occurrences if not occurrence.reminder.is_active]
+    if inactive:
+        # Rappel désactivé hors des mutations (admin, script) : échéances abandonnées
+        ReminderOccurrence.objects.filter(id__in=inactive).delete()
+        occurrences = [occurrence for occurrence in occurrences if occurrence.reminder.is_active]
+    if not occurrences:
+        return []
+    notifier.send(occurrences)
+    dispatched_at = timezone.now()
+    ReminderOccurrence.objects.filter(
+        id__in=[occurrence.id for occurrence in occurrences], claimed_by=worker_id
+    ).update(is_dispatched=True, dispatched_at=dispatched_at)
+    for occurrence in occurrences:
+        occurrence.is_dispatched = True
+        occurrence.dispatched_at = dispatched_at
+    return occurrences
+
+
+def overdue_backlog(grace: timedelta = timedelta(minutes=1)) -> int:
+    """Nombre d'échéances non envoyées en retard de plus de `grace` (tous processus confondus)"""
+    return ReminderOccurrence.objects.filter(
+        is_dispatched=False, due_at__lt=timezone.now() - grace
+    ).count()
+
+
+class ReminderScheduler:
+    """
+    Boucle d'envoi d'un processus : tas (due_at, id) des échéances réservées.
+
+    Toutes les `poll_interval` secondes, les échéances des `lookahead` prochaines secondes
+    sont réclamées et ajoutées au tas ; entre deux réclamations, le processus dort jusqu'à
+    l'échéance en tête du tas.
+    """
+
+    def __init__(self, notifier: Optional[BaseNotifier] = None, worker_id: Optional[str] = None,
+                 batch_size: int = 500, lookahead: float = 60, poll_interval: float = 5):
+        self.notifier = notifier or get_notifier()
+        self.worker_id = worker_id or default_worker_id()
+        self.batch_size = batch_size
+        self.lookahead = timedelta(seconds=lookahead)
+        self.poll_interval = poll_interval
+        # Le bail couvre l'attente dans le tas plus une marge pour l'envoi
+        self.lease = self.lookahead + timedelta(seconds=max(60, poll_interval * 2))
+        # Borne le tas : un gros retard est rattrapé par tranches, dans la durée du bail
+        self.max_queued = batch_size * 10
+        self._heap: List = []
+        self._queued = set()
+        self._next_claim = 0.0
+        self._lags: List[float] = []
+        self.dispatched = 0
+        self.max_lag = 0.0
+
+    def claim(self) -> int:
+        """Réclame les échéances de la fenêtre jusqu'à remplir le tas (plusieurs lots si besoin)"""
+        until = timezone.now() + self.lookahead
+        added = 0
+        while True:
+            occurrences = claim_due_occurrences(self.worker_id, until, self.batch_size, self.lease)
+            for occurrence in occurrences:
+                if occurrence.id not in self._queued:
+                    self._queued.add(occurrence.id)
+                    heapq.heappush(self._heap, (occurrence.due_at, occurrence.id))
+                    added += 1
+            if len(occurrences) < self.batch_size or len(self._heap) >= self.max_queued:
+                return added
+
+    def dispatch_due(self) -> int:
+        """Envoie les échéances du tas arrivées à terme, par lots"""
+        now = timezone.now()
+        sent = 0
+        while self._heap and self._heap[0][0] <= now:
+            ids = []
+            while self._heap and self._heap[0][0] <= now and len(ids) < self.batch_size:
+                _, occurrence_id = heapq.heappop(self._heap)
+                self._queued.discard(occurrence_id)
+                ids.append(occurrence_id)
+            for occurrence in dispatch_occurrences(self.worker_id, ids, self.notifier):
+                self._record_lag((occurrence.dispatched_at - occurrence.due_at).total_seconds())
+                sent += 1
+        return sent
+
+    def run_once(self) -> float:
+        """Un tour de boucle ; retourne le délai (secondes) avant le prochain tour"""
+        if time.monotonic() >= self._next_claim:
+            self.claim()
+            self._next_claim = time.monotonic() + self.poll_interval
+        self.dispatch_due()
+        close_old_connections()
+
+        delay = max(0.0, self._next_claim - time.monotonic())
+        if self._heap:
+            until_next = (self._heap[0][0] - timezone.now()).total_seconds()
+            delay = min(delay, max(0.0, until_next))
+        return delay
+
+    def _record_lag(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.dispatched += 1
+        self.max_lag = max(self.max_lag, lag)
+        self._lags.append(lag)
+        if len(self._lags) > LAG_SAMPLES:
+            del self._lags[:-LAG_SAMPLES]
+
+    def stats(self) -> Dict:
+        """Retard d'envoi (secondes entre due_at et l'envoi) et taille du tas"""
+        return {
+            'worker': self.worker_id,
+            'dispatched': self.dispatched,
+            'queued': len(self._heap),
+            'lag_p50': percentile(self._lags, 50),
+            'lag_p99': percentile(self._lags, 99),
+            'lag_max': self.max_lag,
+        }
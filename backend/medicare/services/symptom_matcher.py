@@ -0,0 +1,143 @@
+"""
+Moteur de triage par mots-clés : une seule expression régulière compilée à partir
+d'un lexique de phrases de symptômes (français et malgache) pondérées par gravité.
+
+Le texte est normalisé (minuscules, sans accents, ponctuation, pluriels ni mots vides)
+puis parcouru une seule fois. Les phrases sont compilées sous forme de trie de mots,
+de sorte que le coût d'un parcours dépend de la longueur du texte et très peu de la
+taille du lexique.
+
+Le lexique livré (data/symptom_lexicon.csv) compte environ 140 phrases ; un lexique plus
+large se configure par AI_TRIAGE_LEXICON_PATH. `manage.py benchmark_symptom_matcher`
+mesure le passage à l'échelle sur des lexiques synthétiques de milliers de phrases.
+"""
+import csv
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent.parent / 'data' / 'symptom_lexicon.csv'
+
+# Du plus grave au moins grave
+SEVERITY_LEVELS = ('critical', 'high', 'medium', 'low')
+
+# Score cumulé à partir duquel une gravité est retenue
+SEVERITY_THRESHOLD = 1.0
+
+STOPWORDS = frozenset([
+    # Français
+    'a', 'ai', 'au', 'aux', 'avec', 'd', 'de', 'des', 'du', 'en', 'et', 'j', 'je', 'l',
+    'la', 'le', 'les', 'm', 'ma', 'me', 'mes', 'mon', 'tres', 'un', 'une',
+    # Malgache
+    'aho', 'ary', 'ko', 'ny', 'sy',
+])
+
+_NON_WORD = re.compile(r'[^\w]+')
+_END = ''
+
+
+def fold_accents(text: str) -> str:
+    """Minuscules et suppression des accents"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def _fold_plural(token: str) -> str:
+    # "vomissements" -> "vomissement", "fievres" -> "fievre"
+    return token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+
+
+def normalize_text(text: str) -> str:
+    """Texte réduit à des mots séparés par un espace, sans accents, pluriels ni mots vides"""
+    tokens = _NON_WORD.split(fold_accents(text))
+    return ' '.join(_fold_plural(token) for token in tokens if token and token not in STOPWORDS)
+
+
+def _trie_pattern(node: dict) -> str:
+    """Expression régulière reconnaissant toutes les suites de mots du trie"""
+    alternatives = []
+    for token in sorted((key for key in node if key != _END), key=lambda key: (-len(key), key)):
+        child = node[token]
+        if set(child) == {_END}:
+            alternatives.append(re.escape(token))
+            continue
+        continuation = ' ' + _trie_pattern(child)
+        if _END in child:
+            continuation = f'(?:{continuation})?'
+        alternatives.append(re.escape(token) + continuation)
+    return f"(?:{'|'.join(alternatives)})"
+
+
+class SymptomMatcher:
+    """Lexique compilé : phrase normalisée -> (gravité, poids)"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, float]]):
+        self.phrases: Dict[str, Tuple[str, float]] = {}
+        for phrase, severity, weight in entries:
+            if severity not in SEVERITY_LEVELS:
+                raise ValueError(f"Gravité inconnue dans le lexique: {severity}")
+            tokens = normalize_text(phrase).split()
+            if not tokens:
+                continue
+            variants = [tokens]
+            if len(tokens) == 2:
+                # Ordre des mots libre : "douleur poitrine" reconnaît aussi "poitrine : douleur"
+                variants.append(tokens[::-1])
+            for variant in variants:
+                key = ' '.join(variant)
+                current = self.phrases.get(key)
+                # En cas de doublon, garder l'entrée la plus grave
+                if current is None or SEVERITY_LEVELS.index(severity) < SEVERITY_LEVELS.index(current[0]):
+                    self.phrases[key] = (severity, float(weight))
+
+        trie: dict = {}
+        for key in self.phrases:
+            node = trie
+            for token in key.split(' '):
+                node = node.setdefault(token, {})
+            node[_END] = True
+        pattern = _trie_pattern(trie) if trie else r'(?!x)x'
+        self._regex = re.compile(rf'(?<!\S){pattern}(?!\S)')
+
+    @classmethod
+    def from_csv(cls, path) -> 'SymptomMatcher':
+        """Charge un lexique CSV (phrase, severity, weight) ; les lignes '#' sont ignorées"""
+        with open(path, encoding='utf-8', newline='') as handle:
+            rows = csv.DictReader(line for line in handle if not line.startswith('#'))
+            return cls((row['phrase'], row['severity'].strip(), float(row['weight'])) for row in rows)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def find(self, text: str) -> List[Tuple[str, str, float]]:
+        """Phrases du lexique présentes dans le texte, avec leur gravité et leur poids"""
+        return [(match.group(), *self.phrases[match.group()]) for match in self._regex.finditer(normalize_text(text))]
+
+    def score(self, text: str) -> Dict[str, float]:
+        scores = dict.fromkeys(SEVERITY_LEVELS, 0.0)
+        for _, severity, weight in self.find(text):
+            scores[severity] += weight
+        return scores
+
+    def classify(self, text: str) -> str:
+        """Gravité la plus élevée atteignant le seuil, 'low' sinon"""
+        scores = self.score(text)
+        for severity in SEVERITY_LEVELS:
+            if scores[severity] >= SEVERITY_THRESHOLD:
+                return severity
+        return 'low'
+
+
+@lru_cache(maxsize=None)
+def _load_matcher(path: str) -> SymptomMatcher:
+    return SymptomMatcher.from_csv(path)
+
+
+def get_symptom_matcher(path: Optional[str] = None) -> SymptomMatcher:
+    """Matcher du lexique configuré (settings.AI_TRIAGE_LEXICON_PATH), compilé une fois par processus"""
+    path = path or getattr(settings, 'AI_TRIAGE_LEXICON_PATH', DEFAULT_LEXICON_PATH)
+    return _load_matcher(str(path))
@@ -0,0 +1,164 @@
+"""
+File de traitement des triages IA, stockée dans la base de données (aucun broker externe).
+
+La mutation `aiTriage` crée une ligne `AITriage` en état "pending" avec une première
+évaluation par mots-clés, puis rend la main. Des workers (threads du processus web
+et/ou `manage.py run_triage_worker`) réclament les triages en attente, appellent Ollama
+et complètent `severity`, `advice` et `recommendation`.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import AITriage
+from .admin_stats import record_change
+from .ollama_service import _fallback_analysis, analyze_symptoms_with_ollama
+
+logger = logging.getLogger(__name__)
+
+# Durée après laquelle un triage "processing" est considéré abandonné (worker arrêté)
+JOB_LEASE = timedelta(seconds=getattr(settings, 'AI_TRIAGE_JOB_LEASE_SECONDS', 120))
+MAX_ATTEMPTS = getattr(settings, 'AI_TRIAGE_MAX_ATTEMPTS', 3)
+# Threads de traitement dans le processus web (0 pour tout confier à run_triage_worker)
+INPROCESS_WORKERS = getattr(settings, 'AI_TRIAGE_INPROCESS_WORKERS', 2)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def enqueue_triage(symptoms: str, patient=None, stream: bool = False) -> AITriage:
+    """
+    Crée un triage en attente et le confie aux workers.
+
+    La ligne contient immédiatement l'évaluation par mots-clés : les clients qui
+    n'attendent pas le résultat final disposent ainsi d'une réponse exploitable.
+
+    Avec `stream=True`, le triage est réservé au flux SSE (`claim_streamed_triage`) ;
+    si le client ne s'y connecte pas, les workers le reprennent après JOB_LEASE.
+    """
+    provisional = _fallback_analysis(symptoms)
+    triage = AITriage.objects.create(
+        patient=patient,
+        symptoms=symptoms,
+        severity=provisional['severity'],
+        advice=provisional['advice'],
+        recommendation=provisional['recommendation'],
+        status='processing' if stream else 'pending',
+        started_at=timezone.now() if stream else None,
+    )
+    if not stream and INPROCESS_WORKERS > 0:
+        transaction.on_commit(lambda: _get_executor().submit(_run_inprocess, triage.id))
+    return triage
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INPROCESS_WORKERS, thread_name_prefix='ai-triage')
+        return _executor
+
+
+def _run_inprocess(triage_id) -> None:
+    try:
+        if claim_triage(triage_id):
+            process_triage(triage_id)
+    except Exception:
+        logger.exception("Échec du traitement du triage %s", triage_id)
+    finally:
+        close_old_connections()
+
+
+def _claimable() -> Q:
+    stale_before = timezone.now() - JOB_LEASE
+    return Q(status='pending') | Q(status='processing', started_at__lt=stale_before)
+
+
+def claim_triage(triage_id) -> bool:
+    """Réclame un triage par un UPDATE conditionnel ; un seul worker peut gagner"""
+    with transaction.atomic():
+        claimed = AITriage.objects.filter(_claimable(), pk=triage_id, attempts__lt=MAX_ATTEMPTS).update(
+            status='processing',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed == 1:
+            AITriage.bump_sync_version(triage_id)
+    return claimed == 1
+
+
+def claim_streamed_triage(triage_id) -> bool:
+    """Réclame un triage réservé au streaming ; échoue si un worker l'a déjà repris"""
+    claimed = AITriage.objects.filter(pk=triage_id, status='processing', attempts=0).update(
+        started_at=timezone.now(),
+        attempts=1,
+    )
+    return claimed == 1
+
+
+def claim_triages(limit: int) -> List:
+    """Réclame jusqu'à `limit` triages en attente, les plus anciens d'abord"""
+    # Les triages abandonnés trop souvent gardent l'évaluation provisoire
+    abandoned = AITriage.objects.filter(
+        status='processing', started_at__lt=timezone.now() - JOB_LEASE, attempts__gte=MAX_ATTEMPTS
+    )
+    for triage_id in abandoned.values_list('id', flat=True):
+        with transaction.atomic():
+            if abandoned.filter(pk=triage_id).update(status='failed', completed_at=timezone.now()):
+                AITriage.bump_sync_version(triage_id)
+
+    candidates = AITriage.objects.filter(_claimable(), attempts__lt=MAX_ATTEMPTS).order_by('created_at')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        return [triage_id for triage_id in ids if claim_triage(triage_id)]
+
+
+def process_triage(triage_id) -> None:
+    """Analyse les symptômes d'un triage réclamé et enregistre le résultat"""
+    triage = AITriage.objects.only('id', 'symptoms', 'attempts').get(pk=triage_id)
+    try:
+        analysis = analyze_symptoms_with_ollama(triage.symptoms)
+    except Exception:
+        logger.exception("Erreur pendant l'analyse du triage %s", triage_id)
+        # Remis en attente pour une nouvelle tentative, ou abandonné avec l'évaluation provisoire
+        status = 'failed' if triage.attempts >= MAX_ATTEMPTS else 'pending'
+        with transaction.atomic():
+            updated = AITriage.objects.filter(pk=triage_id, status='processing').update(
+                status=status,
+                completed_at=timezone.now() if status == 'failed' else None,
+            )
+            if updated:
+                AITriage.bump_sync_version(triage_id)
+        return
+
+    complete_triage(triage_id, analysis)
+
+
+def complete_triage(triage_id, analysis) -> None:
+    """Enregistre le résultat final d'un triage réclamé"""
+    severity = analysis.get('severity', 'medium')
+    with transaction.atomic():
+        # Gravité provisoire (mots-clés), remplacée par celle de l'analyse
+        previous = AITriage.objects.filter(pk=triage_id, status='processing').values('severity').first()
+        updated = AITriage.objects.filter(pk=triage_id, status='processing').update(
+            severity=severity,
+            advice=analysis.get('advice', 'Surveillez vos symptômes.'),
+            recommendation=analysis.get('recommendation', 'Consultez un médecin si nécessaire.'),
+            status='completed',
+            completed_at=timezone.now(),
+        )
+        if updated:
+            AITriage.bump_sync_version(triage_id)
+            if previous is not None and previous['severity'] != severity:
+                transaction.on_commit(
+                    lambda: record_change(AITriage, previous, {'severity': severity})
+                )
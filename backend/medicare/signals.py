@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Doctor, Message
+from .services.admin_stats import TRACKED, record_change, tracked_fields, tracked_values
+from .services.consultations import publish_message
+from .services.directory_cache import invalidate_doctor_directory
+from .services.presence import invalidate_roster
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, created, **kwargs):
+    # Approbation, tarif, spécialité... : les réponses de l'annuaire en cache sont périmées
+    invalidate_doctor_directory()
+    if created:
+        invalidate_roster()
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    invalidate_doctor_directory()
+    invalidate_roster()
+
+
+@receiver(post_save, sender=User)
+def doctor_user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # L'e-mail d'un médecin est lu sur son compte utilisateur
+    if created or (update_fields is not None and 'email' not in update_fields):
+        return
+    if Doctor.objects.filter(user_id=instance.pk).exists():
+        invalidate_doctor_directory()
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    # Diffusé aux participants connectés au chat une fois la transaction validée
+    if created:
+        transaction.on_commit(lambda: publish_message(instance))
+
+
+# Compteurs du tableau de bord admin, mis à jour après commit. Receveurs connectés aux seuls
+# modèles suivis : un receveur post_delete global empêcherait Django de supprimer en masse
+# (fast delete) les autres modèles.
+
+def stats_before_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stats_before = None
+    fields = tracked_fields(sender)
+    if raw or instance._state.adding or not fields:
+        return
+    # Sauvegarde partielle sans champ suivi : pas de lecture préalable
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return
+    instance._stats_before = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def stats_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        before = None
+    else:
+        before = getattr(instance, '_stats_before', None)
+        if before is None:
+            return
+    after = tracked_values(instance)
+    if before != after:
+        transaction.on_commit(lambda: record_change(sender, before, after))
+
+
+def stats_deleted(sender, instance, **kwargs):
+    before = tracked_values(instance)
+    transaction.on_commit(lambda: record_change(sender, before, None))
+
+
+for tracked_model in TRACKED:
+    pre_save.connect(stats_before_save, sender=tracked_model, dispatch_uid=f'stats_before_save:{tracked_model.__name__}')
+    post_save.connect(stats_saved, sender=tracked_model, dispatch_uid=f'stats_saved:{tracked_model.__name__}')
+    post_delete.connect(stats_deleted, sender=tracked_model, dispatch_uid=f'stats_deleted:{tracked_model.__name__}')
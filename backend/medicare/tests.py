@@ -1,3 +1,563 @@
-from django.test import TestCase
+import datetime
+import itertools
+import json
+import threading
+from io import StringIO
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models.deletion import Collector
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from .checks import PROCESS_LOCAL_CACHES, check_callback_tokens
+from .management.commands.explain_hot_queries import explain, hot_queries, prefer_indexes, uses_index
+from .models import (
+    Consultation, Doctor, Message, Patient, Payment, PaymentCallback, Reminder, ReminderOccurrence,
+    StatCounter,
+)
+from .schema import schema
+from .services.admin_stats import counter_key, get_admin_stats
+from .services.analysis_cache import get_analysis_cache_stats, get_cached_analysis, store_analysis
+from .services.consultations import consultation_participant, update_consultation_status
+from .services.directory_cache import directory_version
+from .services.ollama_service import (
+    STREAM_WINDOW, _read_timeout, analyze_symptoms_with_ollama, get_circuit_breaker, get_ollama_config,
+    stream_symptoms_analysis,
+)
+from .services.payment_reconciliation import DUPLICATE_ROW, MISSING_FROM_FILE, Reconciler
+from .services.payments import create_payment
+from .services import presence
+from .services.presence import heartbeat
+from .services.reminder_occurrences import _due_at, iter_occurrences
+from .services.reminder_scheduler import (
+    LocalNotifier, ReminderScheduler, claim_due_occurrences, dispatch_occurrences,
+)
+
+
+def clear_process_local_caches():
+    """Simule un autre processus : les caches locaux (LocMem) repartent vides"""
+    for alias, config in settings.CACHES.items():
+        if config['BACKEND'] in PROCESS_LOCAL_CACHES:
+            caches[alias].clear()
+
+
+def create_patient(username='patient', phone='+261340000000'):
+    user = User.objects.create_user(username, f'{username}@medicare.mg', 'pw')
+    return Patient.objects.create(user=user, phone=phone, name=username)
+
+
+def create_doctor(username='doctor', **fields):
+    user = User.objects.create_user(username, f'{username}@medicare.mg', 'pw')
+    fields.setdefault('specialty', 'Médecine générale')
+    fields.setdefault('price', 10000)
+    return Doctor.objects.create(user=user, name=username, **fields)
+
+
+class AdminStatsTests(TestCase):
+    def test_missing_total_triggers_reconciliation(self):
+        for index in range(3):
+            create_patient(f'patient{index}', f'+26134000000{index}')
+        # Seul le compteur des patients existe, et il a dérivé
+        StatCounter.objects.all().delete()
+        StatCounter.objects.create(key=counter_key(Patient), value=1)
+
+        stats = get_admin_stats()
+
+        self.assertEqual(stats['patients'], 3)
+        self.assertTrue(StatCounter.objects.filter(key=counter_key(Doctor)).exists())
+
+    def test_signals_follow_status_changes(self):
+        patient = create_patient()
+        doctor = create_doctor(is_approved=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation = Consultation.objects.create(patient=patient, doctor=doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation.status = 'completed'
+            consultation.save()
+
+        stats = get_admin_stats()
+
+        self.assertEqual(stats['consultations'], 1)
+        self.assertIn(('completed', 1), stats['consultations_by_status'])
+        self.assertIn(('pending', 0), stats['consultations_by_status'])
+
+    def test_untracked_models_keep_fast_delete(self):
+        self.assertTrue(Collector(using='default').can_fast_delete(Message.objects.all()))
+
+
+class PatientSyncVersionTests(TestCase):
+    CREATE_REMINDER = '''
+        mutation {
+          createReminder(type: "medication", title: "Paracétamol", date: "2026-01-05", time: "08:00") {
+            reminder { id }
+          }
+        }
+    '''
+    UPDATE_PROFILE = 'mutation { updateProfile(input: {name: "Rabe"}) { patient { id name } } }'
+
+    def test_profile_save_keeps_watermark_after_reminder(self):
+        patient = create_patient()
+        request = RequestFactory().post('/graphql/')
+        request.user = patient.user
+
+        # Même requête : l'acteur garde l'instance Patient chargée avant la création du rappel
+        for query in (self.CREATE_REMINDER, self.UPDATE_PROFILE):
+            result = schema.execute(query, context_value=request)
+            self.assertIsNone(result.errors)
+
+        reminder = Reminder.objects.get(patient=patient)
+        patient.refresh_from_db()
+        self.assertEqual(patient.name, 'Rabe')
+        self.assertEqual(reminder.sync_version, 1)
+        self.assertEqual(patient.sync_version, reminder.sync_version)
+
+    def test_full_save_of_stale_instance_keeps_watermark(self):
+        patient = create_patient()
+        stale = Patient.objects.get(pk=patient.pk)
+        Patient.next_sync_version(patient.pk)
+
+        stale.age = 40
+        stale.save()
+
+        patient.refresh_from_db()
+        self.assertEqual((patient.age, patient.sync_version), (40, 1))
+
+
+class StandInOllamaHandler(BaseHTTPRequestHandler):
+    """Serveur Ollama local : réponse JSON fixe, connexions et en-têtes reçus notés par le serveur"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.client_address, self.headers['Authorization']))
+        body = json.dumps({'response': OllamaStreamBreakerTests.ANSWER, 'done': True}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OllamaClientTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        caches['ai_triage'].clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInOllamaHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/generate'
+
+    def test_pooled_client_reuses_connection(self):
+        with override_settings(OLLAMA={'API_URL': self.url, 'API_KEY': 'test-key'}):
+            for symptoms in ('fièvre', 'toux', 'fatigue'):
+                self.assertEqual(analyze_symptoms_with_ollama(symptoms)['advice'], 'Reposez-vous.')
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual({address for address, _ in self.server.requests}, {self.server.requests[0][0]})
+        self.assertEqual({authorization for _, authorization in self.server.requests}, {'Bearer test-key'})
+
+    def test_missing_key_falls_back_without_request(self):
+        with override_settings(OLLAMA={'API_URL': self.url, 'API_KEY': ''}):
+            result = analyze_symptoms_with_ollama('douleur thoracique')
+
+        self.assertEqual(result['severity'], 'critical')
+        self.assertEqual(self.server.requests, [])
+
+
+class FakeStreamResponse:
+    status_code = 200
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_lines(self):
+        for line in self.lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+
+@override_settings(OLLAMA={'API_KEY': 'test-key'})
+class OllamaStreamBreakerTests(TestCase):
+    ANSWER = json.dumps({'severity': 'low', 'advice': 'Reposez-vous.', 'recommendation': 'Surveillance.'})
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        caches['ai_triage'].clear()
+        self.breaker = get_circuit_breaker()
+
+    def _stream(self, symptoms, lines):
+        session = mock.Mock()
+        session.post.return_value = FakeStreamResponse(lines)
+        with mock.patch('medicare.services.ollama_service.get_ollama_session', return_value=session):
+            return dict(stream_symptoms_analysis(symptoms))['result']
+
+    def test_stream_latencies_do_not_shrink_generation_timeout(self):
+        config = get_ollama_config()
+        for index in range(25):
+            self._stream(f'fatigue {index}', [json.dumps({'response': self.ANSWER, 'done': True}).encode()])
+
+        self.assertEqual(len(self.breaker.latencies(STREAM_WINDOW)), 25)
+        self.assertEqual(self.breaker.latencies(), [])
+        self.assertEqual(_read_timeout(config, self.breaker), config['READ_TIMEOUT'])
+
+    def test_breaker_state_is_shared_between_processes(self):
+        config = get_ollama_config()
+        for _ in range(config['CIRCUIT_FAILURE_THRESHOLD']):
+            self.breaker.record_failure()
+        # Autre processus : nouvelle instance, cache local vide
+        caches['default'].clear()
+        other = get_circuit_breaker()
+
+        self.assertEqual(other.state, 'open')
+        self.assertFalse(other.allow_request())
+        other.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_error_after_headers_is_a_single_failure(self):
+        with self.assertLogs('medicare.services.ollama_service', 'WARNING') as logs:
+            result = self._stream('toux', [requests.exceptions.ConnectionError('coupure')])
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(result['severity'], ('low', 'medium', 'high', 'critical'))
+        self.assertEqual(self.breaker.status()['consecutive_failures'], 1)
+        self.assertEqual(len(self.breaker.latencies(STREAM_WINDOW)), 1)
+
+
+class SharedPresenceTests(TestCase):
+    DOCTORS = 'query { doctors { id isOnline } }'
+
+    def test_heartbeat_is_visible_from_another_process(self):
+        doctor = create_doctor(is_approved=True)
+        heartbeat(doctor.id)
+        version = directory_version()
+        # Autre worker, ou redémarrage : son cache local et son instantané sont vides
+        caches['default'].clear()
+        presence._local['snapshot'] = None
+
+        request = RequestFactory().post('/graphql/')
+        request.user = AnonymousUser()
+        result = schema.execute(self.DOCTORS, context_value=request)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['doctors'], [{'id': str(doctor.id), 'isOnline': True}])
+        self.assertEqual(directory_version(), version)
+
+    def test_reads_use_local_snapshot_between_refreshes(self):
+        doctor = create_doctor(is_approved=True)
+        presence._local['snapshot'] = None
+        self.assertEqual(presence.online_doctor_ids(), frozenset())
+
+        # DatabaseCache : aucune requête SQL tant que l'instantané est frais
+        with self.assertNumQueries(0):
+            presence.presence_state()
+
+        heartbeat(doctor.id)
+        self.assertEqual(presence.online_doctor_ids(), {str(doctor.id)})
+
+
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_use_their_index(self):
+        with prefer_indexes():
+            for label, queryset, index in hot_queries():
+                with self.subTest(label):
+                    plan = explain(queryset)
+                    self.assertTrue(uses_index(plan, index), f'{index} absent du plan :\n{plan}')
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.patient = create_patient()
+        self.reminder = Reminder.objects.create(
+            patient=self.patient, type='medication', title='Paracétamol',
+            date=timezone.localdate(), time=datetime.time(8, 0),
+        )
+        self.now = timezone.now()
+
+    def _occurrence(self, seconds):
+        return ReminderOccurrence.objects.create(
+            reminder=self.reminder, patient=self.patient, due_at=self.now + timedelta(seconds=seconds),
+        )
+
+    def test_claim_is_exclusive_between_workers(self):
+        due = [self._occurrence(-60), self._occurrence(-30)]
+        lease = timedelta(minutes=5)
+
+        claimed = claim_due_occurrences('worker-1', self.now, 10, lease)
+
+        self.assertEqual([occurrence.id for occurrence in claimed], [occurrence.id for occurrence in due])
+        self.assertEqual(claim_due_occurrences('worker-2', self.now, 10, lease), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        occurrence = self._occurrence(-60)
+        claim_due_occurrences('worker-1', self.now, 10, timedelta(minutes=5))
+        # worker-1 arrêté sans avoir envoyé : son bail expire
+        ReminderOccurrence.objects.filter(pk=occurrence.pk).update(claimed_until=self.now - timedelta(seconds=1))
+
+        claimed = claim_due_occurrences('worker-2', self.now, 10, timedelta(minutes=5))
+
+        self.assertEqual([item.id for item in claimed], [occurrence.id])
+        # Le premier processus ne peut plus envoyer une échéance reprise par un autre
+        self.assertEqual(dispatch_occurrences('worker-1', [occurrence.id], LocalNotifier()), [])
+
+    def test_deactivated_reminder_is_skipped(self):
+        occurrence = self._occurrence(-60)
+        claim_due_occurrences('worker-1', self.now, 10, timedelta(minutes=5))
+        Reminder.objects.filter(pk=self.reminder.pk).update(is_active=False)
+        notifier = LocalNotifier()
+
+        self.assertEqual(dispatch_occurrences('worker-1', [occurrence.id], notifier), [])
+        self.assertEqual(notifier.sent, [])
+        self.assertFalse(ReminderOccurrence.objects.filter(pk=occurrence.pk).exists())
+
+    def test_scheduler_sends_due_occurrences_to_local_notifier(self):
+        due = self._occurrence(-5)
+        upcoming = self._occurrence(30)
+        notifier = LocalNotifier()
+        scheduler = ReminderScheduler(notifier=notifier, worker_id='worker-1', lookahead=60)
+
+        self.assertEqual(scheduler.claim(), 2)
+        self.assertEqual(scheduler.dispatch_due(), 1)
+
+        self.assertEqual([occurrence.id for occurrence in notifier.sent], [due.id])
+        self.assertEqual(notifier.sent[0].reminder.title, 'Paracétamol')
+        due.refresh_from_db()
+        upcoming.refresh_from_db()
+        self.assertTrue(due.is_dispatched)
+        self.assertFalse(upcoming.is_dispatched)
+        self.assertEqual(upcoming.claimed_by, 'worker-1')
+        self.assertEqual(scheduler.stats()['queued'], 1)
+
+
+class ReminderOccurrenceTests(TestCase):
+    def setUp(self):
+        self.patient = create_patient()
+
+    def _reminder(self, frequency, day, **fields):
+        return Reminder.objects.create(
+            patient=self.patient, type='medication', title='Paracétamol', date=day,
+            time=datetime.time(8, 0), frequency=frequency, **fields,
+        )
+
+    def _local_days(self, occurrences):
+        return [timezone.localtime(due_at).date() for due_at in occurrences]
+
+    def test_monthly_from_end_of_month_is_clamped_per_month(self):
+        reminder = self._reminder('monthly', datetime.date(2024, 1, 31), end_date=datetime.date(2024, 5, 31))
+
+        days = self._local_days(iter_occurrences(reminder))
+
+        self.assertEqual(days, [
+            datetime.date(2024, 1, 31), datetime.date(2024, 2, 29), datetime.date(2024, 3, 31),
+            datetime.date(2024, 4, 30), datetime.date(2024, 5, 31),
+        ])
+
+    def test_monthly_start_mid_series_keeps_end_of_month(self):
+        reminder = self._reminder('monthly', datetime.date(2025, 1, 31))
+        start = timezone.make_aware(datetime.datetime(2025, 3, 1))
+
+        days = self._local_days(itertools.islice(iter_occurrences(reminder, start=start), 2))
+
+        self.assertEqual(days, [datetime.date(2025, 3, 31), datetime.date(2025, 4, 30)])
+
+    def test_weekly_skips_ahead_to_start(self):
+        reminder = self._reminder('weekly', datetime.date(2020, 1, 6))  # Lundi
+        start = timezone.make_aware(datetime.datetime(2026, 3, 4, 12, 0))  # Mercredi
+        end = start + timedelta(weeks=2)
+
+        with mock.patch('medicare.services.reminder_occurrences._due_at', wraps=_due_at) as due_at:
+            occurrences = list(iter_occurrences(reminder, start=start, end=end))
+
+        # Six ans d'échéances passées ne sont pas parcourues une à une
+        self.assertLessEqual(due_at.call_count, 4)
+        self.assertEqual(self._local_days(occurrences), [datetime.date(2026, 3, 9), datetime.date(2026, 3, 16)])
+        self.assertEqual(timezone.localtime(occurrences[0]).time(), datetime.time(8, 0))
+
+    def test_weekly_start_on_due_day_is_included(self):
+        reminder = self._reminder('weekly', datetime.date(2020, 1, 6))
+        start = timezone.make_aware(datetime.datetime(2026, 3, 9, 8, 0))
+
+        occurrences = list(iter_occurrences(reminder, start=start, end=start + timedelta(days=1)))
+
+        self.assertEqual(occurrences, [start])
+
+
+@override_settings(PAYMENTS={'CALLBACK_TOKENS': {'mvola': 'secret'}})
+class PaymentCallbackTests(TestCase):
+    def setUp(self):
+        patient = create_patient()
+        doctor = create_doctor(is_approved=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation = Consultation.objects.create(patient=patient, doctor=doctor)
+            self.payment, _ = create_payment(consultation, 'mvola', 'MV-1')
+
+    def _post(self, payload, token='secret'):
+        return self.client.post(
+            '/payments/callback/mvola/', json.dumps(payload), content_type='application/json',
+            headers={'X-Callback-Token': token},
+        )
+
+    def _counter(self, status):
+        counter = StatCounter.objects.filter(key=counter_key(Payment, 'status', status)).first()
+        return counter.value if counter else 0
+
+    def test_duplicate_callbacks_are_applied_once(self):
+        self.assertEqual((self._counter('pending'), self._counter('success')), (1, 0))
+        callback = {'transactionId': 'MV-1', 'status': 'success'}
+
+        first = self._post({'callbacks': [callback, callback, {'transactionId': 'MV-1', 'status': 'failed'}]})
+        replay = self._post(callback)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(
+            (first.json()['applied'], first.json()['success'], first.json()['ignored']), (1, 1, 2),
+        )
+        self.assertEqual((replay.json()['applied'], replay.json()['ignored']), (0, 1))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'success')
+        self.assertEqual((self._counter('pending'), self._counter('success')), (0, 1))
+
+    def test_callbacks_are_journaled_with_duplicates(self):
+        callback = {'transactionId': 'MV-1', 'status': 'success'}
+        self._post({'callbacks': [callback, callback, 'mal formé']})
+        self._post(callback)
+
+        journal = PaymentCallback.objects.order_by('id')
+        self.assertEqual(
+            list(journal.values_list('operator', 'transaction_id', 'status')),
+            [('mvola', 'MV-1', 'success')] * 2 + [('mvola', '', '')] + [('mvola', 'MV-1', 'success')],
+        )
+        self.assertEqual(journal[2].payload, 'mal formé')
+
+    @override_settings(PAYMENTS={'CALLBACK_TOKENS': {}}, DEBUG=False)
+    def test_missing_token_fails_closed(self):
+        response = self._post({'transactionId': 'MV-1', 'status': 'success'}, token='')
+
+        self.assertEqual(response.status_code, 403)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+        self.assertIn('medicare.W003', [message.id for message in check_callback_tokens(None)])
+
+    @override_settings(PAYMENTS={'CALLBACK_TOKENS': {}}, DEBUG=True)
+    def test_missing_token_accepted_in_debug(self):
+        self.assertEqual(self._post({'transactionId': 'MV-1', 'status': 'success'}, token='').status_code, 200)
+
+    def test_unknown_reference_and_bad_token(self):
+        response = self._post({'transactionId': 'MV-404', 'status': 'success'})
+
+        self.assertEqual(response.json()['unknown'], 1)
+        self.assertEqual(self._post({'transactionId': 'MV-1', 'status': 'success'}, token='x').status_code, 403)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+
+class ConsultationStatusTests(TestCase):
+    def setUp(self):
+        patient = create_patient()
+        doctor = create_doctor(is_approved=True)
+        self.consultation = Consultation.objects.create(patient=patient, doctor=doctor)
+        self.updated_at = timezone.now() - timedelta(hours=1)
+        Consultation.objects.filter(pk=self.consultation.pk).update(updated_at=self.updated_at)
+
+    def _row(self):
+        return consultation_participant(self.consultation.pk, None)[0]
+
+    def test_transition_writes_status(self):
+        result = update_consultation_status(self._row(), 'active')
+
+        stored = Consultation.objects.get(pk=self.consultation.pk)
+        self.assertEqual((result.status, result.updated_at), (stored.status, stored.updated_at))
+        self.assertEqual(stored.status, 'active')
+        self.assertGreater(stored.updated_at, self.updated_at)
+
+    def test_same_status_returns_stored_row(self):
+        Consultation.objects.filter(pk=self.consultation.pk).update(status='active', updated_at=self.updated_at)
+
+        result = update_consultation_status(self._row(), 'active')
+
+        self.assertEqual((result.status, result.updated_at), ('active', self.updated_at))
+
+    def test_concurrent_identical_change_returns_stored_row(self):
+        row = self._row()
+        # Un autre participant a déjà activé la consultation après notre lecture
+        Consultation.objects.filter(pk=self.consultation.pk).update(status='active', updated_at=self.updated_at)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = update_consultation_status(row, 'active')
+
+        self.assertEqual((result.status, result.updated_at), ('active', self.updated_at))
+        self.assertEqual(callbacks, [])
+
+
+class AnalysisCacheTests(TestCase):
+    ANALYSIS = {'severity': 'low', 'advice': 'Reposez-vous.', 'recommendation': 'Surveillance.'}
+
+    def setUp(self):
+        caches['shared'].clear()
+        caches['ai_triage'].clear()
+
+    def test_worker_analysis_and_invalidation_reach_other_processes(self):
+        # Analyse calculée par run_triage_worker
+        store_analysis('Maux de tête, fatigue', self.ANALYSIS)
+        # Serveur web : autre processus
+        clear_process_local_caches()
+        self.assertEqual(get_cached_analysis('fatigue, maux de tete'), self.ANALYSIS)
+
+        call_command('triage_cache', '--invalidate', stdout=StringIO())
+        clear_process_local_caches()
+
+        self.assertIsNone(get_cached_analysis('fatigue, maux de tete'))
+        self.assertEqual(get_analysis_cache_stats(), {'hits': 1, 'misses': 1, 'generation': 2})
+
+
+class PaymentReconciliationTests(TestCase):
+    def setUp(self):
+        patient = create_patient()
+        doctor = create_doctor(is_approved=True, price=10000)
+        consultation = Consultation.objects.create(patient=patient, doctor=doctor)
+        for reference in ('MV-1', 'MV-2', 'MV-3'):
+            create_payment(consultation, 'mvola', reference)
+        self.period = (timezone.now() - timedelta(hours=1), timezone.now() + timedelta(hours=1))
+        # MV-1 en double dans une autre tranche, MV-3 absent du fichier
+        self.rows = [
+            (line, {'transaction_id': reference, 'amount': '10000', 'status': 'success'})
+            for line, reference in enumerate(['MV-1', 'MV-2', 'MV-1'], start=2)
+        ]
+
+    def _reconcile(self, dry_run):
+        issues = []
+        reconciler = Reconciler(issues.append, operator='mvola', chunk_size=1, dry_run=dry_run)
+        stats = reconciler.run(self.rows)
+        reconciler.report_missing(*self.period)
+        return stats, [(issue['transaction_id'], issue['issue']) for issue in issues]
+
+    def test_dry_run_reports_like_real_run(self):
+        dry_stats, dry_issues = self._reconcile(dry_run=True)
+        self.assertEqual(Payment.objects.filter(status='pending').count(), 3)
+
+        stats, issues = self._reconcile(dry_run=False)
+
+        self.assertEqual(dry_issues, [('MV-1', DUPLICATE_ROW), ('MV-3', MISSING_FROM_FILE)])
+        self.assertEqual(dry_issues, issues)
+        self.assertEqual(dry_stats, stats)
+        self.assertEqual(stats['updated'], 2)
@@ -1,3 +1,325 @@
-from django.shortcuts import render
+import asyncio
+import hashlib
+import hmac
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, specified_rules, validate,
+    validate_schema,
+)
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_user_by_token
+from graphql_jwt.utils import get_http_authorization, get_payload
+
+from .metrics import OperationMetrics, record_operation, render_prometheus, should_sample
+from .models import AITriage, Patient
+from .persisted_queries import document_cache, get_persisted_queries_config, resolve_persisted_query
+from .query_cost import QueryCostRule
+from .services.directory_cache import (
+    get_cached_response, get_directory_state, is_directory_operation, response_cache_key, store_response,
+)
+from .services.ollama_service import get_ollama_status, stream_symptoms_analysis
+from .services.payments import apply_callbacks, get_payments_config, is_operator
+from .services.presence import doctor_id_for_username, go_offline, heartbeat, presence_ttl
+from .services.triage_jobs import claim_streamed_triage, complete_triage
+
+# Suivi d'un triage traité par un worker (flux non réservé ou déjà repris)
+TRIAGE_POLL_INTERVAL = 1.0
+TRIAGE_POLL_TIMEOUT = 60
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+def _triage_payload(triage: AITriage) -> dict:
+    return {
+        'id': str(triage.id),
+        'status': triage.status,
+        'severity': triage.severity,
+        'advice': triage.advice,
+        'recommendation': triage.recommendation,
+    }
+
+
+def _request_patient_id(request):
+    """Patient authentifié par le token JWT (en-tête Authorization ou paramètre ?token=)"""
+    token = get_http_authorization(request) or request.GET.get('token')
+    if not token:
+        return None
+    try:
+        user = get_user_by_token(token)
+    except JSONWebTokenError:
+        return None
+    return Patient.objects.filter(user=user).values_list('id', flat=True).first()
+
+
+def _next_event(events):
+    return next(events, None)
+
+
+async def _stream_events(triage: AITriage):
+    if await sync_to_async(claim_streamed_triage)(triage.id):
+        # Ce flux a réservé le triage : il appelle Ollama et enregistre le résultat
+        events = stream_symptoms_analysis(triage.symptoms)
+        try:
+            while True:
+                event = await sync_to_async(_next_event, thread_sensitive=False)(events)
+                if event is None:
+                    break
+                kind, value = event
+                if kind == 'result':
+                    await sync_to_async(complete_triage)(triage.id, value)
+                    triage = await AITriage.objects.aget(pk=triage.id)
+                    yield _sse('result', _triage_payload(triage))
+                elif kind == 'severity':
+                    yield _sse('severity', {'severity': value})
+                else:
+                    yield _sse('advice', {'delta': value})
+        finally:
+            await sync_to_async(events.close, thread_sensitive=False)()
+        return
+
+    # Triage traité ailleurs : transmettre la gravité provisoire puis le résultat final
+    yield _sse('severity', {'severity': triage.severity})
+    waited = 0.0
+    while triage.status not in ('completed', 'failed') and waited < TRIAGE_POLL_TIMEOUT:
+        await asyncio.sleep(TRIAGE_POLL_INTERVAL)
+        waited += TRIAGE_POLL_INTERVAL
+        triage = await AITriage.objects.aget(pk=triage.id)
+    yield _sse('result', _triage_payload(triage))
+
+
+async def ai_triage_stream(request, triage_id):
+    """
+    Flux Server-Sent Events d'un triage IA.
+
+    Événements : `severity` (dès les premiers tokens), `advice` (fragments du conseil),
+    puis `result` (triage enregistré). Nécessite un serveur ASGI (voir backend/asgi.py).
+    """
+    triage = await AITriage.objects.filter(pk=triage_id).afirst()
+    if triage is not None and triage.patient_id is not None:
+        # Un triage rattaché à un patient n'est visible que par ce patient
+        if await sync_to_async(_request_patient_id)(request) != triage.patient_id:
+            triage = None
+    if triage is None:
+        return JsonResponse({'error': 'Triage non trouvé'}, status=404)
+
+    response = StreamingHttpResponse(_stream_events(triage), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Désactive la mise en tampon des proxys nginx
+    return response
+
+
+def _request_doctor_id(request):
+    """Médecin authentifié par le token JWT, sans requête SQL une fois le compte en cache"""
+    token = get_http_authorization(request)
+    if not token:
+        return None
+    try:
+        payload = get_payload(token)
+    except JSONWebTokenError:
+        return None
+    username = jwt_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload)
+    return doctor_id_for_username(username) if username else None
+
+
+@csrf_exempt
+@require_POST
+def presence_heartbeat(request):
+    """Battement de présence d'un médecin, à envoyer toutes les TTL/3 secondes environ"""
+    doctor_id = _request_doctor_id(request)
+    if doctor_id is None:
+        return JsonResponse({'error': 'Médecin non authentifié'}, status=401)
+    heartbeat(doctor_id)
+    return JsonResponse({'online': True, 'ttl': presence_ttl()})
+
+
+@csrf_exempt
+@require_POST
+def presence_offline(request):
+    """Déconnexion explicite d'un médecin (sinon hors ligne à l'expiration du TTL)"""
+    doctor_id = _request_doctor_id(request)
+    if doctor_id is None:
+        return JsonResponse({'error': 'Médecin non authentifié'}, status=401)
+    go_offline(doctor_id)
+    return JsonResponse({'online': False})
+
+
+@csrf_exempt
+@require_POST
+def payment_callback(request, operator):
+    """
+    Callbacks d'un opérateur mobile money : un objet, une liste ou {"callbacks": [...]}
+    de {"transactionId", "status": "success" | "failed"}. Toujours 200 pour un lot bien
+    formé, doublons compris, afin que l'opérateur cesse de le renvoyer. Sans jeton configuré
+    pour l'opérateur, les callbacks sont refusés hors DEBUG (medicare.W003).
+    """
+    if not is_operator(operator):
+        return JsonResponse({'error': 'Opérateur inconnu'}, status=404)
+    token = get_payments_config()['CALLBACK_TOKENS'].get(operator)
+    if not token and not settings.DEBUG:
+        return JsonResponse({'error': 'Jeton de callback non configuré'}, status=403)
+    if token and not hmac.compare_digest(request.headers.get('X-Callback-Token', ''), token):
+        return JsonResponse({'error': 'Jeton de callback invalide'}, status=403)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    if isinstance(payload, dict):
+        payload = payload.get('callbacks', [payload])
+    if not isinstance(payload, list):
+        return JsonResponse({'error': 'Lot de callbacks invalide'}, status=400)
+    return JsonResponse(apply_callbacks(operator, payload))
+
+
+def ollama_health(request):
+    """État du disjoncteur Ollama et latences p50/p99 (supervision)"""
+    status = get_ollama_status()
+    return JsonResponse(status, status=503 if status['state'] == 'open' else 200)
+
+
+class InstrumentedGraphQLView(GraphQLView):
+    """
+    Vue GraphQL de l'API : mesure chaque opération (voir medicare/metrics.py), en borne
+    le coût (medicare/query_cost.py), accepte les requêtes persistées, réutilise les
+    documents déjà analysés et validés (medicare/persisted_queries.py) et met en cache
+    les réponses de l'annuaire des médecins (medicare/services/directory_cache.py).
+    """
+
+    validation_rules = (*specified_rules, QueryCostRule)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        directory_state = getattr(request, 'graphql_directory_state', None)
+        if directory_state is not None and response.status_code == 200 and request.graphql_cacheable:
+            # Annuaire des médecins : revalidation par ETag / Last-Modified
+            response['ETag'] = quote_etag(hashlib.sha256(response.content).hexdigest()[:32])
+            response['Last-Modified'] = http_date(directory_state['last_modified'])
+            if request.method in ('GET', 'HEAD'):
+                response = get_conditional_response(
+                    request, etag=response['ETag'], last_modified=directory_state['last_modified'],
+                    response=response,
+                )
+        if request.method == 'GET' and response.get('Content-Type') == 'application/json':
+            patch_vary_headers(response, ('Authorization',))
+            max_age = get_persisted_queries_config()['GET_MAX_AGE']
+            if getattr(request, 'graphql_cacheable', False) and max_age and not get_http_authorization(request):
+                # Réponse publique (aucun utilisateur) : cachable par un CDN, sans cookie CSRF
+                patch_cache_control(response, public=True, max_age=max_age)
+                response.cookies.pop(settings.CSRF_COOKIE_NAME, None)
+        return response
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        metrics = OperationMetrics(sampled=should_sample())
+        request.graphql_metrics = metrics
+        if not metrics.sampled:
+            result = self._execute_document(request, data, query, variables, operation_name, show_graphiql)
+        else:
+            with connection.execute_wrapper(metrics.sql_wrapper):
+                result = self._execute_document(request, data, query, variables, operation_name, show_graphiql)
+        if result is not None:
+            record_operation(metrics, operation_name, bool(result.errors))
+            request.graphql_cacheable = not result.errors
+        return result
+
+    def _execute_document(self, request, data, query, variables, operation_name, show_graphiql):
+        """Équivalent de GraphQLView.execute_graphql_request, avec requêtes persistées et cache LRU"""
+        try:
+            query, key = resolve_persisted_query(query, request.GET.get('extensions') or data.get('extensions'))
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        document = document_cache.get(key)
+        if document is None:
+            schema_validation_errors = validate_schema(schema)
+            if schema_validation_errors:
+                return ExecutionResult(data=None, errors=schema_validation_errors)
+            try:
+                document = parse(query)
+            except Exception as e:
+                return ExecutionResult(errors=[e])
+            validation_errors = validate(
+                schema, document, self.validation_rules, graphene_settings.MAX_VALIDATION_ERRORS
+            )
+            if validation_errors:
+                return ExecutionResult(data=None, errors=validation_errors)
+            # Seuls les documents valides sont conservés
+            document_cache.set(key, document)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if request.method == 'GET' and operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f"Can only perform a {operation_ast.operation.value} operation from a POST request."
+            ))
+
+        directory_key = None
+        if is_directory_operation(operation_ast):
+            state = get_directory_state(request)
+            request.graphql_directory_state = state
+            directory_key = response_cache_key(state, key, operation_name, variables)
+            data = get_cached_response(directory_key)
+            if data is not None:
+                request.graphql_metrics.set_operation(operation_ast, {})
+                return ExecutionResult(data=data)
+
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            result = execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        if directory_key is not None and not result.errors:
+            store_response(directory_key, result.data)
+        return result
+
+
+def prometheus_metrics(request):
+    """Métriques GraphQL du processus au format texte Prometheus"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=403)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -44,7 +44,11 @@ const SEND_MESSAGE = gql`
   mutation SendMessage($consultationId: UUID!, $content: String!) {
     sendMessage(consultationId: $consultationId, content: $content) {
       id
+      senderId
+      senderType
       content
+      photoUrl
+      audioUrl
       createdAt
     }
   }
@@ -83,7 +87,35 @@ export default function ConsultationChatPage() {
     variables: { id: consultationId },
   });
 
-  const [sendMessage] = useMutation(SEND_MESSAGE);
+  // Le message renvoyé est ajouté au cache : pas de nouvelle lecture de la consultation
+  const [sendMessage] = useMutation(SEND_MESSAGE, {
+    update(cache, { data }) {
+      const sent = (data as any)?.sendMessage;
+      if (!sent) return;
+      cache.modify({
+        id: cache.identify({ __typename: "ConsultationType", id: consultationId }),
+        fields: {
+          messages(existing = [], { readField }) {
+            if (existing.some((ref: any) => readField("id", ref) === sent.id)) return existing;
+            return [...existing, cache.writeFragment({
+              data: sent,
+              fragment: gql`
+                fragment SentMessage on MessageType {
+                  id
+                  senderId
+                  senderType
+                  content
+                  photoUrl
+                  audioUrl
+                  createdAt
+                }
+              `,
+            })];
+          },
+        },
+      });
+    },
+  });
   const [updateStatus] = useMutation(UPDATE_CONSULTATION_STATUS);
 
   // Subscription pour les nouveaux messages
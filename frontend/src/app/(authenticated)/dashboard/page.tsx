@@ -16,20 +16,14 @@ const GET_DOCTOR_STATS = gql`
   }
 `;
 
+// Compteurs agrégés côté serveur : aucune liste n'est téléchargée
 const GET_ADMIN_STATS = gql`
   query GetAdminStats {
-    allDoctors {
-      id
-    }
-    allPatients {
-      id
-    }
-    consultations {
-      id
-      status
-    }
-    pendingDoctors {
-      id
+    adminStats {
+      patients
+      doctors
+      pendingDoctors
+      consultations
     }
   }
 `;
@@ -57,25 +51,25 @@ export default function DashboardPage() {
     ? [
         {
           title: "Médecins",
-          value: (adminData as any)?.allDoctors?.length || 0,
+          value: (adminData as any)?.adminStats?.doctors || 0,
           icon: Users,
           description: "Médecins enregistrés",
         },
         {
           title: "Patients",
-          value: (adminData as any)?.allPatients?.length || 0,
+          value: (adminData as any)?.adminStats?.patients || 0,
           icon: Users,
           description: "Patients enregistrés",
         },
         {
           title: "En attente",
-          value: (adminData as any)?.pendingDoctors?.length || 0,
+          value: (adminData as any)?.adminStats?.pendingDoctors || 0,
           icon: MessageSquare,
           description: "Médecins à valider",
         },
         {
           title: "Consultations",
-          value: (adminData as any)?.consultations?.length || 0,
+          value: (adminData as any)?.adminStats?.consultations || 0,
           icon: MessageSquare,
           description: "Total consultations",
         },
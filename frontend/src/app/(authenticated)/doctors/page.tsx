@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useMemo } from "react";
+import { useState } from "react";
 import { gql } from "@apollo/client";
 import { useQuery } from "@apollo/client/react";
 import { useMutation } from "@apollo/client/react";
@@ -26,34 +26,26 @@ import {
 } from "@/components/ui/select";
 import { CheckCircle, XCircle, User, Search, Filter } from "lucide-react";
 
-const GET_PENDING_DOCTORS = gql`
-  query GetPendingDoctors {
-    pendingDoctors {
-      id
-      name
-      specialty
-      phone
-      price
-      isOnline
-      isApproved
-      rating
-      email
-    }
-  }
-`;
-
-const GET_ALL_DOCTORS = gql`
-  query GetAllDoctors {
-    allDoctors {
-      id
-      name
-      specialty
-      phone
-      price
-      isOnline
-      isApproved
-      rating
-      email
+// Recherche, filtre de spécialité et facettes calculés côté serveur (searchDoctors)
+const SEARCH_DOCTORS = gql`
+  query SearchDoctors($query: String, $specialty: String, $approved: Boolean, $first: Int) {
+    searchDoctors(query: $query, specialty: $specialty, approved: $approved, first: $first) {
+      total
+      doctors {
+        id
+        name
+        specialty
+        phone
+        price
+        isOnline
+        isApproved
+        rating
+        email
+      }
+      specialties {
+        specialty
+        count
+      }
     }
   }
 `;
@@ -78,66 +70,33 @@ export default function DoctorsPage() {
   const [searchQuery, setSearchQuery] = useState("");
   const [specialtyFilter, setSpecialtyFilter] = useState<string>("all");
   
-  const { data: pendingData, loading: pendingLoading, refetch: refetchPending } = useQuery(
-    GET_PENDING_DOCTORS,
-    { skip: !showPending }
-  );
-  const { data: allData, loading: allLoading, refetch: refetchAll } = useQuery(
-    GET_ALL_DOCTORS,
-    { skip: showPending }
-  );
+  const { data, previousData, loading, refetch } = useQuery(SEARCH_DOCTORS, {
+    variables: {
+      query: searchQuery || null,
+      specialty: !showPending && specialtyFilter !== "all" ? specialtyFilter : null,
+      approved: showPending ? false : null,
+      first: 100,
+    },
+  });
   const [approveDoctor] = useMutation(APPROVE_DOCTOR);
 
-  const loading = showPending ? pendingLoading : allLoading;
-
   const handleApprove = async (id: string, approved: boolean) => {
     try {
       await approveDoctor({ 
         variables: { id, approved } 
       });
-      if (showPending) {
-        refetchPending();
-      } else {
-        refetchAll();
-      }
+      refetch();
     } catch (error) {
       console.error("Erreur:", error);
     }
   };
 
-  const allDoctors = showPending 
-    ? (pendingData as any)?.pendingDoctors || []
-    : (allData as any)?.allDoctors || [];
-
-  // Extraire toutes les spécialités uniques
-  const specialties = useMemo(() => {
-    const uniqueSpecialties = new Set<string>();
-    allDoctors.forEach((doctor: any) => {
-      if (doctor.specialty) {
-        uniqueSpecialties.add(doctor.specialty);
-      }
-    });
-    return Array.from(uniqueSpecialties).sort();
-  }, [allDoctors]);
-
-  // Filtrer les médecins
-  const filteredDoctors = useMemo(() => {
-    return allDoctors.filter((doctor: any) => {
-      // Filtre par recherche
-      const matchesSearch = searchQuery === "" || 
-        doctor.name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        doctor.email?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        doctor.phone?.includes(searchQuery) ||
-        doctor.specialty?.toLowerCase().includes(searchQuery.toLowerCase());
-      
-      // Filtre par spécialité
-      const matchesSpecialty = specialtyFilter === "all" || doctor.specialty === specialtyFilter;
-      
-      return matchesSearch && matchesSpecialty;
-    });
-  }, [allDoctors, searchQuery, specialtyFilter]);
+  // Résultats précédents conservés pendant la saisie
+  const result = ((data ?? previousData) as any)?.searchDoctors;
+  const filteredDoctors = result?.doctors || [];
+  const specialties: { specialty: string; count: number }[] = result?.specialties || [];
 
-  if (loading) return <div className="text-center">Chargement...</div>;
+  if (loading && !result) return <div className="text-center">Chargement...</div>;
 
   return (
     <div className="space-y-6">
@@ -190,9 +149,9 @@ export default function DoctorsPage() {
               </SelectTrigger>
               <SelectContent>
                 <SelectItem value="all">Toutes les spécialités</SelectItem>
-                {specialties.map((specialty) => (
+                {specialties.map(({ specialty, count }) => (
                   <SelectItem key={specialty} value={specialty}>
-                    {specialty}
+                    {specialty} ({count})
                   </SelectItem>
                 ))}
               </SelectContent>
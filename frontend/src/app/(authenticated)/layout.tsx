@@ -30,6 +30,24 @@ export default function AuthenticatedLayout({
     setTimeout(checkAuth, 100);
   }, [token, user, router]);
 
+  useEffect(() => {
+    // Présence des médecins : battement régulier, hors ligne côté serveur sans battement pendant 60 s
+    if (!token || user?.role !== "doctor") return;
+    const graphqlUri = process.env.NEXT_PUBLIC_GRAPHQL_URI || "http://localhost:8000/graphql/";
+    const heartbeatUrl = new URL("../presence/heartbeat/", graphqlUri).toString();
+    const sendHeartbeat = () => {
+      fetch(heartbeatUrl, {
+        method: "POST",
+        headers: { Authorization: `JWT ${token}` },
+      }).catch(() => {
+        // Réseau indisponible : le prochain battement rétablira la présence
+      });
+    };
+    sendHeartbeat();
+    const interval = setInterval(sendHeartbeat, 20000);
+    return () => clearInterval(interval);
+  }, [token, user]);
+
   if (isLoading || !isAuthenticated) {
     return (
       <div className="flex h-screen items-center justify-center">
@@ -1,35 +1,55 @@
 "use client";
 
+import { useState } from "react";
 import { gql } from "@apollo/client";
 import { useQuery } from "@apollo/client/react";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
+import { Button } from "@/components/ui/button";
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+  SelectValue,
+} from "@/components/ui/select";
 import { DollarSign, TrendingUp, CheckCircle, XCircle, Clock } from "lucide-react";
 
+// Paiements paginés côté serveur (curseur) ; totaux calculés sur l'ensemble filtré
 const GET_PAYMENTS = gql`
-  query GetPayments {
-    payments {
-      id
-      consultation {
-        id
-        patient {
-          name
-        }
-        doctor {
-          name
+  query GetPayments($status: String, $after: String) {
+    paymentsConnection(status: $status, first: 50, after: $after) {
+      totalCount
+      successAmount
+      edges {
+        node {
+          id
+          consultation {
+            id
+            patient {
+              name
+            }
+            doctor {
+              name
+            }
+          }
+          amount
+          operator
+          status
+          transactionId
+          createdAt
         }
       }
-      amount
-      operator
-      status
-      transactionId
-      createdAt
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
     }
   }
 `;
 
 const getStatusBadge = (status: string) => {
-  switch (status) {
+  switch (status?.toLowerCase()) {
     case "success":
       return (
         <Badge variant="default">
@@ -54,7 +74,7 @@ const getStatusBadge = (status: string) => {
 };
 
 const getOperatorLabel = (operator: string) => {
-  switch (operator) {
+  switch (operator?.toLowerCase()) {
     case "mvola":
       return "MVola";
     case "orange":
@@ -67,15 +87,22 @@ const getOperatorLabel = (operator: string) => {
 };
 
 export default function PaymentsPage() {
-  const { data, loading, error } = useQuery(GET_PAYMENTS);
+  const [statusFilter, setStatusFilter] = useState<string>("all");
+  // Curseurs des pages précédentes, pour revenir en arrière
+  const [cursors, setCursors] = useState<string[]>([]);
+  const { data, loading, error } = useQuery(GET_PAYMENTS, {
+    variables: {
+      status: statusFilter === "all" ? null : statusFilter,
+      after: cursors[cursors.length - 1] ?? null,
+    },
+  });
 
   if (loading) return <div className="text-center">Chargement...</div>;
   if (error) return <div className="text-center text-destructive">Erreur: {error.message}</div>;
 
-  const payments = (data as any)?.payments || [];
-  const totalRevenue = payments
-    .filter((p: any) => p.status === "success")
-    .reduce((sum: number, p: any) => sum + p.amount, 0);
+  const connection = (data as any)?.paymentsConnection;
+  const payments = connection?.edges.map((edge: any) => edge.node) || [];
+  const totalRevenue = Number(connection?.successAmount || 0);
   const commission = totalRevenue * 0.15; // 15% de commission
 
   return (
@@ -114,16 +141,35 @@ export default function PaymentsPage() {
             <CheckCircle className="h-4 w-4 text-muted-foreground" />
           </CardHeader>
           <CardContent>
-            <div className="text-2xl font-bold">{payments.length}</div>
+            <div className="text-2xl font-bold">{connection?.totalCount || 0}</div>
             <p className="text-xs text-muted-foreground">Total transactions</p>
           </CardContent>
         </Card>
       </div>
 
       <Card>
-        <CardHeader>
-          <CardTitle>Historique des paiements</CardTitle>
-          <CardDescription>Liste de tous les paiements effectués</CardDescription>
+        <CardHeader className="flex flex-row items-center justify-between">
+          <div>
+            <CardTitle>Historique des paiements</CardTitle>
+            <CardDescription>Liste de tous les paiements effectués</CardDescription>
+          </div>
+          <Select
+            value={statusFilter}
+            onValueChange={(value) => {
+              setStatusFilter(value);
+              setCursors([]);
+            }}
+          >
+            <SelectTrigger className="w-[180px]">
+              <SelectValue placeholder="Tous les statuts" />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value="all">Tous les statuts</SelectItem>
+              <SelectItem value="success">Réussi</SelectItem>
+              <SelectItem value="pending">En attente</SelectItem>
+              <SelectItem value="failed">Échoué</SelectItem>
+            </SelectContent>
+          </Select>
         </CardHeader>
         <CardContent>
           <div className="space-y-4">
@@ -145,7 +191,7 @@ export default function PaymentsPage() {
                       {getStatusBadge(payment.status)}
                     </div>
                     <div className="mt-1 text-sm text-muted-foreground">
-                      {getOperatorLabel(payment.operator)} • {payment.amount.toLocaleString()} Ar
+                      {getOperatorLabel(payment.operator)} • {Number(payment.amount).toLocaleString()} Ar
                       {payment.transactionId && ` • ${payment.transactionId}`}
                     </div>
                     <div className="mt-1 text-xs text-muted-foreground">
@@ -156,6 +202,22 @@ export default function PaymentsPage() {
               ))
             )}
           </div>
+          <div className="mt-4 flex justify-end gap-2">
+            <Button
+              variant="outline"
+              disabled={cursors.length === 0}
+              onClick={() => setCursors(cursors.slice(0, -1))}
+            >
+              Précédent
+            </Button>
+            <Button
+              variant="outline"
+              disabled={!connection?.pageInfo.hasNextPage}
+              onClick={() => setCursors([...cursors, connection.pageInfo.endCursor])}
+            >
+              Suivant
+            </Button>
+          </div>
         </CardContent>
       </Card>
     </div>
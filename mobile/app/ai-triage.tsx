@@ -7,16 +7,52 @@ import { Ionicons } from '@expo/vector-icons';
 import { Card } from '../src/components/ui/Card';
 import { Button } from '../src/components/ui/Button';
 import { Input } from '../src/components/ui/Input';
-import { apolloClient, AI_TRIAGE } from '../src/services/api';
+import { apolloClient, AI_TRIAGE, GET_AI_TRIAGE } from '../src/services/api';
 import { useMutation } from '@apollo/client';
 import { AITriageResult } from '../src/types';
 
+const TRIAGE_POLL_INTERVAL_MS = 2000;
+const TRIAGE_POLL_MAX_ATTEMPTS = 30;
+
 export default function AITriageScreen() {
   const router = useRouter();
   const [symptoms, setSymptoms] = useState('');
   const [result, setResult] = useState<AITriageResult | null>(null);
   const [triage, { loading }] = useMutation(AI_TRIAGE);
 
+  const pollTriage = async (id: string) => {
+    for (let attempt = 0; attempt < TRIAGE_POLL_MAX_ATTEMPTS; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, TRIAGE_POLL_INTERVAL_MS));
+      try {
+        const { data } = await apolloClient.query({
+          query: GET_AI_TRIAGE,
+          variables: { id },
+          fetchPolicy: 'network-only',
+        });
+        const triageData = data?.aiTriage;
+        if (!triageData) {
+          return;
+        }
+        const status = (triageData.status || '').toLowerCase();
+        if (status === 'completed') {
+          setResult((current) => current && current.id === id ? {
+            ...current,
+            severity: triageData.severity.toLowerCase().trim() as AITriageResult['severity'],
+            advice: triageData.advice || current.advice,
+            recommendation: triageData.recommendation || current.recommendation,
+          } : current);
+          return;
+        }
+        if (status === 'failed') {
+          return;
+        }
+      } catch (error) {
+        console.error('Error while polling triage:', error);
+        return;
+      }
+    }
+  };
+
   const handleTriage = async () => {
     if (!symptoms.trim()) {
       return;
@@ -58,6 +94,12 @@ export default function AITriageScreen() {
           recommendation: triageData.recommendation || 'Aucune recommandation disponible',
           createdAt: new Date().toISOString(),
         });
+
+        // Le résultat affiché est provisoire tant que l'analyse IA n'est pas terminée
+        const status = (triageData.status || '').toLowerCase();
+        if (status === 'pending' || status === 'processing') {
+          pollTriage(triageData.id);
+        }
       } else {
         console.error('No triage data in response:', JSON.stringify(data, null, 2));
         Alert.alert('Erreur', 'Aucune donnée reçue. Veuillez réessayer.');
@@ -105,11 +105,25 @@ export const AI_TRIAGE = gql`
         severity
         advice
         recommendation
+        status
       }
     }
   }
 `;
 
+// Suivi d'un triage : l'analyse IA est terminée quand status vaut COMPLETED ou FAILED
+export const GET_AI_TRIAGE = gql`
+  query GetAITriage($id: UUID!) {
+    aiTriage(id: $id) {
+      id
+      severity
+      advice
+      recommendation
+      status
+    }
+  }
+`;
+
 export const GET_REMINDERS = gql`
   query GetReminders {
     reminders {
@@ -127,6 +141,32 @@ export const GET_REMINDERS = gql`
   }
 `;
 
+// Synchronisation différentielle : seuls les rappels modifiés ou supprimés depuis `updatedSince`
+export const SYNC_REMINDERS = gql`
+  query SyncReminders($updatedSince: BigInt) {
+    sync(updatedSince: $updatedSince) {
+      watermark
+      reset
+      reminders {
+        id
+        type
+        title
+        description
+        date
+        time
+        frequency
+        endDate
+        isActive
+        notificationId
+      }
+      deleted {
+        entity
+        objectId
+      }
+    }
+  }
+`;
+
 export const CREATE_REMINDER = gql`
   mutation CreateReminder(
     $type: String!
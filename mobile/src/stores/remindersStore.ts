@@ -1,8 +1,9 @@
 import { create } from 'zustand';
 import { Reminder } from '../types';
 import { apolloClient } from '../services/api';
+import { useAuthStore } from './authStore';
 import {
-  GET_REMINDERS,
+  SYNC_REMINDERS,
   CREATE_REMINDER,
   UPDATE_REMINDER,
   DELETE_REMINDER,
@@ -10,6 +11,8 @@ import {
 
 interface RemindersState {
   reminders: Reminder[];
+  syncWatermark: number | null;
+  syncUserId: string | null;
   isLoading: boolean;
   error: string | null;
   fetchReminders: () => Promise<void>;
@@ -21,16 +24,24 @@ interface RemindersState {
 
 export const useRemindersStore = create<RemindersState>()((set, get) => ({
   reminders: [],
+  syncWatermark: null,
+  syncUserId: null,
   isLoading: false,
   error: null,
   fetchReminders: async () => {
     set({ isLoading: true, error: null });
     try {
+      // Seules les modifications depuis la dernière synchronisation sont téléchargées
+      // (synchronisation complète après un changement de compte)
+      const userId = useAuthStore.getState().user?.id ?? null;
+      const sameUser = userId !== null && userId === get().syncUserId;
       const { data } = await apolloClient.query({
-        query: GET_REMINDERS,
+        query: SYNC_REMINDERS,
+        variables: { updatedSince: sameUser ? get().syncWatermark : null },
         fetchPolicy: 'network-only',
       });
-      const reminders = (data.reminders || []).map((r: any) => ({
+      const changes = data.sync;
+      const changed: Reminder[] = (changes.reminders || []).map((r: any) => ({
         id: r.id,
         type: r.type,
         title: r.title,
@@ -42,7 +53,19 @@ export const useRemindersStore = create<RemindersState>()((set, get) => ({
         isActive: r.isActive || r.is_active || true,
         notificationId: r.notificationId || r.notification_id || undefined,
       }));
-      set({ reminders, isLoading: false });
+      const changedIds = new Set(changed.map((r) => r.id));
+      const deletedIds = new Set(
+        (changes.deleted || [])
+          .filter((d: any) => d.entity === 'REMINDER')
+          .map((d: any) => d.objectId)
+      );
+      const kept = changes.reset
+        ? []
+        : get().reminders.filter((r) => !changedIds.has(r.id) && !deletedIds.has(r.id));
+      const reminders = [...kept, ...changed].sort((a, b) =>
+        `${a.date}T${a.time}`.localeCompare(`${b.date}T${b.time}`)
+      );
+      set({ reminders, syncWatermark: changes.watermark, syncUserId: userId, isLoading: false });
     } catch (error: any) {
       console.error('Error fetching reminders:', error);
       set({ error: error.message || 'Erreur lors du chargement des rappels', isLoading: false });